@@ -1,15 +1,38 @@
 # Backend module initialization
-from .agent import get_agent
-from .rag_engine import load_vector_db
-from .tools import create_it_ticket, schedule_meeting, issue_detector
-from .prompts import AGENT_SYSTEM_PROMPT, ISSUE_DETECTION_PROMPT
-
-__all__ = [
-    'get_agent',
-    'load_vector_db',
-    'create_it_ticket',
-    'schedule_meeting',
-    'issue_detector',
-    'AGENT_SYSTEM_PROMPT',
-    'ISSUE_DETECTION_PROMPT'
-]
+#
+# Exports resolve on first access (PEP 562), so `from Backend.auth import ...`
+# in api.py or the login page does not pull in the agent, LLM clients or the
+# RAG stack. `from Backend import get_agent` still works as before.
+import importlib
+
+_EXPORTS = {
+    'get_agent': '.agent',
+    'get_cache_stats': '.agent',
+    'get_llm_stats': '.agent',
+    'load_vector_db': '.rag_engine',
+    'get_registry_stats': '.rag_engine',
+    'create_it_ticket': '.tools',
+    'schedule_meeting': '.tools',
+    'issue_detector': '.tools',
+    'classify_fast': '.intent',
+    'get_intent_stats': '.intent',
+    'pack_context': '.context',
+    'get_context_stats': '.context',
+    'get_rerank_stats': '.rerank',
+    'AGENT_SYSTEM_PROMPT': '.prompts',
+    'ISSUE_DETECTION_PROMPT': '.prompts',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value   # later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,48 +1,541 @@
 import os
 import json
+import time
+import uuid
+import random
+import asyncio
+import hashlib
+import weakref
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
 
-from .prompts import ISSUE_DETECTION_PROMPT
+from .prompts import (
+    ISSUE_DETECTION_PROMPT,
+    RAG_ANSWER_PROMPT,
+    CLASSIFY_AND_ANSWER_PROMPT,
+    ANSWER_MARKER,
+)
 from .tools import create_it_ticket, schedule_meeting
-from .rag_engine import load_vector_db
+from .rag_engine import get_shared_retriever
+from .cache import LRUCache, SemanticCache, normalize_query
+from .intent import classify_fast, record_decision
+from .session_store import get_session_store
+from .ratelimit import TokenBucket, SingleFlight, RateLimitExceeded
+from .context import pack_context
+from .rerank import rerank, RERANK_ENABLED, RERANK_CANDIDATES
 
 
 # ==================== ENV ====================
 load_dotenv(override=True)
 
+# Checked when the first Groq client is built, so importing the agent (e.g.
+# for the login page or the auth API) works without a key
 API_KEY = os.getenv("GROQ_API_KEY")
-if not API_KEY:
-    raise ValueError("GROQ_API_KEY missing")
 
 
 # ==================== LLM (SUPPORTED MODEL) ====================
-llm = ChatGroq(
-    model="llama-3.3-70b-versatile",   # ✅ ACTIVE + FREE
-    temperature=0,
-    groq_api_key=API_KEY,
-)
+# Models in failover order: the fast model takes over when the primary is
+# rate limited, failing, or its circuit breaker is open
+LLM_MODELS = [
+    m.strip() for m in os.getenv(
+        "LLM_MODELS", "llama-3.3-70b-versatile,llama-3.1-8b-instant"   # ✅ ACTIVE + FREE
+    ).split(",") if m.strip()
+]
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 30))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 2))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", 0.5))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", 8))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 50))
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", 5))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", 30))
+# Local token bucket per model (requests/minute, 0 disables) so bursts queue
+# here instead of tripping Groq's limits; identical in-flight prompts share a call
+LLM_RATE_LIMIT_RPM = float(os.getenv("LLM_RATE_LIMIT_RPM", 30))
+LLM_RATE_BURST = int(os.getenv("LLM_RATE_BURST", 10))
+LLM_RATE_TIMEOUT = float(os.getenv("LLM_RATE_TIMEOUT", 30))
+LLM_COALESCE = os.getenv("LLM_COALESCE", "1") == "1"
 
-def create_llm():
-    models = [
-        "llama-3.3-70b-versatile",
-        "llama-3.1-8b-instant"
-    ]
 
-    for model in models:
-        try:
-            return ChatGroq(
-                model=model,
-                temperature=0,
-                groq_api_key=os.getenv("GROQ_API_KEY"),
+def _error_status(error: Exception):
+    """HTTP status of a Groq API error (None for connection errors/timeouts)."""
+    return getattr(error, "status_code", None)
+
+
+def _is_retryable(error: Exception) -> bool:
+    import groq
+    import httpx
+
+    status = _error_status(error)
+    if status is None:
+        return isinstance(error, (groq.APIConnectionError, httpx.TransportError))
+    return status == 429 or status >= 500
+
+
+def _retry_after(error: Exception):
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    Per-model breaker: opens after `threshold` consecutive failures and
+    lets a single trial call through once `cooldown` seconds have passed.
+
+    allow() hands out a ticket per call. While a half-open trial is in
+    flight only its ticket can settle or release it; outcomes reported with
+    any other ticket are ignored until the trial ends.
+    """
+
+    def __init__(self, threshold: int = LLM_BREAKER_THRESHOLD, cooldown: float = LLM_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.open_for = cooldown
+        self._trial = None        # ticket of the half-open trial in flight
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.open_for:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        """A ticket for one call (truthy), or None while the breaker is open."""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return object()
+            if state == "half_open" and self._trial is None:
+                self._trial = object()
+                return self._trial
+            return None
+
+    def _settles(self, ticket) -> bool:
+        """True unless a half-open trial is in flight and `ticket` is not its."""
+        return self._trial is None or ticket is self._trial
+
+    def release_trial(self, ticket):
+        """
+        Give back a half-open trial that ended without an outcome (throttled
+        locally, cancelled, or an error that says nothing about the model).
+        A no-op for other tickets, and once the trial has been settled.
+        """
+        with self._lock:
+            if ticket is not None and ticket is self._trial:
+                self._trial = None
+
+    def record_success(self, ticket=None):
+        with self._lock:
+            if not self._settles(ticket):
+                return
+            self.failures = 0
+            self.opened_at = None
+            self._trial = None
+
+    def record_failure(self, ticket=None):
+        with self._lock:
+            if not self._settles(ticket):
+                return
+            self.failures += 1
+            self._trial = None
+            if self.failures >= self.threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+                self.open_for = self.cooldown
+
+    def trip(self, seconds: float = None, ticket=None):
+        """Open immediately, e.g. for a 429's Retry-After window."""
+        with self._lock:
+            self.failures += 1
+            if self._settles(ticket):
+                self._trial = None
+            self.opened_at = time.monotonic()
+            self.open_for = seconds or self.cooldown
+
+
+class ResilientLLM:
+    """
+    Drop-in for ChatGroq's invoke / ainvoke / stream with:
+    - one pooled HTTP client shared by every model and agent
+    - jittered exponential backoff on 5xx, timeouts and connection errors
+    - a circuit breaker per model
+    - failover to the next model in LLM_MODELS on 429 or exhausted retries
+    - a token bucket per model; an empty bucket fails over to the next model
+      at once, the last model waits up to LLM_RATE_TIMEOUT
+    - single-flight coalescing of identical in-flight prompts
+    """
+
+    def __init__(self, models: list = None, max_retries: int = LLM_MAX_RETRIES):
+        self.models = models or LLM_MODELS
+        self.max_retries = max_retries
+        self.breakers = {m: CircuitBreaker() for m in self.models}
+        self.counters = {
+            m: {"calls": 0, "success": 0, "errors": 0, "retries": 0,
+                "rate_limited": 0, "throttled": 0, "failovers": 0}
+            for m in self.models
+        }
+        self.limiters = {
+            m: TokenBucket(rate=LLM_RATE_LIMIT_RPM / 60, capacity=LLM_RATE_BURST)
+            for m in self.models
+        }
+        self._flight = SingleFlight()
+
+        # HTTP pools and ChatGroq clients are built on the first call
+        self._limits = None
+        self._http_client = None
+        self._clients = {}
+        # httpx.AsyncClient pools are tied to an event loop: one per loop
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    # ---------- clients ----------
+    def _new_chat(self, model: str, **http):
+        from langchain_groq import ChatGroq
+
+        if not API_KEY:
+            raise ValueError("GROQ_API_KEY missing")
+        return ChatGroq(
+            model=model,
+            temperature=0,
+            groq_api_key=API_KEY,
+            max_retries=0,          # retries and failover are handled here
+            request_timeout=LLM_TIMEOUT,
+            **http
+        )
+
+    def _http_limits(self):
+        import httpx
+
+        if self._limits is None:
+            self._limits = httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_CONNECTIONS
             )
-        except Exception:
-            continue
+        return self._limits
+
+    def _client(self, model: str):
+        import httpx
+
+        with self._lock:
+            if self._http_client is None:
+                self._http_client = httpx.Client(limits=self._http_limits(), timeout=LLM_TIMEOUT)
+            if model not in self._clients:
+                self._clients[model] = self._new_chat(model, http_client=self._http_client)
+            return self._clients[model]
+
+    def _aclient(self, model: str):
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._async_clients.get(loop)
+            if clients is None:
+                clients = {"http": httpx.AsyncClient(limits=self._http_limits(), timeout=LLM_TIMEOUT)}
+                self._async_clients[loop] = clients
+            if model not in clients:
+                clients[model] = self._new_chat(model, http_async_client=clients["http"])
+            return clients[model]
+
+    # ---------- policy ----------
+    def _count(self, model: str, key: str):
+        with self._lock:
+            self.counters[model][key] += 1
+
+    def _attempts(self):
+        """
+        Yield (model, attempt, breaker ticket) in failover order, skipping
+        open breakers. Every attempt on a model shares its ticket.
+        """
+        tried = False
+        for model in self.models:
+            ticket = self.breakers[model].allow()
+            if not ticket:
+                continue
+            if tried:
+                self._count(model, "failovers")
+            tried = True
+            for attempt in range(self.max_retries + 1):
+                if attempt and self.breakers[model].state == "open":
+                    break
+                yield model, attempt, ticket
+
+        if not tried:
+            raise RuntimeError("All LLM models are unavailable (circuit breakers open)")
+
+    def _has_fallback(self, model: str) -> bool:
+        later = self.models[self.models.index(model) + 1:]
+        return any(self.breakers[m].state != "open" for m in later)
+
+    def _throttle_timeout(self, model: str) -> float:
+        # With a fallback available, don't queue behind this model's bucket
+        return 0 if self._has_fallback(model) else LLM_RATE_TIMEOUT
+
+    def _throttled(self, model: str) -> RateLimitExceeded:
+        self._count(model, "throttled")
+        return RateLimitExceeded(f"Local LLM rate limit reached for {model}")
+
+    def _on_error(self, model: str, attempt: int, error: Exception, ticket=None):
+        """
+        Record a failed call and return the backoff delay before retrying the
+        same model, "failover" to move on to the next model, or raise.
+        """
+        self._count(model, "errors")
+        status = _error_status(error)
+        has_fallback = self._has_fallback(model)
+
+        if not _is_retryable(error):
+            if status == 404 and has_fallback:
+                # Model decommissioned/unknown: stop sending traffic to it
+                self.breakers[model].trip(ticket=ticket)
+                return "failover"
+            # e.g. 400/401: the model answered, so it counts as healthy
+            self.breakers[model].record_success(ticket)
+            raise error
+
+        if status == 429:
+            self._count(model, "rate_limited")
+            if has_fallback:
+                self.breakers[model].trip(_retry_after(error), ticket)
+                return "failover"
+        else:
+            self.breakers[model].record_failure(ticket)
+
+        if attempt >= self.max_retries:
+            if has_fallback:
+                return "failover"
+            raise error
+
+        self._count(model, "retries")
+        delay = min(LLM_RETRY_MAX_DELAY, LLM_RETRY_BASE_DELAY * 2 ** attempt)
+        if status == 429 and _retry_after(error):
+            return min(LLM_RETRY_MAX_DELAY, _retry_after(error))
+        return random.uniform(0, delay)
 
-    raise RuntimeError("No supported Groq model found")
+    # ---------- calls ----------
+    @staticmethod
+    def _flight_key(prompt, kwargs: dict) -> str:
+        raw = repr(prompt) + repr(sorted(kwargs.items()))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def invoke(self, prompt, **kwargs):
+        if not LLM_COALESCE:
+            return self._invoke(prompt, **kwargs)
+        return self._flight.do(
+            self._flight_key(prompt, kwargs),
+            lambda: self._invoke(prompt, **kwargs)
+        )
+
+    async def ainvoke(self, prompt, **kwargs):
+        if not LLM_COALESCE:
+            return await self._ainvoke(prompt, **kwargs)
+        return await self._flight.do_async(
+            self._flight_key(prompt, kwargs),
+            lambda: self._ainvoke(prompt, **kwargs)
+        )
+
+    def stream(self, prompt, **kwargs):
+        """
+        Retries and failover apply until the first chunk arrives; after that
+        an error is raised to the caller (the partial reply is already out).
+        """
+        if not LLM_COALESCE:
+            return self._stream(prompt, **kwargs)
+        return self._flight.stream(
+            self._flight_key(prompt, kwargs),
+            lambda: self._stream(prompt, **kwargs)
+        )
+
+    def _invoke(self, prompt, **kwargs):
+        skip = last_error = None
+        for model, attempt, ticket in self._attempts():
+            if model == skip:
+                continue
+            try:
+                if not self.limiters[model].acquire(self._throttle_timeout(model)):
+                    last_error, skip = self._throttled(model), model
+                    continue
+                self._count(model, "calls")
+                try:
+                    response = self._client(model).invoke(prompt, **kwargs)
+                except Exception as e:
+                    last_error = e
+                    outcome = self._on_error(model, attempt, e, ticket)
+                    if outcome == "failover":
+                        skip = model
+                    else:
+                        time.sleep(outcome)
+                    continue
+                self.breakers[model].record_success(ticket)
+                self._count(model, "success")
+                return response
+            finally:
+                # Frees a half-open trial the attempt did not settle
+                self.breakers[model].release_trial(ticket)
+
+        raise last_error or RuntimeError("All LLM models failed")
+
+    async def _ainvoke(self, prompt, **kwargs):
+        skip = last_error = None
+        for model, attempt, ticket in self._attempts():
+            if model == skip:
+                continue
+            try:
+                if not await self.limiters[model].acquire_async(self._throttle_timeout(model)):
+                    last_error, skip = self._throttled(model), model
+                    continue
+                self._count(model, "calls")
+                try:
+                    response = await self._aclient(model).ainvoke(prompt, **kwargs)
+                except Exception as e:
+                    last_error = e
+                    outcome = self._on_error(model, attempt, e, ticket)
+                    if outcome == "failover":
+                        skip = model
+                    else:
+                        await asyncio.sleep(outcome)
+                    continue
+                self.breakers[model].record_success(ticket)
+                self._count(model, "success")
+                return response
+            finally:
+                # Frees a half-open trial the attempt did not settle
+                self.breakers[model].release_trial(ticket)
+
+        raise last_error or RuntimeError("All LLM models failed")
+
+    def _stream(self, prompt, **kwargs):
+        skip = last_error = None
+        for model, attempt, ticket in self._attempts():
+            if model == skip:
+                continue
+            try:
+                if not self.limiters[model].acquire(self._throttle_timeout(model)):
+                    last_error, skip = self._throttled(model), model
+                    continue
+                self._count(model, "calls")
+                chunks = self._client(model).stream(prompt, **kwargs)
+                try:
+                    first = next(chunks, None)
+                except Exception as e:
+                    last_error = e
+                    outcome = self._on_error(model, attempt, e, ticket)
+                    if outcome == "failover":
+                        skip = model
+                    else:
+                        time.sleep(outcome)
+                    continue
+
+                self.breakers[model].record_success(ticket)
+                if first is not None:
+                    yield first
+                try:
+                    yield from chunks
+                except Exception:
+                    self._count(model, "errors")
+                    self.breakers[model].record_failure(ticket)
+                    raise
+                self._count(model, "success")
+                return
+            finally:
+                # Frees a half-open trial the attempt did not settle
+                self.breakers[model].release_trial(ticket)
+
+        raise last_error or RuntimeError("All LLM models failed")
+
+    def stats(self) -> dict:
+        with self._lock:
+            models = {
+                model: dict(
+                    self.counters[model],
+                    breaker=self.breakers[model].state,
+                    limiter=self.limiters[model].stats()
+                )
+                for model in self.models
+            }
+        return {"models": models, "single_flight": self._flight.stats()}
+
+
+def create_llm():
+    if not LLM_MODELS:
+        raise RuntimeError("No supported Groq model found")
+    return ResilientLLM(LLM_MODELS)
 
 llm = create_llm()
 
+
+def get_llm_stats() -> dict:
+    """Per-model counters, breaker and limiter state, plus coalescing counters."""
+    return llm.stats()
+
+
+# ==================== RETRIEVAL CACHES ====================
+# Shared by every agent in the process: normalized query -> query vector,
+# and (index version, query, search params) -> retrieved [(doc id, score)]
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", 2048))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", 3600))
+
+query_embedding_cache = LRUCache(maxsize=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL)
+retrieval_cache = LRUCache(maxsize=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL)
+
+# Semantic answer cache: near-duplicate questions against the same index
+# version and answer prompt reuse the stored cited answer (no Groq call)
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1") == "1"
+answer_cache = SemanticCache(
+    threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.95)),
+    maxsize=int(os.getenv("ANSWER_CACHE_SIZE", 512)),
+    ttl=float(os.getenv("ANSWER_CACHE_TTL", 1800)),
+)
+# Rule-based intent tier in front of the LLM classifier ("0" always asks the LLM)
+INTENT_FAST_PATH = os.getenv("INTENT_FAST_PATH", "1") == "1"
+# Ambiguous messages: retrieve speculatively and classify + answer in one call
+AGENT_COMBINED_MODE = os.getenv("AGENT_COMBINED_MODE", "1") == "1"
+
+# Cached answers are only valid for the prompts that produced them
+ANSWER_PROMPT_HASH = hashlib.sha256(
+    (RAG_ANSWER_PROMPT + CLASSIFY_AND_ANSWER_PROMPT).encode("utf-8")
+).hexdigest()[:16]
+
+OUT_OF_DOCUMENTS = (
+    "This question is OUT OF DOCUMENTS - "
+    "I can only answer questions related to the provided enterprise documents."
+)
+
+DEFAULT_DECISION = {
+    "type": "query",
+    "severity": "low",
+    "category": "general_query",
+    "requires_action": False,
+    "has_abuse": False
+}
+
+
+# Thread pool for blocking work (encoder, FAISS, SQLite/SMTP tools) in ainvoke
+AGENT_BLOCKING_WORKERS = int(os.getenv("AGENT_BLOCKING_WORKERS", 8))
+_blocking_pool = ThreadPoolExecutor(
+    max_workers=AGENT_BLOCKING_WORKERS,
+    thread_name_prefix="agent-blocking"
+)
+
+
+async def _run_blocking(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_blocking_pool, func, *args)
+
+
+def get_cache_stats() -> dict:
+    return {
+        "query_embedding": query_embedding_cache.stats(),
+        "retrieval": retrieval_cache.stats(),
+        "answer": answer_cache.stats(),
+    }
+
 # ==================== AGENT ====================
 class EnterpriseAgent:
     """
@@ -50,54 +543,212 @@ class EnterpriseAgent:
     - Intent detection
     - Issue confirmation
     - RAG-based answering
+
+    Conversation state (pending confirmation, user info, chat history)
+    lives in a session store keyed by session_id, so any agent built for
+    the same session - in any worker - continues the same conversation.
     """
 
-    def __init__(self, user_info: dict = None):
+    def __init__(self, user_info: dict = None, session_id: str = None, store=None):
+        # Embedding model + FAISS index are loaded once per process and shared;
+        # search type, k, fetch_k and score threshold come from RAG_* settings
         try:
-            self.vector_db = load_vector_db()
-            self.retriever = self.vector_db.as_retriever(
-                search_type="mmr",
-                search_kwargs={"k": 10, "fetch_k": 20}
-            )
+            self.retriever = get_shared_retriever()
         except Exception:
             self.retriever = None
+        if RERANK_ENABLED and self.retriever:
+            # Give the cross-encoder a wider pool; it keeps RAG_RERANK_TOP_N
+            k = max(self.retriever.search_kwargs.get("k", 4), RERANK_CANDIDATES)
+            self.retriever.search_kwargs = dict(self.retriever.search_kwargs, k=k)
 
-        self.pending_action = None
-        self.user_info = user_info or {}
+        self.store = store or get_session_store()
+        self.session_id = session_id or uuid.uuid4().hex
+        if user_info:
+            self.user_info = user_info
+        self._async_lock = None
+
+
+    # ==================== SESSION STATE ====================
+    def _update_state(self, key: str, value):
+        state = self.store.load_state(self.session_id)
+        if value is None:
+            state.pop(key, None)
+        else:
+            state[key] = value
+        self.store.save_state(self.session_id, state)
+
+    @property
+    def pending_action(self):
+        return self.store.load_state(self.session_id).get("pending_action")
+
+    @pending_action.setter
+    def pending_action(self, action):
+        self._update_state("pending_action", action)
+
+    @property
+    def user_info(self) -> dict:
+        return self.store.load_state(self.session_id).get("user_info") or {}
+
+    @user_info.setter
+    def user_info(self, info):
+        self._update_state("user_info", info or None)
+
+    def history(self, limit: int = None) -> list:
+        """Chat history as [{"role": ..., "content": ...}], oldest first."""
+        return self.store.get_history(self.session_id, limit)
+
+    def clear_history(self):
+        self.store.clear_history(self.session_id)
+
+    def _record(self, user_input: str, reply: str):
+        self.store.append_message(self.session_id, {"role": "user", "content": user_input})
+        self.store.append_message(self.session_id, {"role": "assistant", "content": reply})
 
 
     # ==================== MAIN ENTRY ====================
     def invoke(self, user_input: str) -> dict:
         """
-        EXACTLY ONE LLM CALL per user message
+        At most ONE LLM CALL per user message:
+        - confirmations, rule-routed issues and cached answers make none
+        - rule-routed questions make one (the answer)
+        - ambiguous messages make one combined classify + answer call
         """
+        result = self._invoke(user_input)
+        self._record(user_input, result["output"])
+        return result
 
+    def _invoke(self, user_input: str) -> dict:
         # 1️⃣ Confirmation flow (NO LLM CALL)
         if self.pending_action:
             return self._handle_confirmation(user_input)
 
-        # 2️⃣ Intent detection (ONE LLM CALL)
-        prompt = ISSUE_DETECTION_PROMPT.format(query=user_input)
+        # 2️⃣ Intent detection: compiled rules first, LLM only when ambiguous
+        decision = classify_fast(user_input) if INTENT_FAST_PATH else None
+        prepared = None
+        answer = None
 
-        try:
-            response = llm.invoke(prompt)
-            raw = response.content.strip()
+        if decision is not None:
+            record_decision("rule", decision)
+        elif AGENT_COMBINED_MODE and self.retriever:
+            # Speculative retrieval: assume a question until the LLM says otherwise
+            prepared = self._prepare_query(user_input)
+            if prepared["docs"]:
+                decision, answer = self._classify_and_answer(prepared)
+            else:
+                # No chunks, or a cached answer: still classify first, so abuse
+                # and IT/HR requests are never answered from the cache
+                decision = self._classify_with_llm(user_input)
+        else:
+            decision = self._classify_with_llm(user_input)
 
-            start = raw.find("{")
-            end = raw.rfind("}")
-            if start == -1 or end == -1:
-                raise ValueError("No JSON found")
+        # 3️⃣ Abuse / 4️⃣ issue flow
+        action = self._act_on_decision(decision, user_input)
+        if action is not None:
+            return action
 
-            decision = json.loads(raw[start:end + 1])
+        # 5️⃣ QUERY FLOW (RAG) - answered already in combined mode
+        if self._answered_from_cache(prepared):
+            return {"output": prepared["cached"]}
+        if answer:
+            self._remember_answer(prepared, answer)
+            return {"output": answer}
+        return self._handle_query(user_input, prepared)
 
-        except Exception:
-            decision = {
-                "type": "query",
-                "severity": "low",
-                "category": "general_query",
-                "requires_action": False,
-                "has_abuse": False
-            }
+
+    # ==================== ASYNC ENTRY ====================
+    async def ainvoke(self, user_input: str) -> dict:
+        """
+        Asyncio version of invoke(): LLM calls use ChatGroq.ainvoke and
+        blocking work runs in a shared thread pool, so one worker can serve
+        many chats. Messages for the same agent are handled one at a time,
+        so the pending yes/no confirmation cannot be raced.
+        """
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+
+        async with self._async_lock:
+            result = await self._ainvoke(user_input)
+            await _run_blocking(self._record, user_input, result["output"])
+            return result
+
+    async def _ainvoke(self, user_input: str) -> dict:
+        if await _run_blocking(lambda: self.pending_action):
+            return await _run_blocking(self._handle_confirmation, user_input)
+
+        decision = classify_fast(user_input) if INTENT_FAST_PATH else None
+        prepared = None
+        answer = None
+
+        if decision is not None:
+            record_decision("rule", decision)
+        elif AGENT_COMBINED_MODE and self.retriever:
+            prepared = await _run_blocking(self._prepare_query, user_input)
+            if prepared["docs"]:
+                decision, answer = await self._aclassify_and_answer(prepared)
+            else:
+                decision = await self._aclassify_with_llm(user_input)
+        else:
+            decision = await self._aclassify_with_llm(user_input)
+
+        action = await _run_blocking(self._act_on_decision, decision, user_input)
+        if action is not None:
+            return action
+
+        if self._answered_from_cache(prepared):
+            return {"output": prepared["cached"]}
+        if answer:
+            self._remember_answer(prepared, answer)
+            return {"output": answer}
+        return await self._ahandle_query(user_input, prepared)
+
+
+    # ==================== STREAMING ENTRY ====================
+    def stream(self, user_input: str):
+        """
+        Same routing as invoke(), but yields the reply as text chunks.
+        RAG answers are streamed token by token from Groq; every other
+        reply is yielded in one piece.
+        """
+        reply = ""
+        for chunk in self._stream(user_input):
+            reply += chunk
+            yield chunk
+        self._record(user_input, reply)
+
+    def _stream(self, user_input: str):
+        if self.pending_action:
+            yield self._handle_confirmation(user_input)["output"]
+            return
+
+        decision = classify_fast(user_input) if INTENT_FAST_PATH else None
+        prepared = None
+
+        if decision is not None:
+            record_decision("rule", decision)
+        elif AGENT_COMBINED_MODE and self.retriever:
+            prepared = self._prepare_query(user_input)
+            if prepared["docs"]:
+                yield from self._stream_combined(prepared)
+                return
+            decision = self._classify_with_llm(user_input)
+        else:
+            decision = self._classify_with_llm(user_input)
+
+        action = self._act_on_decision(decision, user_input)
+        if action is not None:
+            yield action["output"]
+            return
+
+        if self._answered_from_cache(prepared):
+            yield prepared["cached"]
+            return
+
+        yield from self._stream_query(user_input, prepared)
+
+
+    # ==================== DECISION ====================
+    def _act_on_decision(self, decision: dict, user_input: str):
+        """Return the reply for abuse / issue decisions, or None for queries."""
 
         # 3️⃣ Abuse handling
         if decision.get("has_abuse"):
@@ -109,7 +760,7 @@ class EnterpriseAgent:
             }
 
         # 4️⃣ ISSUE FLOW
-        if decision["type"] == "issue" and decision["requires_action"]:
+        if decision.get("type") == "issue" and decision.get("requires_action"):
             self.pending_action = {
                 "category": decision.get("category"),
                 "query": user_input
@@ -125,8 +776,154 @@ class EnterpriseAgent:
                 )
             }
 
-        # 5️⃣ QUERY FLOW (RAG)
-        return self._handle_query(user_input)
+        return None
+
+
+    @staticmethod
+    def _answered_from_cache(prepared: dict) -> bool:
+        """True when a message the LLM classified as a query has a cached answer."""
+        if prepared is None or prepared["cached"] is None:
+            return False
+        record_decision("answer_cache")
+        return True
+
+
+    # ==================== LLM CLASSIFIER ====================
+    @staticmethod
+    def _parse_decision(raw: str) -> dict:
+        start = raw.find("{")
+        end = raw.rfind("}")
+        if start == -1 or end == -1:
+            raise ValueError("No JSON found")
+        return json.loads(raw[start:end + 1])
+
+    def _classify_with_llm(self, user_input: str) -> dict:
+        prompt = ISSUE_DETECTION_PROMPT.format(query=user_input)
+
+        try:
+            response = llm.invoke(prompt)
+            decision = self._parse_decision(response.content.strip())
+            record_decision("llm")
+
+        except Exception:
+            record_decision("llm_error")
+            decision = dict(DEFAULT_DECISION)
+
+        return decision
+
+    async def _aclassify_with_llm(self, user_input: str) -> dict:
+        prompt = ISSUE_DETECTION_PROMPT.format(query=user_input)
+
+        try:
+            response = await llm.ainvoke(prompt)
+            decision = self._parse_decision(response.content.strip())
+            record_decision("llm")
+
+        except Exception:
+            record_decision("llm_error")
+            decision = dict(DEFAULT_DECISION)
+
+        return decision
+
+    def _parse_combined(self, raw: str) -> tuple:
+        """Split a combined reply into (decision, answer or None)."""
+        header, _, answer = raw.partition(ANSWER_MARKER)
+        answer = answer.strip() or None
+
+        try:
+            decision = self._parse_decision(header)
+            record_decision("combined")
+        except Exception:
+            # Unparseable header: treat as a question, keep any answer text
+            record_decision("llm_error")
+            decision = dict(DEFAULT_DECISION)
+            if answer is None and ANSWER_MARKER not in raw:
+                answer = raw or None
+
+        return decision, answer
+
+    def _classify_and_answer(self, prepared: dict) -> tuple:
+        """
+        One LLM call that returns the intent decision and, for questions,
+        the cited answer. Returns (decision, answer or None).
+        """
+        prompt = CLASSIFY_AND_ANSWER_PROMPT.format(
+            context=prepared["context"],
+            query=prepared["query"]
+        )
+
+        try:
+            raw = llm.invoke(prompt).content.strip()
+        except Exception:
+            record_decision("llm_error")
+            return dict(DEFAULT_DECISION), None
+
+        return self._parse_combined(raw)
+
+    async def _aclassify_and_answer(self, prepared: dict) -> tuple:
+        prompt = CLASSIFY_AND_ANSWER_PROMPT.format(
+            context=prepared["context"],
+            query=prepared["query"]
+        )
+
+        try:
+            raw = (await llm.ainvoke(prompt)).content.strip()
+        except Exception:
+            record_decision("llm_error")
+            return dict(DEFAULT_DECISION), None
+
+        return self._parse_combined(raw)
+
+    def _stream_combined(self, prepared: dict):
+        """
+        Streaming variant of _classify_and_answer: buffer until the ANSWER:
+        marker, act on the decision, then pass answer tokens straight through.
+        """
+        prompt = CLASSIFY_AND_ANSWER_PROMPT.format(
+            context=prepared["context"],
+            query=prepared["query"]
+        )
+        chunks = llm.stream(prompt)
+
+        buffer = ""
+        for chunk in chunks:
+            buffer += chunk.content
+            if ANSWER_MARKER in buffer:
+                break
+
+        header, marker, first_tokens = buffer.partition(ANSWER_MARKER)
+        if not marker:
+            # No marker before the stream ended: parse it like a blocking reply
+            decision, answer = self._parse_combined(buffer.strip())
+        else:
+            decision, answer = self._parse_combined(header + marker)
+
+        action = self._act_on_decision(decision, prepared["query"])
+        if action is not None:
+            yield action["output"]
+            return
+
+        if not marker:
+            if answer:
+                self._remember_answer(prepared, answer)
+                yield answer
+            else:
+                yield from self._stream_query(prepared["query"], prepared)
+            return
+
+        answer = first_tokens.lstrip()
+        if answer:
+            yield answer
+        for chunk in chunks:
+            text = chunk.content if answer else chunk.content.lstrip()
+            if text:
+                answer += text
+                yield text
+
+        if answer.strip():
+            self._remember_answer(prepared, answer.strip())
+        else:
+            yield from self._stream_query(prepared["query"], prepared)
 
 
     # ==================== CONFIRMATION ====================
@@ -143,9 +940,10 @@ class EnterpriseAgent:
             return {"output": "Action cancelled. How else can I help?"}
 
         # Get user information
-        user_name = self.user_info.get('full_name', 'User')
-        user_email = self.user_info.get('email', '')
-        user_id = self.user_info.get('id', None)
+        user_info = self.user_info
+        user_name = user_info.get('full_name', 'User')
+        user_email = user_info.get('email', '')
+        user_id = user_info.get('id', None)
 
         if action["category"] == "hr_meeting":
             result = schedule_meeting(
@@ -166,68 +964,146 @@ class EnterpriseAgent:
         return {"output": result["message"]}
 
 
+    # ==================== RETRIEVAL ====================
+    def _embed_query(self, key: str) -> list:
+        embedding = query_embedding_cache.get(key)
+        if embedding is None:
+            embedding = self.retriever.embed_query(key)
+            query_embedding_cache.set(key, embedding)
+        return embedding
+
+    def _retrieve(self, key: str, version, vector_db, embedding) -> tuple:
+        """
+        Retrieve (documents, similarity scores) for a normalized query,
+        skipping the FAISS search for questions already seen against the
+        same index version.
+        """
+        retrieval_key = (
+            version,
+            key,
+            self.retriever.search_type,
+            tuple(sorted(self.retriever.search_kwargs.items()))
+        )
+
+        hits = retrieval_cache.get(retrieval_key)
+        if hits is None:
+            hits = self.retriever.search(vector_db, embedding, key)
+            retrieval_cache.set(retrieval_key, hits)
+
+        docs = self.retriever.get_documents(vector_db, hits)
+        return docs, [score for _, score in hits]
+
+
     # ==================== QUERY HANDLER ====================
-    def _handle_query(self, query: str) -> dict:
+    def _prepare_query(self, query: str) -> dict:
+        """
+        Everything before the answer LLM call: query embedding, semantic
+        answer-cache lookup, retrieval, optional reranking and context
+        assembly.
+        """
+        key = normalize_query(query)
+        version, vector_db = self.retriever.snapshot()
+        embedding = self._embed_query(key)
+
+        prepared = {
+            "query": query,
+            "embedding": embedding,
+            "namespace": (version, ANSWER_PROMPT_HASH),
+            "cached": None,
+            "docs": [],
+            "context": "",
+            "context_tokens": 0,
+        }
+
+        if ANSWER_CACHE_ENABLED:
+            prepared["cached"] = answer_cache.get(embedding, prepared["namespace"])
+            if prepared["cached"] is not None:
+                return prepared
+
+        docs, scores = self._retrieve(key, version, vector_db, embedding)
+        if RERANK_ENABLED:
+            docs, scores = rerank(query, docs, scores)
+        prepared["docs"] = docs
+
+        # Highest-scoring chunks with page information, within the token budget
+        packed = pack_context(docs, scores)
+        prepared["context"] = packed["context"]
+        prepared["context_tokens"] = packed["tokens"]
+
+        return prepared
+
+    def _remember_answer(self, prepared: dict, answer: str):
+        if ANSWER_CACHE_ENABLED and prepared is not None:
+            answer_cache.set(prepared["embedding"], prepared["namespace"], answer)
+
+    def _handle_query(self, query: str, prepared: dict = None) -> dict:
         if not self.retriever:
             return {"output": "Knowledge base unavailable."}
 
-        docs = self.retriever.invoke(query)
+        prepared = prepared or self._prepare_query(query)
 
-        if not docs:
-            return {
-                "output": (
-                    "This question is OUT OF DOCUMENTS - "
-                    "I can only answer questions related to the provided enterprise documents."
-                )
-            }
+        if prepared["cached"] is not None:
+            return {"output": prepared["cached"]}
+
+        if not prepared["docs"]:
+            return {"output": OUT_OF_DOCUMENTS}
 
-        # Build context with page information for each chunk
-        context_with_pages = ""
-        for idx, d in enumerate(docs[:3], 1):
-            page = d.metadata.get("page", "N/A")
-            content = d.page_content[:800]
-            context_with_pages += f"(Page {page})\n{content}\n\n---\n\n"
-
-        answer_prompt = f"""
-You are an expert enterprise assistant. Provide clear, well-structured answers using the context provided.
-
-INSTRUCTIONS:
-1. Answer ONLY using the context below - do NOT use outside knowledge
-2. Format your response as follows:
-   - Start with a brief summary paragraph (2-3 sentences) that answers the main question
-   - Then provide key details in bullet points below
-3. FOR EACH FACT IN BULLET POINTS: Include [Page X] citation showing the page number where that information comes from
-4. Keep each bullet point focused on one key piece of information
-5. Be professional and informative
-
-CITATION FORMAT:
-- Add [Page X] at the end of each bullet point with the actual page number
-- Example: "Total complaints reported: 44 [Page 12]"
-- Example: "Percentage of female employees: 0.09% [Page 3]"
-- Example: "Policy details in Corporate Governance Report [Page 8]"
-
-RULES:
-- Do NOT use outside knowledge
-- ALWAYS include [Page X] citations in bullet points for all factual statements
-- Start with a summary paragraph, then use bullet points with page citations
-- If the answer is completely missing from context, reply exactly:
-"This question is OUT OF DOCUMENTS - I can only answer questions related to the provided enterprise documents."
-
-Context with Page Numbers:
-{context_with_pages}
-
-Question: {query}
-
-Answer:
-"""
+        answer_prompt = RAG_ANSWER_PROMPT.format(context=prepared["context"], query=query)
 
         response = llm.invoke(answer_prompt)
+        self._remember_answer(prepared, response.content)
+
+        return {
+            "output": response.content
+        }
+
+
+    async def _ahandle_query(self, query: str, prepared: dict = None) -> dict:
+        if not self.retriever:
+            return {"output": "Knowledge base unavailable."}
+
+        prepared = prepared or await _run_blocking(self._prepare_query, query)
+
+        if prepared["cached"] is not None:
+            return {"output": prepared["cached"]}
+
+        if not prepared["docs"]:
+            return {"output": OUT_OF_DOCUMENTS}
+
+        answer_prompt = RAG_ANSWER_PROMPT.format(context=prepared["context"], query=query)
+
+        response = await llm.ainvoke(answer_prompt)
+        self._remember_answer(prepared, response.content)
 
         return {
             "output": response.content
         }
 
+    def _stream_query(self, query: str, prepared: dict = None):
+        if not self.retriever:
+            yield "Knowledge base unavailable."
+            return
+
+        prepared = prepared or self._prepare_query(query)
+
+        if prepared["cached"] is not None:
+            yield prepared["cached"]
+            return
+
+        if not prepared["docs"]:
+            yield OUT_OF_DOCUMENTS
+            return
+
+        answer_prompt = RAG_ANSWER_PROMPT.format(context=prepared["context"], query=query)
+
+        answer = ""
+        for chunk in llm.stream(answer_prompt):
+            answer += chunk.content
+            yield chunk.content
+
+        self._remember_answer(prepared, answer)
+
 
 # ==================== FACTORY ====================
-def get_agent(user_info: dict = None):
-    return EnterpriseAgent(user_info=user_info)
+def get_agent(user_info: dict = None, session_id: str = None, store=None):
+    return EnterpriseAgent(user_info=user_info, session_id=session_id, store=store)
@@ -1,10 +1,20 @@
 import sqlite3
 import bcrypt
 import os
+import uuid
 from datetime import datetime
 
 DB_PATH = "enterprise_db.sqlite"
 
+# Signed session tokens {uid, username, sid}: the API takes them as a bearer
+# token, the Streamlit app keeps one in the URL, so a reload or a server
+# restart restores both the login and the chat session (pending yes/no,
+# history). Set API_SECRET_KEY to the same value for every process; when it
+# is unset a random key is generated once into SESSION_SECRET_FILE.
+API_SECRET_KEY = os.getenv("API_SECRET_KEY", "")
+API_TOKEN_TTL = int(os.getenv("API_TOKEN_TTL", 12 * 3600))   # seconds a login stays valid
+SESSION_SECRET_FILE = os.getenv("SESSION_SECRET_FILE", ".session_secret")
+
 def init_user_db():
     """Initialize the users table if it doesn't exist."""
     conn = sqlite3.connect(DB_PATH)
@@ -134,3 +144,46 @@ def get_user_by_username(username):
     except Exception as e:
         conn.close()
         return None
+
+def _local_secret():
+    """Key shared by the API and Streamlit processes started in this folder."""
+    if not os.path.exists(SESSION_SECRET_FILE):
+        print(f"⚠️ API_SECRET_KEY not set, generating one in {SESSION_SECRET_FILE}.")
+        tmp_path = f"{SESSION_SECRET_FILE}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(os.urandom(32).hex())
+        os.chmod(tmp_path, 0o600)
+        try:
+            os.link(tmp_path, SESSION_SECRET_FILE)   # first process to get here wins
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp_path)
+    with open(SESSION_SECRET_FILE, encoding="utf-8") as f:
+        return f.read().strip()
+
+_serializer = None
+
+def _tokens():
+    global _serializer
+    if _serializer is None:
+        from itsdangerous import URLSafeTimedSerializer
+        _serializer = URLSafeTimedSerializer(API_SECRET_KEY or _local_secret(), salt="chat-session")
+    return _serializer
+
+def issue_session_token(user, prefix="api"):
+    """Return (signed token, chat session id) for a logged-in user; the id is new and random."""
+    session_id = f"{prefix}-{uuid.uuid4().hex}"
+    token = _tokens().dumps({'uid': user['id'], 'username': user['username'], 'sid': session_id})
+    return token, session_id
+
+def read_session_token(token):
+    """Payload {uid, username, sid} of a valid, unexpired token, or None."""
+    from itsdangerous import BadSignature   # SignatureExpired is a subclass
+
+    if not token:
+        return None
+    try:
+        return _tokens().loads(token, max_age=API_TOKEN_TTL)
+    except BadSignature:
+        return None
@@ -0,0 +1,158 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def normalize_query(query: str) -> str:
+    """Canonical cache key for a user question (case, spacing, trailing punctuation)."""
+    return re.sub(r"\s+", " ", query.lower()).strip().rstrip("?!.").strip()
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with an optional time-to-live.
+    Keeps hit/miss counters so callers can report hit rates.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                value, stored_at = item
+                if self.ttl is None or time.monotonic() - stored_at < self.ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+class SemanticCache:
+    """
+    Similarity-keyed cache: a lookup hits when a stored embedding in the
+    same namespace has cosine similarity >= threshold with the query.
+
+    Entries expire after ttl seconds; beyond maxsize the least recently
+    used entry is evicted. Lookups are a single matrix-vector product per
+    namespace, which stays cheap at a few thousand entries.
+    """
+
+    def __init__(self, threshold: float = 0.95, maxsize: int = 512, ttl: float = None):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = {}          # namespace -> list of [vector, value, stored_at, last_used]
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _unit(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expire(self, namespace, now: float):
+        entries = self._entries.get(namespace, [])
+        if self.ttl is not None:
+            fresh = [entry for entry in entries if now - entry[2] < self.ttl]
+            self._size -= len(entries) - len(fresh)
+            entries = fresh
+            if entries:
+                self._entries[namespace] = entries
+            else:
+                self._entries.pop(namespace, None)
+        return entries
+
+    def get(self, embedding, namespace):
+        vector = self._unit(embedding)
+        now = time.monotonic()
+        with self._lock:
+            entries = self._expire(namespace, now)
+            if entries:
+                similarities = np.stack([entry[0] for entry in entries]) @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    entries[best][3] = now
+                    self.hits += 1
+                    return entries[best][1]
+            self.misses += 1
+            return None
+
+    def set(self, embedding, namespace, value):
+        now = time.monotonic()
+        with self._lock:
+            self._expire(namespace, now)
+            self._entries.setdefault(namespace, []).append([self._unit(embedding), value, now, now])
+            self._size += 1
+            while self._size > self.maxsize:
+                self._evict_lru()
+
+    def _evict_lru(self):
+        oldest_ns, oldest_idx, oldest_used = None, None, None
+        for namespace, entries in self._entries.items():
+            for idx, entry in enumerate(entries):
+                if oldest_used is None or entry[3] < oldest_used:
+                    oldest_ns, oldest_idx, oldest_used = namespace, idx, entry[3]
+        if oldest_ns is None:
+            self._size = 0
+            return
+        del self._entries[oldest_ns][oldest_idx]
+        if not self._entries[oldest_ns]:
+            del self._entries[oldest_ns]
+        self._size -= 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": self._size,
+                "maxsize": self.maxsize,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
@@ -0,0 +1,161 @@
+import os
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ============ CONFIGURATION ============
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 1000))
+CONTEXT_MIN_CHUNK_TOKENS = int(os.getenv("CONTEXT_MIN_CHUNK_TOKENS", 40))
+TOKEN_ENCODING = "cl100k_base"
+
+# Overlap between neighbouring chunks is at most chunk_overlap (80 chars);
+# shorter matches are treated as coincidence
+MIN_OVERLAP_CHARS = 20
+MAX_OVERLAP_CHARS = 200
+
+CHUNK_SEPARATOR = "\n\n---\n\n"
+
+
+# ============ TOKEN COUNTING ============
+_encoder = None
+_encoder_loaded = False
+_encoder_lock = threading.Lock()
+
+
+def _get_encoder():
+    """tiktoken encoder, or None when tiktoken/its vocabulary is unavailable."""
+    global _encoder, _encoder_loaded
+    if not _encoder_loaded:
+        with _encoder_lock:
+            if not _encoder_loaded:
+                try:
+                    import tiktoken
+                    _encoder = tiktoken.get_encoding(TOKEN_ENCODING)
+                except Exception as e:
+                    print(f"⚠️ tiktoken unavailable ({e}), estimating tokens as chars / 4")
+                    _encoder = None
+                _encoder_loaded = True
+    return _encoder
+
+
+def count_tokens(text: str) -> int:
+    encoder = _get_encoder()
+    if encoder is None:
+        return (len(text) + 3) // 4
+    return len(encoder.encode(text))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    encoder = _get_encoder()
+    if encoder is None:
+        return text[:max_tokens * 4]
+    return encoder.decode(encoder.encode(text)[:max_tokens])
+
+
+# ============ DEDUPLICATION ============
+def _overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of `left` that is a prefix of `right`."""
+    longest = min(len(left), len(right), MAX_OVERLAP_CHARS)
+    for size in range(longest, MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _dedupe(text: str, doc, packed: list) -> str:
+    """
+    Drop text already present in the packed chunks: the whole chunk when it
+    is contained in one, otherwise the chunk_overlap region it shares with a
+    neighbouring chunk of the same file.
+    """
+    source = doc.metadata.get("source")
+    for other_doc, other_text in packed:
+        if text in other_text:
+            return ""
+        if other_doc.metadata.get("source") != source:
+            continue
+        # Neighbour before this chunk: strip the shared head
+        head = _overlap(other_text, text)
+        if head:
+            text = text[head:].lstrip()
+            continue
+        # Neighbour after this chunk: strip the shared tail
+        tail = _overlap(text, other_text)
+        if tail:
+            text = text[:-tail].rstrip()
+    return text
+
+
+# ============ PACKING ============
+_stats = {"packed": 0, "tokens": 0, "chunks": 0, "dropped_chunks": 0, "deduped_chars": 0}
+_stats_lock = threading.Lock()
+
+
+def _format_chunk(doc, text: str) -> str:
+    return f"(Page {doc.metadata.get('page', 'N/A')})\n{text}{CHUNK_SEPARATOR}"
+
+
+def pack_context(docs: list, scores: list = None, budget: int = CONTEXT_TOKEN_BUDGET) -> dict:
+    """
+    Fill a token budget with the highest-scoring chunks.
+
+    Chunks are taken best score first, with text that is already in the
+    context removed. The last chunk that fits is truncated to the remaining
+    budget, as long as at least CONTEXT_MIN_CHUNK_TOKENS remain.
+    Returns {"context", "tokens", "chunks", "dropped_chunks", "deduped_chars"}.
+    """
+    if scores is None:
+        scores = [0.0] * len(docs)
+    ranked = sorted(zip(docs, scores), key=lambda pair: pair[1], reverse=True)
+
+    packed = []
+    parts = []
+    used = 0
+    deduped = 0
+
+    for doc, _ in ranked:
+        remaining = budget - used
+        if remaining < CONTEXT_MIN_CHUNK_TOKENS:
+            break
+
+        text = _dedupe(doc.page_content.strip(), doc, packed)
+        deduped += len(doc.page_content.strip()) - len(text)
+        if not text:
+            continue
+
+        part = _format_chunk(doc, text)
+        tokens = count_tokens(part)
+        if tokens > remaining:
+            overhead = count_tokens(_format_chunk(doc, ""))
+            text = truncate_tokens(text, remaining - overhead)
+            part = _format_chunk(doc, text)
+            tokens = count_tokens(part)
+
+        packed.append((doc, text))
+        parts.append(part)
+        used += tokens
+
+    result = {
+        "context": "".join(parts),
+        "tokens": used,
+        "chunks": len(parts),
+        "dropped_chunks": len(docs) - len(parts),
+        "deduped_chars": deduped,
+    }
+
+    with _stats_lock:
+        _stats["packed"] += 1
+        for key in ("tokens", "chunks", "dropped_chunks", "deduped_chars"):
+            _stats[key] += result[key]
+
+    return result
+
+
+def get_context_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["avg_tokens"] = round(stats["tokens"] / stats["packed"], 1) if stats["packed"] else 0.0
+    stats["budget"] = CONTEXT_TOKEN_BUDGET
+    stats["tokenizer"] = TOKEN_ENCODING if _get_encoder() is not None else "chars/4"
+    return stats
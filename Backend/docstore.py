@@ -0,0 +1,161 @@
+import os
+import json
+import mmap
+from collections.abc import Mapping
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_community.docstore.base import Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+
+# ============ CONFIGURATION ============
+DOCSTORE_DIR = "docstore"
+TEXT_FILE = "text.bin"       # every chunk's UTF-8 text, back to back
+ROWS_FILE = "rows.npy"       # per FAISS row: text offset/length, source, page
+IDS_FILE = "ids.npy"         # per FAISS row: docstore id
+ORDER_FILE = "order.npy"     # rows sorted by id, for lookups by id
+META_FILE = "meta.json"      # source names and any metadata beyond source/page
+
+ROW_DTYPE = np.dtype([
+    ("offset", "<i8"),
+    ("length", "<i4"),
+    ("source", "<i4"),
+    ("page", "<i4"),
+])
+NO_PAGE = -1
+
+
+def has_compact_docstore(index_path: str) -> bool:
+    return os.path.exists(os.path.join(index_path, DOCSTORE_DIR, META_FILE))
+
+
+# ============ WRITER ============
+def save_compact_docstore(index_path: str, docstore, index_to_docstore_id: dict):
+    """
+    Write the documents of a FAISS store in row order: one text blob plus
+    fixed-width numpy columns, so readers can memory-map everything.
+    """
+    path = os.path.join(index_path, DOCSTORE_DIR)
+    os.makedirs(path, exist_ok=True)
+
+    count = len(index_to_docstore_id)
+    rows = np.zeros(count, dtype=ROW_DTYPE)
+    ids = []
+    sources = {}
+    extra = {}
+    offset = 0
+
+    with open(os.path.join(path, TEXT_FILE), "wb") as f:
+        for row in range(count):
+            doc_id = index_to_docstore_id[row]
+            doc = docstore.search(doc_id)
+            data = doc.page_content.encode("utf-8")
+            f.write(data)
+
+            metadata = dict(doc.metadata)
+            source = metadata.pop("source", None)
+            page = metadata.pop("page", None)
+            rows[row] = (
+                offset,
+                len(data),
+                sources.setdefault(source, len(sources)),
+                NO_PAGE if page is None else page,
+            )
+            if metadata:
+                extra[str(row)] = metadata
+            ids.append(doc_id.encode("utf-8"))
+            offset += len(data)
+
+    id_array = np.array(ids, dtype=f"S{max((len(i) for i in ids), default=1)}")
+    np.save(os.path.join(path, ROWS_FILE), rows)
+    np.save(os.path.join(path, IDS_FILE), id_array)
+    np.save(os.path.join(path, ORDER_FILE), np.argsort(id_array, kind="stable").astype("<i8"))
+
+    with open(os.path.join(path, META_FILE), "w", encoding="utf-8") as f:
+        json.dump({"count": count, "sources": list(sources), "extra": extra}, f)
+
+
+# ============ READER ============
+class RowIds(Mapping):
+    """Read-only FAISS row -> docstore id mapping backed by the ids column."""
+
+    def __init__(self, ids: np.ndarray):
+        self._ids = ids
+
+    def __getitem__(self, row):
+        if not 0 <= row < len(self._ids):
+            raise KeyError(row)
+        return self._ids[row].decode("utf-8")
+
+    def __iter__(self):
+        return iter(range(len(self._ids)))
+
+    def __len__(self):
+        return len(self._ids)
+
+
+class CompactDocstore(Docstore):
+    """
+    Read-only docstore over the files written by save_compact_docstore.
+
+    The columns and text blob are memory-mapped, so opening a version costs
+    a few file reads regardless of corpus size, and a Document is only built
+    when search() asks for it.
+    """
+
+    def __init__(self, index_path: str):
+        path = os.path.join(index_path, DOCSTORE_DIR)
+        with open(os.path.join(path, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        self._sources = meta["sources"]
+        self._extra = meta["extra"]
+
+        self._rows = np.load(os.path.join(path, ROWS_FILE), mmap_mode="r")
+        self._ids = np.load(os.path.join(path, IDS_FILE), mmap_mode="r")
+        self._order = np.load(os.path.join(path, ORDER_FILE), mmap_mode="r")
+
+        self._text = None
+        if meta["count"] and os.path.getsize(os.path.join(path, TEXT_FILE)):
+            with open(os.path.join(path, TEXT_FILE), "rb") as f:
+                self._text = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def index_to_docstore_id(self) -> RowIds:
+        return RowIds(self._ids)
+
+    def find_row(self, doc_id: str):
+        """Row holding doc_id (binary search over the sorted ids), or None."""
+        key = doc_id.encode("utf-8")
+        low, high = 0, len(self._order)
+        while low < high:
+            mid = (low + high) // 2
+            if self._ids[self._order[mid]] < key:
+                low = mid + 1
+            else:
+                high = mid
+        if low < len(self._order) and self._ids[self._order[low]] == key:
+            return int(self._order[low])
+        return None
+
+    def get_row(self, row: int) -> Document:
+        offset, length, source, page = self._rows[row].tolist()
+        text = self._text[offset:offset + length].decode("utf-8") if length else ""
+        metadata = {"source": self._sources[source]}
+        if page != NO_PAGE:
+            metadata["page"] = page
+        metadata.update(self._extra.get(str(row), {}))
+        return Document(page_content=text, metadata=metadata)
+
+    def search(self, search: str):
+        row = self.find_row(search)
+        if row is None:
+            return f"ID {search} not found."
+        return self.get_row(row)
+
+    def materialize(self) -> tuple:
+        """(InMemoryDocstore, index_to_docstore_id dict) for a store that will be modified."""
+        ids = self.index_to_docstore_id()
+        documents = {ids[row]: self.get_row(row) for row in range(len(self))}
+        return InMemoryDocstore(documents), dict(ids.items())
@@ -0,0 +1,166 @@
+import os
+import json
+import argparse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# ============ CONFIGURATION ============
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# torch: sentence-transformers on PyTorch; onnx / onnx-int8: onnxruntime on an
+# exported (optionally int8-quantized) copy of the same model
+EMBEDDING_BACKEND = os.getenv("RAG_EMBEDDING_BACKEND", "torch")
+ONNX_MODEL_DIR = os.getenv("RAG_ONNX_MODEL_DIR", os.path.join(BASE_DIR, "models", "all-MiniLM-L6-v2-onnx"))
+ONNX_THREADS = int(os.getenv("RAG_ONNX_THREADS", 0))   # 0 = onnxruntime default
+ONNX_BATCH_SIZE = int(os.getenv("RAG_ONNX_BATCH_SIZE", 32))
+
+ONNX_FILES = {"onnx": "model.onnx", "onnx-int8": "model.int8.onnx"}
+EXPORT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+MAX_SEQ_LENGTH = 256   # sentence-transformers' max_seq_length for all-MiniLM-L6-v2
+OPSET_VERSION = 14
+
+
+# ============ ONNX RUNTIME BACKEND ============
+class OnnxEmbeddings(Embeddings):
+    """
+    all-MiniLM-L6-v2 on onnxruntime: the same tokenizer, mean pooling and
+    L2 normalization as sentence-transformers, without importing PyTorch.
+    """
+
+    def __init__(self, model_dir: str = ONNX_MODEL_DIR, quantized: bool = False,
+                 normalize: bool = True, batch_size: int = ONNX_BATCH_SIZE, threads: int = ONNX_THREADS):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_path = os.path.join(model_dir, ONNX_FILES["onnx-int8" if quantized else "onnx"])
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"{model_path} not found - export it with: python Backend/embeddings.py --export"
+            )
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self._inputs = {i.name for i in self.session.get_inputs()}
+
+        self.normalize = normalize
+        self.batch_size = batch_size
+
+    def _encode(self, texts: list) -> np.ndarray:
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start:start + self.batch_size])
+            mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+            feed = {
+                "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                "attention_mask": mask,
+                "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+            }
+            hidden = self.session.run(None, {k: v for k, v in feed.items() if k in self._inputs})[0]
+
+            # Mean over real tokens, as sentence-transformers' Pooling layer does
+            weights = mask[:, :, None].astype(np.float32)
+            pooled = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+            if self.normalize:
+                pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+            vectors.append(pooled.astype(np.float32))
+        return np.vstack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+
+    def embed_documents(self, texts: list) -> list:
+        return self._encode(list(texts)).tolist()
+
+    def embed_query(self, text: str) -> list:
+        return self._encode([text])[0].tolist()
+
+
+def create_embeddings(model_name: str, normalize: bool = True, backend: str = EMBEDDING_BACKEND):
+    if backend in ONNX_FILES:
+        return OnnxEmbeddings(quantized=backend == "onnx-int8", normalize=normalize)
+    if backend != "torch":
+        raise ValueError(f"Unknown RAG_EMBEDDING_BACKEND {backend!r} (torch, onnx or onnx-int8)")
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(
+        model_name=model_name,
+        encode_kwargs={"normalize_embeddings": normalize}  # ✅ IMPORTANT
+    )
+
+
+# ============ EXPORT ============
+def export_onnx(model_name: str = EXPORT_MODEL, out_dir: str = ONNX_MODEL_DIR, quantize: bool = True) -> dict:
+    """
+    Export the transformer to ONNX (dynamic batch and sequence axes) with its
+    fast tokenizer, and optionally an int8 dynamically-quantized copy.
+    Needs torch and transformers (and onnxruntime for quantization) once,
+    at export time only.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(out_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+
+    class _Encoder(torch.nn.Module):
+        def __init__(self, transformer):
+            super().__init__()
+            self.transformer = transformer
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.transformer(
+                input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids
+            )[0]
+
+    sample = tokenizer(["export sample sentence"], return_tensors="pt")
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic = {name: {0: "batch", 1: "sequence"} for name in names}
+    dynamic["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    model_path = os.path.join(out_dir, ONNX_FILES["onnx"])
+    with torch.no_grad():
+        torch.onnx.export(
+            _Encoder(model),
+            tuple(sample[name] for name in names),
+            model_path,
+            input_names=names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic,
+            opset_version=OPSET_VERSION,
+        )
+    tokenizer.save_pretrained(out_dir)   # writes tokenizer.json for the tokenizers runtime
+    files = [ONNX_FILES["onnx"]]
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(model_path, os.path.join(out_dir, ONNX_FILES["onnx-int8"]), weight_type=QuantType.QInt8)
+        files.append(ONNX_FILES["onnx-int8"])
+
+    info = {"model": model_name, "opset": OPSET_VERSION, "max_seq_length": MAX_SEQ_LENGTH, "files": files}
+    with open(os.path.join(out_dir, "export.json"), "w", encoding="utf-8") as f:
+        json.dump(info, f, indent=1)
+    return info
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the embedding model for the ONNX backends")
+    parser.add_argument("--export", action="store_true", help="export to ONNX (and int8)")
+    parser.add_argument("--model", default=EXPORT_MODEL, help="Hugging Face model to export")
+    parser.add_argument("--out", default=ONNX_MODEL_DIR, help="output directory (RAG_ONNX_MODEL_DIR)")
+    parser.add_argument("--no-quantize", action="store_true", help="skip the int8 copy")
+    args = parser.parse_args()
+
+    if not args.export:
+        parser.print_help()
+    else:
+        info = export_onnx(args.model, args.out, quantize=not args.no_quantize)
+        print(f"✅ Exported {info['model']} to {args.out}: {', '.join(info['files'])}")
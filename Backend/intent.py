@@ -0,0 +1,127 @@
+import re
+import threading
+
+# ==================== RULE-BASED INTENT TIER ====================
+# Compiled patterns that route obvious messages without any network call.
+# A rule only fires when it is confident; everything else returns None and
+# falls through to the LLM classifier (ISSUE_DETECTION_PROMPT).
+
+_ABUSE = re.compile(
+    r"\b(fuck\w*|shit\w*|bitch\w*|bastard|asshole|dickhead|motherfucker|wtf)\b",
+    re.IGNORECASE
+)
+
+_SCHEDULE = re.compile(
+    r"\b(schedule|book|set ?up|arrange|fix|request)\b.{0,40}\b(meet(ing)?|appointment|call|session|discussion)\b",
+    re.IGNORECASE
+)
+_HR = re.compile(r"\b(hr|human resources?|hrbp)\b", re.IGNORECASE)
+
+_IT_PROBLEM = re.compile(
+    r"(not working|isn'?t working|doesn'?t work|does not work|won'?t (start|open|load|connect|boot)|"
+    r"can'?t (log ?in|sign ?in|access|connect|open|print)|cannot (log ?in|sign ?in|access|connect|open|print)|"
+    r"unable to (log ?in|sign ?in|access|connect|open|print)|keeps? crashing|crash(ed|es|ing)?|"
+    r"\bbroken\b(?!\s+down)|frozen|freez(es|ing)|blue screen|\bbsod\b|locked out|reset my password|"
+    r"password (reset|expired))",
+    re.IGNORECASE
+)
+_IT_SUBJECTS = (
+    r"laptop|computer|desktop|pc|system|vpn|e-?mail|outlook|wi-?fi|internet|network|printer|"
+    r"software|app|application|portal|login|password|account|keyboard|mouse|monitor|screen|"
+    r"teams|browser|server|database|sap|jira"
+)
+_IT_SUBJECT = re.compile(rf"\b({_IT_SUBJECTS})\b", re.IGNORECASE)
+# "error" only counts next to the thing that fails: "VPN error", "error on my
+# laptop" - not "the error margin for our server business"
+_IT_ERROR = re.compile(
+    rf"\b({_IT_SUBJECTS})\s+errors?\b|\berrors?\s+(on|in|with|from)\s+(my\s+|the\s+)?({_IT_SUBJECTS})\b",
+    re.IGNORECASE
+)
+# Singular only: "we"/"our" is usually the company ("our revenue"), not a user
+_FIRST_PERSON = re.compile(r"\b(i|i'm|i am|my|me)\b", re.IGNORECASE)
+
+_QUESTION = re.compile(
+    r"^\s*(what|who|when|where|which|why|how|is|are|was|were|does|do|did|can you tell me|tell me|"
+    r"explain|list|show me|show|give me|summari[sz]e|describe)\b",
+    re.IGNORECASE
+)
+# Words that make a question worth a second opinion from the LLM
+_ACTION_HINT = re.compile(
+    r"\b(schedule|book|meet(ing)?|appointment|ticket|complain\w*|issue|problem|help me|fix)\b",
+    re.IGNORECASE
+)
+
+_stats = {
+    "rule": 0,            # decided by the compiled rules
+    "llm": 0,             # classification-only LLM call
+    "combined": 0,        # one LLM call that classified and answered
+    "answer_cache": 0,    # of the llm-classified queries, answered from the semantic cache (not in total)
+    "llm_error": 0,       # LLM call or JSON parse failed, defaulted to query
+    "rule_by_category": {},
+}
+_stats_lock = threading.Lock()
+
+
+def _decision(type_: str, category: str, requires_action: bool, severity: str = "low",
+              has_abuse: bool = False) -> dict:
+    return {
+        "type": type_,
+        "severity": severity,
+        "category": category,
+        "requires_action": requires_action,
+        "has_abuse": has_abuse,
+        "classifier": "rule",
+    }
+
+
+def classify_fast(text: str) -> dict:
+    """
+    Classify a message with compiled rules.
+    Returns a decision in the ISSUE_DETECTION_PROMPT format, or None when
+    the message is ambiguous and should go to the LLM.
+    """
+    if _ABUSE.search(text):
+        return _decision("query", "general_query", False, has_abuse=True)
+
+    question = _QUESTION.match(text)
+
+    # "Schedule a meeting with HR" is a request; "How do I schedule a meeting
+    # with HR?" is a how-to question, which the action hint sends to the LLM
+    if not question and _SCHEDULE.search(text) and _HR.search(text):
+        return _decision("issue", "hr_meeting", True, severity="medium")
+
+    # "My VPN keeps crashing" is a ticket; "What if my laptop crashes?" goes to the LLM
+    if not question and (_IT_PROBLEM.search(text) or _IT_ERROR.search(text)) \
+            and _IT_SUBJECT.search(text) and _FIRST_PERSON.search(text):
+        return _decision("issue", "it_issue", True, severity="medium")
+
+    if question:
+        rest = text[question.end():]
+        if not _ACTION_HINT.search(text) and not _IT_PROBLEM.search(text) \
+                and not _IT_ERROR.search(text) \
+                and not _FIRST_PERSON.search(rest):
+            return _decision("query", "general_query", False)
+
+    return None
+
+
+def record_decision(tier: str, decision: dict = None):
+    """Count which tier decided a message (see _stats for the tiers)."""
+    with _stats_lock:
+        _stats[tier] += 1
+        if tier == "rule" and decision:
+            key = "abuse" if decision.get("has_abuse") else decision.get("category")
+            _stats["rule_by_category"][key] = _stats["rule_by_category"].get(key, 0) + 1
+
+
+def get_intent_stats() -> dict:
+    with _stats_lock:
+        total = sum(
+            count for tier, count in _stats.items() if tier not in ("rule_by_category", "answer_cache")
+        )
+        return {
+            **_stats,
+            "rule_by_category": dict(_stats["rule_by_category"]),
+            "total": total,
+            "rule_rate": round(_stats["rule"] / total, 3) if total else 0.0,
+        }
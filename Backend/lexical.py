@@ -0,0 +1,185 @@
+import os
+import re
+import json
+from array import array
+from collections import Counter
+
+import numpy as np
+
+# ============ CONFIGURATION ============
+LEXICAL_DIR = "lexical"
+META_FILE = "meta.json"          # parameters and the term list
+OFFSETS_FILE = "offsets.npy"     # postings of term t are [offsets[t], offsets[t + 1])
+ROWS_FILE = "rows.npy"           # FAISS row of each posting
+WEIGHTS_FILE = "weights.npy"     # precomputed BM25 weight of each posting
+
+BM25_K1 = float(os.getenv("RAG_BM25_K1", 1.2))
+BM25_B = float(os.getenv("RAG_BM25_B", 0.75))
+
+# Numbers keep their separators ("1,234.5", "44.2"); everything else splits
+# on non-alphanumerics, so "CSR" and "FY24" stay whole tokens
+TOKEN_PATTERN = re.compile(r"\d+(?:[.,]\d+)+|[^\W_]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by can did do does for from had has have how i
+if in into is it its of on or our so than that the their them then there these
+they this to was we were what when where which who why will with you your
+""".split())
+
+
+def tokenize(text: str) -> list:
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if token[0].isdigit():
+            token = token.replace(",", "")   # "1,234" and "1234" match
+        tokens.append(token)
+    return tokens
+
+
+def has_lexical_index(index_path: str) -> bool:
+    return os.path.exists(os.path.join(index_path, LEXICAL_DIR, META_FILE))
+
+
+# ============ BUILD ============
+# Postings are weighted and written this many at a time
+WRITE_BLOCK_POSTINGS = 1 << 20
+
+
+def save_lexical_index(index_path: str, texts, k1: float = BM25_K1, b: float = BM25_B) -> dict:
+    """
+    Build a BM25 inverted index over `texts` (one per FAISS row, in row
+    order) and write it next to the vector index. The full BM25 term weight
+    (idf x saturated tf x length norm) is computed here, so a query only
+    sums weights. Returns {"documents", "terms", "postings"}.
+
+    Postings are collected per term in typed arrays (8 bytes each, no Python
+    object per posting), so they come out grouped by term without a sort.
+    They are then weighted a block of terms at a time and written straight
+    into memory-mapped .npy files, freeing each term's buffer as it goes.
+    """
+    term_ids = {}
+    postings = []            # term id -> array("i") of [row, tf, row, tf, ...]
+    lengths = array("i")
+
+    for row, text in enumerate(texts):
+        tokens = tokenize(text)
+        lengths.append(len(tokens))
+        for token, tf in Counter(tokens).items():
+            term = term_ids.get(token)
+            if term is None:
+                term = term_ids[token] = len(postings)
+                postings.append(array("i"))
+            postings[term].extend((row, tf))
+
+    count = len(lengths)
+    lengths = np.frombuffer(lengths, dtype=np.int32) if count else np.zeros(0, dtype=np.int32)
+    avg_length = float(lengths.mean()) if count else 0.0
+    doc_freq = np.fromiter((len(p) // 2 for p in postings), dtype=np.int64, count=len(postings))
+    offsets = np.zeros(len(postings) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(doc_freq)
+    total = int(offsets[-1])
+    idf = np.log(1.0 + (count - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+
+    path = os.path.join(index_path, LEXICAL_DIR)
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, OFFSETS_FILE), offsets)
+    rows_out = np.lib.format.open_memmap(
+        os.path.join(path, ROWS_FILE), mode="w+", dtype=np.int32, shape=(total,)
+    )
+    weights_out = np.lib.format.open_memmap(
+        os.path.join(path, WEIGHTS_FILE), mode="w+", dtype=np.float32, shape=(total,)
+    )
+
+    def write_block(first: int, last: int, block: array):
+        pairs = np.frombuffer(block, dtype=np.int32).reshape(-1, 2)
+        rows = pairs[:, 0]
+        tfs = pairs[:, 1].astype(np.float32)
+        terms = np.repeat(np.arange(first, last), doc_freq[first:last])
+        norm = k1 * (1.0 - b + b * lengths[rows] / max(avg_length, 1e-9))
+        start, end = offsets[first], offsets[last]
+        rows_out[start:end] = rows
+        weights_out[start:end] = idf[terms] * tfs * (k1 + 1.0) / (tfs + norm)
+
+    first, block = 0, array("i")
+    for term in range(len(postings)):
+        block.extend(postings[term])
+        postings[term] = None
+        if len(block) >= 2 * WRITE_BLOCK_POSTINGS:
+            write_block(first, term + 1, block)
+            first, block = term + 1, array("i")
+    if block:
+        write_block(first, len(postings), block)
+    rows_out.flush()
+    weights_out.flush()
+
+    with open(os.path.join(path, META_FILE), "w", encoding="utf-8") as f:
+        json.dump({
+            "documents": count,
+            "avg_length": avg_length,
+            "k1": k1,
+            "b": b,
+            "terms": list(term_ids),
+        }, f)
+
+    return {"documents": count, "terms": len(term_ids), "postings": total}
+
+
+# ============ SEARCH ============
+class LexicalIndex:
+    """Read-only BM25 index over the files written by save_lexical_index."""
+
+    def __init__(self, index_path: str):
+        path = os.path.join(index_path, LEXICAL_DIR)
+        with open(os.path.join(path, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.documents = meta["documents"]
+        self._term_ids = {term: i for i, term in enumerate(meta["terms"])}
+
+        self._offsets = np.load(os.path.join(path, OFFSETS_FILE), mmap_mode="r")
+        self._rows = np.load(os.path.join(path, ROWS_FILE), mmap_mode="r")
+        self._weights = np.load(os.path.join(path, WEIGHTS_FILE), mmap_mode="r")
+
+    @property
+    def terms(self) -> int:
+        return len(self._term_ids)
+
+    def search(self, query: str, k: int) -> list:
+        """[(FAISS row, BM25 score)] best first; only rows sharing a term with the query."""
+        spans = []
+        for token in set(tokenize(query)):
+            term = self._term_ids.get(token)
+            if term is not None:
+                spans.append((self._offsets[term], self._offsets[term + 1]))
+        if not spans:
+            return []
+
+        rows = np.concatenate([self._rows[start:end] for start, end in spans])
+        weights = np.concatenate([self._weights[start:end] for start, end in spans])
+        # Sum per row over the postings touched, not over the whole corpus
+        unique_rows, inverse = np.unique(rows, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights)
+
+        k = min(k, len(unique_rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(unique_rows[i]), float(scores[i])) for i in top]
+
+
+def load_lexical_index(index_path: str):
+    """LexicalIndex of a version, or None for versions built without one."""
+    return LexicalIndex(index_path) if has_lexical_index(index_path) else None
+
+
+# ============ FUSION ============
+def reciprocal_rank_fusion(rankings: list, k: int = 60) -> list:
+    """
+    Merge ranked lists of ids: each id scores sum(1 / (k + rank)) over the
+    lists it appears in. Returns [(id, fused score)] best first.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, 1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda pair: pair[1], reverse=True)
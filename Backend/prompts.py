@@ -8,22 +8,83 @@ You must strictly follow enterprise rules:
 - Be concise and professional
 """
 
-ISSUE_DETECTION_PROMPT = """
-Classify the user input carefully.
-
-RULES FOR CLASSIFICATION:
+CLASSIFICATION_RULES = """RULES FOR CLASSIFICATION:
 1. If user explicitly asks to "schedule a meet" OR "book a meeting" OR "schedule meeting" with HR → type: "issue", category: "hr_meeting", requires_action: true
 2. If user has an IT problem (technical issue, bug, software problem) → type: "issue", category: "it_issue", requires_action: true
 3. If user is asking a question or needs information → type: "query", category: "general_query", requires_action: false
 4. If user mentions policies, complaints, or HR-related concerns → Only if they ask to schedule → hr_meeting, Otherwise → query
 5. Check for abusive language, profanity, or harmful requests → has_abuse: true
+"""
 
+CLASSIFICATION_JSON_FORMAT = """{{"type":"issue|query","severity":"high|medium|low","category":"it_issue|hr_meeting|general_query|policy_question","requires_action":true|false,"has_abuse":true|false}}"""
+
+ISSUE_DETECTION_PROMPT = """
+Classify the user input carefully.
+
+""" + CLASSIFICATION_RULES + """
 Return ONLY valid JSON. No explanations. No markdown.
 
 User input: {query}
 
 JSON format:
-{{"type":"issue|query","severity":"high|medium|low","category":"it_issue|hr_meeting|general_query|policy_question","requires_action":true|false,"has_abuse":true|false}}
+""" + CLASSIFICATION_JSON_FORMAT + """
+"""
+
+ANSWER_INSTRUCTIONS = """INSTRUCTIONS:
+1. Answer ONLY using the context below - do NOT use outside knowledge
+2. Format your response as follows:
+   - Start with a brief summary paragraph (2-3 sentences) that answers the main question
+   - Then provide key details in bullet points below
+3. FOR EACH FACT IN BULLET POINTS: Include [Page X] citation showing the page number where that information comes from
+4. Keep each bullet point focused on one key piece of information
+5. Be professional and informative
+
+CITATION FORMAT:
+- Add [Page X] at the end of each bullet point with the actual page number
+- Example: "Total complaints reported: 44 [Page 12]"
+- Example: "Percentage of female employees: 0.09% [Page 3]"
+- Example: "Policy details in Corporate Governance Report [Page 8]"
+
+RULES:
+- Do NOT use outside knowledge
+- ALWAYS include [Page X] citations in bullet points for all factual statements
+- Start with a summary paragraph, then use bullet points with page citations
+- If the answer is completely missing from context, reply exactly:
+"This question is OUT OF DOCUMENTS - I can only answer questions related to the provided enterprise documents."
+"""
+
+RAG_ANSWER_PROMPT = """
+You are an expert enterprise assistant. Provide clear, well-structured answers using the context provided.
+
+""" + ANSWER_INSTRUCTIONS + """
+Context with Page Numbers:
+{context}
+
+Question: {query}
+
+Answer:
+"""
+
+# Intent detection + RAG answer in ONE call: line 1 is the JSON decision,
+# everything after the ANSWER: marker is the cited answer (queries only)
+ANSWER_MARKER = "ANSWER:"
+
+CLASSIFY_AND_ANSWER_PROMPT = """
+You are an expert enterprise assistant. First classify the user input, then answer it if it is a question.
+
+""" + CLASSIFICATION_RULES + """
+OUTPUT FORMAT (follow exactly):
+- Line 1: ONLY the classification as valid JSON on a single line, in this format:
+""" + CLASSIFICATION_JSON_FORMAT + """
+- Line 2: """ + ANSWER_MARKER + """
+- Then, ONLY if type is "query" and has_abuse is false, the answer written according to the instructions below.
+  Otherwise write nothing after """ + ANSWER_MARKER + """
+
+""" + ANSWER_INSTRUCTIONS + """
+Context with Page Numbers:
+{context}
+
+User input: {query}
 """
 
 SYSTEM_INSTRUCTIONS = """
@@ -1,73 +1,1349 @@
 import os
+import gc
+import sys
+import json
+import math
+import time
+import uuid
+import shutil
+import pickle
+import hashlib
+import sqlite3
+import argparse
+import importlib
+import threading
+from queue import Queue
+from concurrent.futures import ProcessPoolExecutor
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
+import numpy as np
+
+# faiss, LangChain, pypdf and the embedding backends are imported where they
+# are used, so importing this module (and the agent) stays cheap until the
+# first query or ingestion actually needs them
+try:
+    from .lexical import save_lexical_index, load_lexical_index, has_lexical_index, reciprocal_rank_fusion
+except ImportError:   # run as a script: python Backend/rag_engine.py
+    from lexical import save_lexical_index, load_lexical_index, has_lexical_index, reciprocal_rank_fusion
 
 # Determine absolute paths
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-VECTOR_DB_PATH = os.path.join(BASE_DIR, "vector_store", "faiss_index")
+VECTOR_STORE_DIR = os.path.join(BASE_DIR, "vector_store")
+VECTOR_DB_PATH = os.path.join(VECTOR_STORE_DIR, "faiss_index")   # legacy single index
+VERSIONS_DIR = os.path.join(VECTOR_STORE_DIR, "versions")
+CURRENT_POINTER = os.path.join(VECTOR_STORE_DIR, "CURRENT")
 DATA_DIR = os.path.join(BASE_DIR, "data")
 
 EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+NORMALIZE_EMBEDDINGS = True
 
+# Seconds between checks for a newly published index (0 disables the watcher)
+INDEX_WATCH_INTERVAL = float(os.getenv("RAG_INDEX_WATCH_INTERVAL", 30))
+# How many published index versions to keep on disk
+INDEX_KEEP_VERSIONS = int(os.getenv("RAG_INDEX_KEEP_VERSIONS", 3))
 
-# -------------------- BUILD VECTOR DB --------------------
-def build_vector_db(pdf_path: str):
-    print("📄 Loading PDF...")
-    loader = PyPDFLoader(pdf_path)
-    documents = loader.load()
-
-    print("✂️ Splitting documents...")
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=350,        # ✅ ideal for dense PDFs
-        chunk_overlap=80,      # ✅ preserves context
+# Query-time retrieval: search type (hybrid | mmr | similarity), chunks
+# returned, candidate pool per ranking, and the cosine similarity below which
+# a chunk is irrelevant. hybrid fuses vector and BM25 rankings with RRF
+SEARCH_TYPE = os.getenv("RAG_SEARCH_TYPE", "hybrid")
+SEARCH_K = int(os.getenv("RAG_TOP_K", 5))
+SEARCH_FETCH_K = int(os.getenv("RAG_FETCH_K", 20))
+SEARCH_MMR_LAMBDA = float(os.getenv("RAG_MMR_LAMBDA", 0.5))
+SEARCH_SCORE_THRESHOLD = float(os.getenv("RAG_SCORE_THRESHOLD", 0.25))
+SEARCH_RRF_K = int(os.getenv("RAG_RRF_K", 60))
+
+# Index type: flat (exact) | ivf | ivfpq | hnsw | auto (flat below
+# RAG_ANN_MIN_VECTORS chunks, ivf above it, ivfpq above RAG_PQ_MIN_VECTORS).
+# nlist/nprobe/efSearch are stored per version in index_params.json;
+# RAG_NPROBE / RAG_EF_SEARCH override them at query time (0 = use stored)
+INDEX_TYPE = os.getenv("RAG_INDEX_TYPE", "auto")
+ANN_MIN_VECTORS = int(os.getenv("RAG_ANN_MIN_VECTORS", 50000))
+PQ_MIN_VECTORS = int(os.getenv("RAG_PQ_MIN_VECTORS", 1000000))
+ANN_TRAIN_SAMPLE = int(os.getenv("RAG_ANN_TRAIN_SAMPLE", 50000))
+IVF_NLIST = int(os.getenv("RAG_IVF_NLIST", 0))      # 0 = 4 * sqrt(chunks)
+IVF_NPROBE = int(os.getenv("RAG_NPROBE", 0))
+PQ_M = int(os.getenv("RAG_PQ_M", 48))              # sub-quantizers; must divide the dimension
+HNSW_M = int(os.getenv("RAG_HNSW_M", 32))
+HNSW_EF_CONSTRUCTION = int(os.getenv("RAG_HNSW_EF_CONSTRUCTION", 80))
+HNSW_EF_SEARCH = int(os.getenv("RAG_EF_SEARCH", 0))
+INDEX_PARAMS_FILE = "index_params.json"
+
+# Serve queries from a read-only memory map of index.faiss, so workers on one
+# host share the OS page cache instead of each holding a heap copy ("0" = read)
+INDEX_MMAP = os.getenv("RAG_INDEX_MMAP", "1") == "1"
+
+# How new versions store chunk text/metadata: "compact" (memory-mapped columns,
+# see docstore.py) or "pickle" (LangChain's index.pkl, for older readers)
+DOCSTORE_FORMAT = os.getenv("RAG_DOCSTORE", "compact")
+
+CHUNK_SIZE = 350        # ✅ ideal for dense PDFs
+CHUNK_OVERLAP = 80      # ✅ preserves context
+MANIFEST_FILE = "manifest.json"
+
+# Parallel ingestion: parser processes, pages per task, parsed tasks buffered ahead of the embedder
+INGEST_WORKERS = int(os.getenv("RAG_INGEST_WORKERS", os.cpu_count() or 1))
+INGEST_PAGES_PER_TASK = int(os.getenv("RAG_INGEST_PAGES_PER_TASK", 16))
+INGEST_QUEUE_SIZE = int(os.getenv("RAG_INGEST_QUEUE_SIZE", 0)) or 2 * INGEST_WORKERS
+
+# Streaming embedder: chunks per encoder batch, and RSS ceiling in MB (0 = unlimited)
+EMBED_BATCH_SIZE = int(os.getenv("RAG_EMBED_BATCH_SIZE", 64))
+EMBED_MIN_BATCH_SIZE = 8
+INGEST_MAX_RSS_MB = float(os.getenv("RAG_INGEST_MAX_RSS_MB", 0))
+
+# Content-addressed embedding cache shared by all index builds ("off" disables)
+EMBEDDING_CACHE_PATH = os.getenv(
+    "RAG_EMBEDDING_CACHE", os.path.join(VECTOR_STORE_DIR, "embedding_cache.sqlite")
+)
+
+
+# -------------------- HELPERS --------------------
+def _sibling(name: str):
+    """Import a Backend module on first use, as a package or script module."""
+    return importlib.import_module(f"{__package__}.{name}" if __package__ else name)
+
+
+def _embedding_backend() -> str:
+    return _sibling("embeddings").EMBEDDING_BACKEND
+
+
+def _create_embeddings():
+    embeddings = _sibling("embeddings")
+    return embeddings.create_embeddings(EMBEDDING_MODEL, NORMALIZE_EMBEDDINGS, embeddings.EMBEDDING_BACKEND)
+
+
+def _process_rss_mb():
+    """Resident set size of this process in MB (None if unavailable)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Peak (not current) RSS: macOS reports bytes, Linux reports KB
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    except Exception:
+        return None
+
+
+def _process_anon_mb():
+    """
+    Anonymous (heap) part of the RSS in MB, i.e. memory not shared through the
+    page cache. Linux only; None elsewhere.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("RssAnon:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+# -------------------- INDEX VERSIONS --------------------
+def new_version_dir() -> tuple:
+    """Reserve a fresh, empty version directory for a new index build."""
+    version = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    path = os.path.join(VERSIONS_DIR, version)
+    os.makedirs(path, exist_ok=False)
+    return version, path
+
+
+def get_current_version() -> tuple:
+    """
+    Resolve the published index as (version, path).
+    Falls back to the legacy vector_store/faiss_index when nothing is published.
+    """
+    try:
+        with open(CURRENT_POINTER, encoding="utf-8") as f:
+            version = f.read().strip()
+        path = os.path.join(VERSIONS_DIR, version)
+        if version and os.path.isdir(path):
+            return version, path
+    except OSError:
+        pass
+    return "legacy", VECTOR_DB_PATH
+
+
+def publish_version(version: str):
+    """Atomically point CURRENT at a fully written version directory."""
+    tmp_pointer = f"{CURRENT_POINTER}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_pointer, "w", encoding="utf-8") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_pointer, CURRENT_POINTER)
+
+
+def prune_versions(keep: int = INDEX_KEEP_VERSIONS):
+    """Delete old version directories, never touching the current one."""
+    if not os.path.isdir(VERSIONS_DIR):
+        return
+    current, _ = get_current_version()
+    versions = sorted(
+        os.listdir(VERSIONS_DIR),
+        key=lambda v: os.path.getmtime(os.path.join(VERSIONS_DIR, v)),
+        reverse=True
+    )
+    for version in versions[max(keep, 1):]:
+        if version != current:
+            shutil.rmtree(os.path.join(VERSIONS_DIR, version), ignore_errors=True)
+
+
+# -------------------- SHARED REGISTRY --------------------
+class VectorStoreRegistry:
+    """
+    Process-wide holder for the embedding model and FAISS index.
+
+    Both are loaded once on first use and shared by every EnterpriseAgent,
+    so a new login no longer re-reads the model and index from disk.
+    A background watcher hot-swaps the index when a new version is
+    published; queries already running keep the snapshot they started with.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._swap_lock = threading.Lock()   # one index transition at a time
+        self._embeddings = None
+        self._vector_db = None
+        self._version = None
+        self._watcher = None
+        self._stop_watcher = threading.Event()
+        self._stats = {
+            "embedding_load_seconds": None,
+            "index_type": None,
+            "index_load_mode": None,
+            "docstore": None,
+            "lexical_terms": None,
+            "index_load_seconds": None,
+            "index_loaded_at": None,
+            "index_swaps": 0,
+            "retrievers_issued": 0,
+        }
+
+    def get_embeddings(self):
+        if self._embeddings is None:
+            with self._lock:
+                if self._embeddings is None:
+                    start = time.perf_counter()
+                    self._embeddings = _create_embeddings()
+                    self._stats["embedding_load_seconds"] = round(time.perf_counter() - start, 3)
+        return self._embeddings
+
+    def _load(self, path: str):
+        start = time.perf_counter()
+        vector_db, mode = load_faiss(path, self.get_embeddings(), mmap=INDEX_MMAP)
+        self._stats["index_load_mode"] = mode
+        self._stats["docstore"] = type(vector_db.docstore).__name__
+        # Travels with the FAISS object so a snapshot never mixes versions
+        vector_db.lexical_index = load_lexical_index(path)
+        self._stats["lexical_terms"] = vector_db.lexical_index.terms if vector_db.lexical_index else None
+        params = load_index_params(path)
+        prepare_index(vector_db.index, params)
+        self._stats["index_type"] = params["type"]
+        self._stats["index_load_seconds"] = round(time.perf_counter() - start, 3)
+        self._stats["index_loaded_at"] = time.time()
+        return vector_db
+
+    def snapshot(self) -> tuple:
+        """Return (version, vector_db) as one consistent pair."""
+        if self._vector_db is None:
+            with self._lock:
+                if self._vector_db is None:
+                    version, path = get_current_version()
+                    self._vector_db = self._load(path)
+                    self._version = version
+                self.start_watcher()
+        with self._lock:
+            return self._version, self._vector_db
+
+    def get_vector_db(self):
+        return self.snapshot()[1]
+
+    @property
+    def version(self):
+        return self._version
+
+    def get_retriever(self, search_type: str = "mmr", search_kwargs: dict = None):
+        self.snapshot()
+        with self._lock:
+            self._stats["retrievers_issued"] += 1
+        return SharedRetriever(self, search_type=search_type, search_kwargs=search_kwargs)
+
+    def reload_if_changed(self) -> bool:
+        """Load and swap in the published index if it differs from ours."""
+        version, path = get_current_version()
+        if version == self._version:
+            return False
+
+        with self._swap_lock:
+            if version == self._version:
+                return False
+            # Load outside the main lock so in-flight queries are never blocked
+            new_db = self._load(path)
+            with self._lock:
+                self._vector_db = new_db
+                self._version = version
+                self._stats["index_swaps"] += 1
+        print(f"🔄 Swapped in FAISS index version {version}")
+        return True
+
+    def start_watcher(self, interval: float = INDEX_WATCH_INTERVAL):
+        if interval <= 0 or (self._watcher and self._watcher.is_alive()):
+            return
+        self._stop_watcher.clear()
+        self._watcher = threading.Thread(
+            target=self._watch, args=(interval,), name="faiss-index-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def stop_watcher(self):
+        self._stop_watcher.set()
+
+    def _watch(self, interval: float):
+        while not self._stop_watcher.wait(interval):
+            try:
+                self.reload_if_changed()
+            except Exception as e:
+                print(f"❌ Index reload failed: {e}")
+
+    def reset(self):
+        """Drop the shared model and index (next access reloads them)."""
+        with self._lock:
+            self._embeddings = None
+            self._vector_db = None
+            self._version = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            version, vector_db = self._version, self._vector_db
+
+        stats["embeddings_loaded"] = self._embeddings is not None
+        stats["index_loaded"] = vector_db is not None
+        stats["index_version"] = version
+        stats["watcher_running"] = bool(self._watcher and self._watcher.is_alive())
+        if vector_db is not None:
+            index = vector_db.index
+            stats["index_vectors"] = index.ntotal
+            stats["index_dimension"] = index.d
+            stats["index_vector_mb"] = round(index.ntotal * index.d * 4 / (1024 * 1024), 2)
+            stats["docstore_chunks"] = len(vector_db.index_to_docstore_id)
+        stats["process_rss_mb"] = _process_rss_mb()
+        stats["process_anon_mb"] = _process_anon_mb()
+        return stats
+
+
+class SharedRetriever:
+    """
+    Read-only retriever over the registry's current index.
+    Each call takes its own snapshot, so a hot swap never affects a query
+    that is already running.
+    """
+
+    def __init__(self, registry, search_type: str = "mmr", search_kwargs: dict = None):
+        self._registry = registry
+        self.search_type = search_type
+        self.search_kwargs = search_kwargs or {}
+
+    @property
+    def version(self):
+        return self._registry.version
+
+    def snapshot(self) -> tuple:
+        return self._registry.snapshot()
+
+    def embed_query(self, query: str) -> list:
+        return self._registry.get_embeddings().embed_query(query)
+
+    def search(self, vector_db, embedding, query: str = None) -> list:
+        """
+        Search one index snapshot by query vector.
+        Returns [(docstore_id, score)] best first. The score is the cosine
+        similarity for the normalized MiniLM vectors (1 - squared L2 / 2), or
+        the reciprocal-rank-fusion score for hybrid search. Chunks below
+        search_kwargs["score_threshold"] are dropped before MMR/fusion runs.
+
+        hybrid fuses the top fetch_k vector hits with the top fetch_k BM25
+        hits for `query`; without a query or a lexical index it is plain
+        similarity search. When no vector hit clears the threshold the
+        question is treated as off-topic and nothing is returned.
+        """
+        k = self.search_kwargs.get("k", 4)
+        fetch_k = max(self.search_kwargs.get("fetch_k", 20), k)
+        threshold = self.search_kwargs.get("score_threshold")
+        lexical = getattr(vector_db, "lexical_index", None)
+        use_hybrid = self.search_type == "hybrid" and lexical is not None and bool(query)
+        use_mmr = self.search_type == "mmr" and fetch_k > k
+
+        vector = np.array([embedding], dtype=np.float32)
+        distances, indices = vector_db.index.search(vector, fetch_k if use_mmr or use_hybrid else k)
+        hits = [(int(i), float(d)) for i, d in zip(indices[0], distances[0]) if i != -1]
+        if threshold is not None:
+            hits = [(i, d) for i, d in hits if 1.0 - d / 2.0 >= threshold]
+
+        if use_hybrid:
+            if not hits:
+                return []
+            fused = reciprocal_rank_fusion(
+                [[i for i, _ in hits], [i for i, _ in lexical.search(query, fetch_k)]],
+                k=self.search_kwargs.get("rrf_k", SEARCH_RRF_K)
+            )
+            return [(vector_db.index_to_docstore_id[i], score) for i, score in fused[:k]]
+
+        if use_mmr and len(hits) > k:
+            from langchain_community.vectorstores.utils import maximal_marginal_relevance
+            candidates = [vector_db.index.reconstruct(i) for i, _ in hits]
+            selected = maximal_marginal_relevance(
+                vector,
+                candidates,
+                k=k,
+                lambda_mult=self.search_kwargs.get("lambda_mult", 0.5)
+            )
+            hits = [hits[i] for i in selected]
+
+        return [
+            (vector_db.index_to_docstore_id[i], 1.0 - distance / 2.0)
+            for i, distance in hits[:k]
+        ]
+
+    @staticmethod
+    def get_documents(vector_db, hits: list) -> list:
+        return [vector_db.docstore.search(doc_id) for doc_id, _ in hits]
+
+    def invoke(self, query: str):
+        _, vector_db = self.snapshot()
+        return self.get_documents(vector_db, self.search(vector_db, self.embed_query(query), query))
+
+
+registry = VectorStoreRegistry()
+
+
+def get_embeddings():
+    return registry.get_embeddings()
+
+
+def get_shared_retriever(search_type: str = None, search_kwargs: dict = None):
+    """Shared retriever; settings default to the RAG_SEARCH_* / RAG_TOP_K config."""
+    if search_kwargs is None:
+        search_kwargs = {
+            "k": SEARCH_K,
+            "fetch_k": SEARCH_FETCH_K,
+            "lambda_mult": SEARCH_MMR_LAMBDA,
+            "score_threshold": SEARCH_SCORE_THRESHOLD,
+            "rrf_k": SEARCH_RRF_K,
+        }
+    return registry.get_retriever(
+        search_type=search_type or SEARCH_TYPE,
+        search_kwargs=search_kwargs
+    )
+
+
+def get_registry_stats() -> dict:
+    return registry.stats()
+
+
+# -------------------- INGESTION MANIFEST --------------------
+def _file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _new_manifest() -> dict:
+    return {
+        "embedding_model": EMBEDDING_MODEL,
+        "embedding_backend": _embedding_backend(),
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "files": {},
+    }
+
+
+def load_manifest(index_path: str) -> dict:
+    """
+    Read the manifest stored next to an index.
+    Returns None when missing or built with different chunking/model settings,
+    which forces a full rebuild.
+    """
+    try:
+        with open(os.path.join(index_path, MANIFEST_FILE), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    expected = _new_manifest()
+    manifest.setdefault("embedding_backend", "torch")   # manifests written before the ONNX backends
+    for key in ("embedding_model", "embedding_backend", "chunk_size", "chunk_overlap"):
+        if manifest.get(key) != expected[key]:
+            return None
+    return manifest
+
+
+def _save_manifest(index_path: str, manifest: dict):
+    with open(os.path.join(index_path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+
+
+def _list_pdfs(path: str, root: str = None) -> tuple:
+    """
+    Return (root, [pdf paths relative to root]) for a PDF file or a directory
+    of PDFs. root defaults to the directory itself (or the file's folder).
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No such file or directory: {path}")
+    path = os.path.abspath(path)
+    if root is None:
+        root = os.path.dirname(path) if os.path.isfile(path) else path
+
+    if os.path.isfile(path):
+        found = [path]
+    else:
+        found = [
+            os.path.join(dirpath, name)
+            for dirpath, _, filenames in os.walk(path)
+            for name in filenames if name.lower().endswith(".pdf")
+        ]
+    pdfs = [os.path.relpath(pdf, root).replace(os.sep, "/") for pdf in found]
+    return root, sorted(pdfs)
+
+
+def _ingest_scope(path: str, manifest: dict) -> tuple:
+    """
+    (root, scope) for an incremental run on `path`. Relative paths in the
+    manifest are kept against the root of the previous build; a file or
+    folder inside that root only refreshes its own entries (scope is the
+    relative prefix), everything else is left as it is. A path outside the
+    root is refused, since every indexed document would look removed.
+    """
+    path = os.path.abspath(path)
+    root = manifest.get("root")
+    if root is None:   # manifests written before the root was recorded
+        return (os.path.dirname(path) if os.path.isfile(path) else path), None
+    if path == root:
+        return root, None
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError(
+            f"The index was built from {root}; {path} is outside it. "
+            f"Run with --full to rebuild the knowledge base from the new location."
+        )
+    return root, os.path.relpath(path, root).replace(os.sep, "/")
+
+
+def _in_scope(rel: str, scope: str) -> bool:
+    return scope is None or rel == scope or rel.startswith(scope + "/")
+
+
+def _chunk_id(source: str, page_no: int, i: int, page_hash: str) -> str:
+    file_key = hashlib.sha1(source.encode("utf-8")).hexdigest()[:10]
+    return f"{file_key}-{page_no}-{i}-{page_hash[:8]}"
+
+
+def _create_splitter():
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    return RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
         separators=["\n\n", "\n", ".", " ", ""]
     )
 
-    chunks = splitter.split_documents(documents)
 
-    # 🧠 Add metadata for better grounding
-    for chunk in chunks:
-        chunk.metadata["source"] = os.path.basename(pdf_path)
-        chunk.metadata["page"] = chunk.metadata.get("page", "N/A")
+def _empty_faiss(embeddings, dimension: int = None):
+    import faiss
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+
+    dimension = dimension or len(embeddings.embed_query("dimension probe"))
+    return FAISS(
+        embedding_function=embeddings,
+        index=faiss.IndexFlatL2(dimension),
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={}
+    )
+
+
+# -------------------- ANN INDEXES --------------------
+def resolve_index_type(count: int, index_type: str = INDEX_TYPE) -> str:
+    """Concrete index type for a corpus of `count` chunks."""
+    if index_type != "auto":
+        return index_type
+    if count >= PQ_MIN_VECTORS:
+        return "ivfpq"
+    if count >= ANN_MIN_VECTORS:
+        return "ivf"
+    return "flat"
+
+
+def _ivf(index):
+    import faiss
+    try:
+        return faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return None
+
+
+def prepare_index(index, params: dict):
+    """Apply query-time parameters (nprobe / efSearch) and enable reconstruct() for MMR."""
+    import faiss
+    ivf = _ivf(index)
+    if ivf is not None:
+        ivf.nprobe = IVF_NPROBE or params.get("nprobe", 1)
+        ivf.make_direct_map()
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = HNSW_EF_SEARCH or params.get("ef_search", 64)
+
+
+def build_ann_index(vectors: np.ndarray, index_type: str) -> tuple:
+    """
+    Build an index of `index_type` over vectors (n x d, row i = label i).
+    IVF types are trained on a random sample of at most RAG_ANN_TRAIN_SAMPLE
+    vectors (but at least 39 per centroid). Returns (index, params).
+    """
+    import faiss
+
+    count, dimension = vectors.shape
+    if index_type == "ivfpq" and count < 39 * 256:
+        # 8-bit PQ codebooks need thousands of training vectors
+        print(f"⚠️ {count} vectors are too few for ivfpq, building ivf instead")
+        params = {"type": "ivf", "requested_type": index_type, "ntotal": int(count)}
+        index_type = "ivf"
+    else:
+        params = {"type": index_type, "ntotal": int(count)}
+
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(dimension)
+
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, HNSW_M)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        params.update(m=HNSW_M, ef_construction=HNSW_EF_CONSTRUCTION, ef_search=HNSW_EF_SEARCH or 64)
+
+    elif index_type in ("ivf", "ivfpq"):
+        nlist = IVF_NLIST or int(4 * math.sqrt(count))
+        nlist = max(1, min(nlist, count // 39))
+        quantizer = faiss.IndexFlatL2(dimension)
+        if index_type == "ivf":
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist)
+        else:
+            if dimension % PQ_M:
+                raise ValueError(f"RAG_PQ_M={PQ_M} must divide the embedding dimension {dimension}")
+            index = faiss.IndexIVFPQ(quantizer, dimension, nlist, PQ_M, 8)
+            params["pq_m"] = PQ_M
+
+        sample_size = min(count, max(ANN_TRAIN_SAMPLE, 39 * nlist))
+        if sample_size < count:
+            rows = np.random.default_rng(0).choice(count, sample_size, replace=False)
+            sample = vectors[np.sort(rows)]
+        else:
+            sample = vectors
+        index.train(sample)
+        params.update(
+            nlist=nlist,
+            nprobe=IVF_NPROBE or min(nlist, max(8, nlist // 16)),
+            trained_on=int(sample_size)
+        )
+
+    else:
+        raise ValueError(f"Unknown index type: {index_type}")
+
+    index.add(vectors)
+    prepare_index(index, params)
+    return index, params
+
+
+def load_index_params(index_path: str) -> dict:
+    """Parameters stored with an index version (flat for versions without them)."""
+    try:
+        with open(os.path.join(index_path, INDEX_PARAMS_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"type": "flat"}
+
+
+def _save_index_params(index_path: str, params: dict):
+    with open(os.path.join(index_path, INDEX_PARAMS_FILE), "w", encoding="utf-8") as f:
+        json.dump(params, f, indent=1)
+
+
+def _mmap_flags() -> list:
+    """faiss IO flags to try, most shared first (IO_FLAG_MMAP_IFC needs faiss >= 1.11)."""
+    import faiss
+    flags = []
+    if hasattr(faiss, "IO_FLAG_MMAP_IFC"):
+        # Maps the file and searches the vectors in place (flat, IVF and HNSW)
+        flags.append(("mmap", faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY))
+    # Older builds: IVF inverted lists are mapped, other index types are read
+    flags.append(("mmap-ivf", faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY))
+    return flags
+
+
+def read_index_mmap(index_path: str) -> tuple:
+    """
+    Open index.faiss read-only and memory-mapped. Returns (index, mode) where
+    mode is the flag set that worked, or "read" when the file had to be read
+    into the heap. The index must never be added to afterwards.
+    """
+    import faiss
+
+    file_path = os.path.join(index_path, "index.faiss")
+    for mode, flags in _mmap_flags():
+        try:
+            index = faiss.read_index(file_path, flags)
+        except RuntimeError:
+            continue
+        if mode == "mmap-ivf" and _ivf(index) is None:
+            # IO_FLAG_MMAP only maps inverted lists: flat/HNSW were read into the heap
+            mode = "read"
+        return index, mode
+    return faiss.read_index(file_path), "read"
+
+
+def _load_docstore(index_path: str, writable: bool = False) -> tuple:
+    """
+    (docstore, index_to_docstore_id) of a version: the compact docstore when
+    present, else the pickled index.pkl of versions written before it.
+    """
+    compact = _sibling("docstore")
+    if compact.has_compact_docstore(index_path):
+        docstore = compact.CompactDocstore(index_path)
+        if writable:
+            return docstore.materialize()
+        return docstore, docstore.index_to_docstore_id()
+
+    with open(os.path.join(index_path, "index.pkl"), "rb") as f:
+        return pickle.load(f)
+
+
+def load_faiss(index_path: str, embeddings, mmap: bool = False, writable: bool = False) -> tuple:
+    """
+    Replacement for FAISS.load_local that understands both docstore layouts.
+    Returns (vector_db, mode). Serving loads are read-only, optionally
+    memory-mapped; writable=True reads everything into memory so
+    build_vector_db can add and delete chunks.
+    """
+    import faiss
+    from langchain_community.vectorstores import FAISS
+
+    if mmap and not writable:
+        index, mode = read_index_mmap(index_path)
+    else:
+        index, mode = faiss.read_index(os.path.join(index_path, "index.faiss")), "read"
+    docstore, index_to_docstore_id = _load_docstore(index_path, writable=writable)
+
+    vector_db = FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=index_to_docstore_id
+    )
+    return vector_db, mode
+
+
+def save_faiss(vector_db, index_path: str, docstore_format: str = DOCSTORE_FORMAT):
+    if docstore_format == "pickle":
+        vector_db.save_local(index_path)
+        return
+    import faiss
+
+    os.makedirs(index_path, exist_ok=True)
+    faiss.write_index(vector_db.index, os.path.join(index_path, "index.faiss"))
+    _sibling("docstore").save_compact_docstore(index_path, vector_db.docstore, vector_db.index_to_docstore_id)
+
+
+# -------------------- EMBEDDING CACHE --------------------
+class EmbeddingCache:
+    """
+    SQLite cache of chunk embeddings keyed by sha256(model, normalize flag,
+    backend, text). The torch backend keeps the original key format.
+
+    Lets re-chunking, re-ingesting a document, or a full rebuild skip the
+    encoder for any text that has been embedded before. Vectors are stored
+    as raw float32 blobs.
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, model_name: str = EMBEDDING_MODEL,
+                 normalize: bool = NORMALIZE_EMBEDDINGS, backend: str = None):
+        self.path = path
+        backend = backend or _embedding_backend()
+        self._namespace = f"{model_name}\0{int(normalize)}\0"
+        if backend != "torch":
+            self._namespace += f"{backend}\0"
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def key(self, text: str) -> str:
+        return _text_hash(self._namespace + text)
+
+    def get_many(self, keys: list) -> dict:
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        for i in range(0, len(unique), 500):   # stay under SQLite's variable limit
+            part = unique[i:i + 500]
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(part))})",
+                part
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, items: list):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+            [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items]
+        )
+        self._conn.commit()
+
+    def embed_documents(self, embeddings, texts: list) -> list:
+        """Embed texts, encoding only the ones not already cached."""
+        keys = [self.key(text) for text in texts]
+        cached = self.get_many(keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                missing.setdefault(key, text)
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            vectors = embeddings.embed_documents(list(missing.values()))
+            new_items = list(zip(missing.keys(), vectors))
+            self.put_many(new_items)
+            cached.update((key, np.asarray(vector, dtype=np.float32)) for key, vector in new_items)
+
+        return [cached[key] for key in keys]
+
+    def close(self):
+        self._conn.close()
+
+
+# -------------------- PARSE WORKER --------------------
+def _parse_task(task: tuple) -> dict:
+    """
+    Parse and split a page range of one PDF (runs in a worker process).
+
+    Pages whose text hash matches old_hashes are reported but not chunked.
+    Returns plain tuples so results pickle cheaply back to the parent. A PDF
+    that cannot be read (corrupt, encrypted) comes back with "error" set
+    instead of failing the whole ingestion.
+    """
+    from pypdf import PdfReader
+    from langchain_core.documents import Document
+
+    root, rel, first, last, old_hashes = task
+
+    start = time.perf_counter()
+    try:
+        reader = PdfReader(os.path.join(root, rel))
+        texts = [(page_no, reader.pages[page_no].extract_text()) for page_no in range(first, last)]
+    except Exception as e:
+        return {"rel": rel, "error": f"{type(e).__name__}: {e}", "parse_seconds": time.perf_counter() - start}
+    parse_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    splitter = _create_splitter()
+    page_hashes, changed, chunks = {}, [], []
+    for page_no, text in texts:
+        page_hash = _text_hash(text)
+        page_hashes[str(page_no)] = page_hash
+        if old_hashes.get(str(page_no)) == page_hash:
+            continue
+
+        changed.append(str(page_no))
+        page = Document(page_content=text, metadata={"source": rel, "page": page_no})
+        for i, chunk in enumerate(splitter.split_documents([page])):
+            # 🧠 Add metadata for better grounding
+            metadata = {"source": rel, "page": page_no}
+            chunks.append((_chunk_id(rel, page_no, i, page_hash), chunk.page_content, metadata))
+    chunk_seconds = time.perf_counter() - start
+
+    return {
+        "rel": rel,
+        "page_hashes": page_hashes,
+        "changed": changed,
+        "chunks": chunks,
+        "parse_seconds": parse_seconds,
+        "chunk_seconds": chunk_seconds,
+    }
+
+
+def _run_tasks(tasks: list, workers: int, queue_size: int):
+    """
+    Yield parse results as they finish.
+
+    At most queue_size tasks are submitted ahead of the consumer, so parsed
+    text never piles up in memory while the embedder is the bottleneck.
+    """
+    if workers <= 1:
+        for task in tasks:
+            yield _parse_task(task)
+        return
+
+    results = Queue()
+    slots = threading.BoundedSemaphore(queue_size)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        def submit_all():
+            for task in tasks:
+                slots.acquire()
+                pool.submit(_parse_task, task).add_done_callback(results.put)
+
+        producer = threading.Thread(target=submit_all, name="ingest-producer", daemon=True)
+        producer.start()
+        for _ in tasks:
+            future = results.get()
+            slots.release()
+            yield future.result()
+        producer.join()
+
+
+class _BatchIndexer:
+    """
+    Streams chunks through the encoder in fixed-size batches and appends
+    each batch to the FAISS index, so only one batch of texts and vectors
+    is held in memory at a time.
+
+    When process RSS goes over max_rss_mb the pending batch is flushed
+    early and the batch size is halved (down to EMBED_MIN_BATCH_SIZE).
+    """
 
-    print(f"🔢 Total chunks created: {len(chunks)}")
+    def __init__(self, vector_db, embeddings, batch_size: int = EMBED_BATCH_SIZE,
+                 max_rss_mb: float = INGEST_MAX_RSS_MB, cache: EmbeddingCache = None):
+        self.vector_db = vector_db
+        self.embeddings = embeddings
+        self.cache = cache
+        self.batch_size = max(batch_size, 1)
+        self.max_rss_mb = max_rss_mb
+        self._pending = []
+        self.added = 0
+        self.batches = 0
+        self.embed_seconds = 0.0
+        self.index_seconds = 0.0
+        self.peak_rss_mb = _process_rss_mb() or 0.0
 
-    print("🧠 Creating embeddings...")
-    embeddings = HuggingFaceEmbeddings(
-        model_name=EMBEDDING_MODEL,
-        encode_kwargs={"normalize_embeddings": True}  # ✅ IMPORTANT
+    def add(self, chunks: list):
+        """Queue (id, text, metadata) tuples, encoding full batches as they fill."""
+        self._pending.extend(chunks)
+        while len(self._pending) >= self.batch_size:
+            self._encode(self._pending[:self.batch_size])
+            del self._pending[:self.batch_size]
+        if self._over_ceiling():
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            self._encode(self._pending)
+            self._pending = []
+
+    def _over_ceiling(self) -> bool:
+        rss = _process_rss_mb()
+        if rss is None:
+            return False
+        self.peak_rss_mb = max(self.peak_rss_mb, rss)
+        if not self.max_rss_mb or rss < self.max_rss_mb:
+            return False
+
+        gc.collect()
+        if self.batch_size > EMBED_MIN_BATCH_SIZE:
+            self.batch_size = max(self.batch_size // 2, EMBED_MIN_BATCH_SIZE)
+            print(f"⚠️ RSS {rss:.0f} MB over {self.max_rss_mb:.0f} MB ceiling, batch size -> {self.batch_size}")
+        return True
+
+    def _encode(self, batch: list):
+        ids, texts, metadatas = zip(*batch)
+
+        start = time.perf_counter()
+        if self.cache is not None:
+            vectors = self.cache.embed_documents(self.embeddings, list(texts))
+        else:
+            vectors = self.embeddings.embed_documents(list(texts))
+        self.embed_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        if self.vector_db is None:
+            self.vector_db = _empty_faiss(self.embeddings, dimension=len(vectors[0]))
+        self.vector_db.add_embeddings(
+            zip(texts, vectors), metadatas=list(metadatas), ids=list(ids)
+        )
+        self.index_seconds += time.perf_counter() - start
+
+        self.added += len(ids)
+        self.batches += 1
+
+
+def _print_timings(timings: dict):
+    print("⏱️ Stage timings:")
+    for stage, seconds in timings.items():
+        print(f"   {stage:<24} {seconds:8.2f}s")
+
+
+# -------------------- BUILD VECTOR DB --------------------
+def build_vector_db(path: str = DATA_DIR, full_rebuild: bool = False, workers: int = INGEST_WORKERS,
+                    batch_size: int = EMBED_BATCH_SIZE, max_rss_mb: float = INGEST_MAX_RSS_MB,
+                    use_cache: bool = True, index_type: str = INDEX_TYPE, allow_empty: bool = False):
+    """
+    Ingest a PDF file or a directory of PDFs into a new index version.
+
+    Each file is fingerprinted (content hash + per-page text hash) in a
+    manifest stored with the index. On later runs unchanged files are
+    skipped, only changed pages are re-chunked and re-embedded, and vectors
+    of removed pages/documents are deleted.
+
+    Parsing and splitting fan out over a process pool in page-range tasks;
+    the parent streams the chunks through the encoder in batches of
+    batch_size, keeping RSS under max_rss_mb where possible. Vectors are
+    looked up in the EmbeddingCache first, so text that was embedded by any
+    earlier build is never re-encoded.
+
+    Chunks are streamed into a flat index; before saving it is converted to
+    the ANN type chosen by index_type (trained on a sample). ANN indexes can
+    take incremental additions, but FAISS/LangChain cannot delete from them
+    in place, so an update that changes or removes files rebuilds in full.
+    A BM25 inverted index over the same rows is rebuilt with every version.
+
+    A file that cannot be read or parsed is logged and reported in the
+    summary; the rest of the directory is still ingested. On incremental
+    updates the failed file keeps its previous manifest entry and vectors
+    (and is retried on the next run).
+
+    The manifest records the ingest root. An incremental run on a file or
+    folder inside it refreshes only that part; a path outside it raises
+    ValueError (rebuild with full_rebuild). A missing path raises
+    FileNotFoundError, and finding no PDFs while an index exists raises
+    ValueError unless allow_empty is set, so a mistyped or unmounted folder
+    never publishes an empty knowledge base.
+    """
+    from pypdf import PdfReader
+
+    total_start = time.perf_counter()
+    timings = {}
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No such file or directory: {path}")
+
+    current_version, current_path = get_current_version()
+    manifest = None if full_rebuild else load_manifest(current_path)
+    root = scope = None
+    if manifest is not None:
+        root, scope = _ingest_scope(path, manifest)
+    root, pdfs = _list_pdfs(path, root)
+    print(f"📄 Found {len(pdfs)} PDF(s) in {os.path.abspath(path)}")
+    if not pdfs and not allow_empty and os.path.exists(os.path.join(current_path, MANIFEST_FILE)):
+        raise ValueError(
+            f"No PDFs found in {path}, but version {current_version} has a knowledge base. "
+            f"Pass --allow-empty to publish an empty index."
+        )
+
+    current_params = load_index_params(current_path) if manifest else {"type": "flat"}
+    current_type = current_params["type"]
+    embeddings = get_embeddings()
+
+    stage_start = time.perf_counter()
+    failures = {}   # rel -> error, for files that could not be read or parsed
+    file_hashes_all = {}
+
+    def fingerprint(rels: list):
+        for rel in rels:
+            try:
+                file_hashes_all[rel] = _file_hash(os.path.join(root, rel))
+            except OSError as e:
+                failures[rel] = f"{type(e).__name__}: {e}"
+
+    fingerprint(pdfs)
+    timings["fingerprint"] = time.perf_counter() - stage_start
+
+    if manifest is not None and current_type != "flat":
+        old_files = manifest["files"]
+        has_deletions = any(
+            rel not in file_hashes_all and rel not in failures and _in_scope(rel, scope)
+            for rel in old_files
+        ) or any(
+            rel in old_files and old_files[rel]["sha256"] != file_hash
+            for rel, file_hash in file_hashes_all.items()
+        )
+        if index_type not in ("auto", current_type, current_params.get("requested_type")):
+            print(f"🔁 Index type changed ({current_type} -> {index_type}): full rebuild")
+            manifest = None
+        elif has_deletions:
+            print(f"🔁 {current_type} index cannot delete in place: full rebuild")
+            manifest = None
+    if manifest is None:
+        current_type = "flat"   # full rebuilds stream into a flat index
+        if scope is not None:
+            # A full rebuild covers the whole root, not just the refreshed folder
+            scope = None
+            root, pdfs = _list_pdfs(root)
+            fingerprint([rel for rel in pdfs if rel not in file_hashes_all])
+
+    stage_start = time.perf_counter()
+    incremental = manifest is not None
+    if not incremental:
+        manifest = _new_manifest()
+        vector_db = None
+        print("🆕 Full rebuild")
+    else:
+        vector_db, _ = load_faiss(current_path, embeddings, writable=True)
+        print(f"♻️ Incremental update of version {current_version}")
+    timings["load current index"] = time.perf_counter() - stage_start
+
+    # 1️⃣ Plan page-range tasks for the changed files
+    stage_start = time.perf_counter()
+    old_files = manifest["files"]
+    new_files, file_hashes, tasks = {}, {}, []
+    counts = {"unchanged": 0, "changed": 0, "removed": 0, "pages": 0}
+
+    def keep_previous(rel: str, error: str):
+        """Record a failed file; it keeps its old manifest entry and vectors."""
+        failures[rel] = error
+        print(f"❌ Skipping {rel}: {error}")
+        if rel in old_files:
+            new_files[rel] = old_files[rel]
+        else:
+            new_files.pop(rel, None)
+
+    # Files outside the refreshed folder are left untouched
+    for rel, old_entry in old_files.items():
+        if not _in_scope(rel, scope):
+            new_files[rel] = old_entry
+
+    for rel in pdfs:
+        file_path = os.path.join(root, rel)
+        old_entry = old_files.get(rel)
+        if rel in failures:
+            keep_previous(rel, failures[rel])
+            continue
+        file_hash = file_hashes_all[rel]
+
+        if old_entry and old_entry["sha256"] == file_hash:
+            new_files[rel] = old_entry
+            counts["unchanged"] += 1
+            continue
+
+        try:
+            page_count = len(PdfReader(file_path).pages)
+        except Exception as e:
+            keep_previous(rel, f"{type(e).__name__}: {e}")
+            continue
+
+        counts["changed"] += 1
+        file_hashes[rel] = file_hash
+        new_files[rel] = {"sha256": file_hash, "pages": {}}
+        old_hashes = {
+            page_no: page["hash"]
+            for page_no, page in (old_entry["pages"] if old_entry else {}).items()
+        }
+        for first in range(0, page_count, INGEST_PAGES_PER_TASK):
+            last = min(first + INGEST_PAGES_PER_TASK, page_count)
+            tasks.append((root, rel, first, last, old_hashes))
+    timings["fingerprint"] += time.perf_counter() - stage_start
+
+    print(
+        f"🔍 {counts['unchanged']} unchanged, {counts['changed']} changed file(s); "
+        f"{len(tasks)} parse task(s) on {max(workers, 1)} worker(s)"
     )
 
-    print("📦 Building FAISS index...")
-    vector_db = FAISS.from_documents(chunks, embeddings)
+    # 2️⃣ Parse + split in the pool, embed + index in this process in batches
+    # Deletions and additions are tracked per file, so a file whose later
+    # page range fails can be rolled back to its previous version
+    file_deletes, file_added = {}, {}
+    cache = EmbeddingCache() if use_cache and EMBEDDING_CACHE_PATH != "off" else None
+    indexer = _BatchIndexer(
+        vector_db, embeddings, batch_size=batch_size, max_rss_mb=max_rss_mb, cache=cache
+    )
+    parse_seconds = chunk_seconds = 0.0
+    stage_start = time.perf_counter()
 
-    os.makedirs(VECTOR_DB_PATH, exist_ok=True)
-    vector_db.save_local(VECTOR_DB_PATH)
+    for result in _run_tasks(tasks, workers, INGEST_QUEUE_SIZE):
+        parse_seconds += result["parse_seconds"]
+        rel = result["rel"]
+        if rel in failures:
+            continue
+        if "error" in result:
+            keep_previous(rel, result["error"])
+            counts["changed"] -= 1
+            continue
+        chunk_seconds += result["chunk_seconds"]
 
-    print("✅ Vector database created successfully.")
+        old_pages = old_files.get(rel, {}).get("pages", {})
+        pages = new_files[rel]["pages"]
+        for page_no, page_hash in result["page_hashes"].items():
+            if page_no not in result["changed"]:
+                pages[page_no] = old_pages[page_no]
+            else:
+                pages[page_no] = {"hash": page_hash, "ids": []}
+                if page_no in old_pages:
+                    file_deletes.setdefault(rel, []).extend(old_pages[page_no]["ids"])
+        for chunk_id, _, metadata in result["chunks"]:
+            pages[str(metadata["page"])]["ids"].append(chunk_id)
+            file_added.setdefault(rel, []).append(chunk_id)
+        counts["pages"] += len(result["changed"])
 
+        indexer.add(result["chunks"])
 
-# -------------------- LOAD VECTOR DB --------------------
-def load_vector_db():
-    embeddings = HuggingFaceEmbeddings(
-        model_name=EMBEDDING_MODEL,
-        encode_kwargs={"normalize_embeddings": True}
+    indexer.flush()
+    vector_db = indexer.vector_db
+    added = indexer.added
+
+    timings["parse (worker cpu)"] = parse_seconds
+    timings["chunk (worker cpu)"] = chunk_seconds
+    timings["embed"] = indexer.embed_seconds
+    timings["index add"] = indexer.index_seconds
+    timings["parse/embed wall"] = time.perf_counter() - stage_start
+    print(
+        f"🧠 Embedded {added} chunk(s) in {indexer.batches} batch(es), "
+        f"final batch size {indexer.batch_size}, peak RSS {indexer.peak_rss_mb:.0f} MB"
     )
+    if cache is not None:
+        print(f"💾 Embedding cache: {cache.hits} hit(s), {cache.misses} encoded")
+        cache.close()
 
-    return FAISS.load_local(
-        VECTOR_DB_PATH,
-        embeddings,
-        allow_dangerous_deserialization=True
+    # Old vectors of successfully re-parsed files; chunks already added for a
+    # file that failed part-way are dropped again
+    delete_ids = []
+    for rel, ids in file_deletes.items():
+        if rel not in failures:
+            delete_ids.extend(ids)
+    for rel, ids in file_added.items():
+        if rel in failures:
+            delete_ids.extend(ids)
+
+    # Pages that no longer exist in changed files, and removed documents
+    for rel in file_hashes:
+        if rel in failures:
+            continue
+        for page_no, old_page in old_files.get(rel, {}).get("pages", {}).items():
+            if page_no not in new_files[rel]["pages"]:
+                delete_ids.extend(old_page["ids"])
+    for rel, old_entry in old_files.items():
+        if rel not in new_files:
+            counts["removed"] += 1
+            for old_page in old_entry["pages"].values():
+                delete_ids.extend(old_page["ids"])
+
+    print(
+        f"🔢 {counts['pages']} page(s) re-embedded, {added} chunk(s) added, "
+        f"{len(delete_ids)} chunk(s) deleted, {counts['removed']} file(s) removed"
     )
+    if failures:
+        print(f"⚠️ {len(failures)} file(s) could not be ingested (previous version kept where there was one):")
+        for rel, error in sorted(failures.items()):
+            print(f"   {rel}: {error}")
+
+    if vector_db is None:
+        print("⚠️ No content to index.")
+        return None
+
+    target_type = current_type
+    if current_type == "flat":
+        target_type = resolve_index_type(vector_db.index.ntotal - len(delete_ids), index_type)
+
+    if (incremental and not counts["changed"] and not counts["removed"]
+            and target_type == current_type and has_lexical_index(current_path)):
+        print(f"✅ Vector database already up to date (version {current_version}).")
+        _print_timings(timings)
+        return current_version
+
+    stage_start = time.perf_counter()
+    if delete_ids:
+        vector_db.delete(delete_ids)
+    timings["delete"] = time.perf_counter() - stage_start
+
+    # Flat -> ANN conversion: rows keep their order, so labels stay valid
+    if target_type != current_type:
+        stage_start = time.perf_counter()
+        vectors = vector_db.index.reconstruct_n(0, vector_db.index.ntotal)
+        vector_db.index, index_params = build_ann_index(vectors, target_type)
+        del vectors
+        timings[f"train + build {target_type}"] = time.perf_counter() - stage_start
+        print(f"🧭 Built {index_params['type']} index: {json.dumps(index_params)}")
+    elif incremental:
+        index_params = dict(current_params, ntotal=int(vector_db.index.ntotal))
+    else:
+        index_params = {"type": "flat", "ntotal": int(vector_db.index.ntotal)}
+
+    manifest["files"] = new_files
+    manifest["root"] = root
+    version, version_path = new_version_dir()
+
+    # BM25 index over the final rows, for hybrid retrieval
+    stage_start = time.perf_counter()
+    lexical = save_lexical_index(version_path, (
+        vector_db.docstore.search(vector_db.index_to_docstore_id[row]).page_content
+        for row in range(vector_db.index.ntotal)
+    ))
+    timings["lexical index"] = time.perf_counter() - stage_start
+    print(f"🔤 Lexical index: {lexical['terms']} terms, {lexical['postings']} postings")
+
+    # Write into the fresh version directory, then flip CURRENT atomically
+    stage_start = time.perf_counter()
+    save_faiss(vector_db, version_path)
+    _save_manifest(version_path, manifest)
+    _save_index_params(version_path, index_params)
+    publish_version(version)
+    prune_versions()
+    timings["save + publish"] = time.perf_counter() - stage_start
+    timings["total"] = time.perf_counter() - total_start
+
+    print(f"✅ Vector database created successfully (version {version}).")
+    _print_timings(timings)
+    return version
+
+
+# -------------------- LOAD VECTOR DB --------------------
+def load_vector_db():
+    """Return the process-wide shared FAISS index (loaded on first call)."""
+    return registry.get_vector_db()
 
 
 # -------------------- ENTRY POINT --------------------
 if __name__ == "__main__":
-    pdf_path = os.path.join(DATA_DIR, "Annual-Report-2024-25.pdf")
-    build_vector_db(pdf_path)
+    parser = argparse.ArgumentParser(description="Build or refresh the FAISS knowledge base")
+    parser.add_argument("path", nargs="?", default=DATA_DIR, help="PDF file or directory of PDFs")
+    parser.add_argument("--full", action="store_true", help="ignore the manifest and rebuild everything")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS, help="parser processes (1 = inline)")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE, help="chunks per embedding batch")
+    parser.add_argument("--max-rss-mb", type=float, default=INGEST_MAX_RSS_MB, help="memory ceiling (0 = unlimited)")
+    parser.add_argument("--no-cache", action="store_true", help="bypass the embedding cache")
+    parser.add_argument("--index-type", default=INDEX_TYPE, choices=["auto", "flat", "ivf", "ivfpq", "hnsw"],
+                        help="FAISS index type (auto picks by corpus size)")
+    parser.add_argument("--allow-empty", action="store_true",
+                        help="publish an empty index when no PDFs are found")
+    args = parser.parse_args()
+
+    try:
+        build_vector_db(
+            args.path,
+            full_rebuild=args.full,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            max_rss_mb=args.max_rss_mb,
+            use_cache=not args.no_cache,
+            index_type=args.index_type,
+            allow_empty=args.allow_empty
+        )
+    except (FileNotFoundError, ValueError) as e:
+        parser.exit(1, f"❌ {e}\n")
@@ -0,0 +1,257 @@
+import time
+import asyncio
+import threading
+
+
+class RateLimitExceeded(RuntimeError):
+    """Raised when no token becomes available within the wait budget."""
+
+
+# ============ TOKEN BUCKET ============
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, at most `capacity`
+    stored for bursts. A rate of 0 disables limiting.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.waits = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def _take(self) -> float:
+        """Take a token and return 0, or return the seconds until one is available."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def _give_up(self):
+        with self._lock:
+            self.rejected += 1
+        return False
+
+    def acquire(self, timeout: float = None) -> bool:
+        """Block until a token is taken (True) or `timeout` seconds pass (False)."""
+        if self.rate <= 0:
+            return True
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        waited = False
+        while True:
+            wait = self._take()
+            if not wait:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return self._give_up()
+            if not waited:
+                waited = True
+                with self._lock:
+                    self.waits += 1
+            time.sleep(wait)
+
+    async def acquire_async(self, timeout: float = None) -> bool:
+        """acquire() for coroutines: sleeps without blocking the event loop."""
+        if self.rate <= 0:
+            return True
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        waited = False
+        while True:
+            wait = self._take()
+            if not wait:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return self._give_up()
+            if not waited:
+                waited = True
+                with self._lock:
+                    self.waits += 1
+            await asyncio.sleep(wait)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rate_per_s": self.rate,
+                "capacity": self.capacity,
+                "tokens": round(self.tokens, 2),
+                "waits": self.waits,
+                "rejected": self.rejected,
+            }
+
+
+# ============ SINGLE-FLIGHT ============
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _Stream:
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.consumers = 0
+        self.cancelled = False
+        self.cond = threading.Condition()
+
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight calls: the first caller for a key runs the
+    upstream call, later callers with the same key wait for and share its
+    result (or its exception). Nothing is cached after the call finishes.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._tasks = {}
+        self._streams = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+        self.abandoned = 0
+
+    def _join(self, table: dict, key, factory):
+        """Return (entry, is_leader) for key, creating the entry if needed."""
+        with self._lock:
+            entry = table.get(key)
+            if entry is None:
+                entry = table[key] = factory()
+                self.leaders += 1
+                return entry, True
+            self.coalesced += 1
+            return entry, False
+
+    def do(self, key, func):
+        call, leader = self._join(self._calls, key, _Call)
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    async def do_async(self, key, coro_func):
+        # Tasks belong to one event loop, so callers only share within a loop
+        loop = asyncio.get_running_loop()
+        task_key = (loop, key)
+
+        task, leader = self._join(self._tasks, task_key, lambda: loop.create_task(coro_func()))
+        if leader:
+            task.add_done_callback(lambda _: self._forget(task_key))
+
+        # shield: a cancelled waiter must not cancel the shared call
+        return await asyncio.shield(task)
+
+    def _forget(self, task_key):
+        with self._lock:
+            self._tasks.pop(task_key, None)
+
+    def stream(self, key, func):
+        """
+        Shared streaming call: the upstream iterator is drained by a
+        background thread into a buffer, and every consumer - including
+        late joiners - replays the buffer from the first chunk. When the
+        last consumer goes away before the end, the upstream is closed.
+        """
+        # Join and count under one lock hold, so a stream whose last
+        # consumer just left is never joined
+        with self._lock:
+            flight = self._streams.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._streams[key] = _Stream()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+            flight.consumers += 1
+        if leader:
+            threading.Thread(
+                target=self._pump, args=(key, flight, func), daemon=True
+            ).start()
+
+        try:
+            index = 0
+            while True:
+                with flight.cond:
+                    while index >= len(flight.chunks) and not flight.done:
+                        flight.cond.wait()
+                    if index < len(flight.chunks):
+                        chunk = flight.chunks[index]
+                        index += 1
+                    elif flight.error is not None:
+                        raise flight.error
+                    else:
+                        return
+                yield chunk
+        finally:
+            self._leave(key, flight)
+
+    def _leave(self, key, flight: _Stream):
+        with self._lock:
+            flight.consumers -= 1
+            if flight.consumers or flight.done:
+                return
+            self.abandoned += 1
+            if self._streams.get(key) is flight:
+                self._streams.pop(key)
+        with flight.cond:
+            flight.cancelled = True
+
+    def _pump(self, key, flight: _Stream, func):
+        upstream = None
+        try:
+            upstream = func()
+            for chunk in upstream:
+                with flight.cond:
+                    if flight.cancelled:
+                        break
+                    flight.chunks.append(chunk)
+                    flight.cond.notify_all()
+        except BaseException as e:
+            flight.error = e
+        finally:
+            # Closing a generator runs its cleanup (e.g. the HTTP response)
+            close = getattr(upstream, "close", None)
+            if close is not None:
+                try:
+                    close()
+                except Exception:
+                    pass
+            # New callers start a fresh call; current consumers finish the buffer
+            with self._lock:
+                if self._streams.get(key) is flight:
+                    self._streams.pop(key)
+            with flight.cond:
+                flight.done = True
+                flight.cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "abandoned_streams": self.abandoned,
+                "in_flight": len(self._calls) + len(self._tasks) + len(self._streams),
+            }
@@ -0,0 +1,144 @@
+import os
+import time
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ============ CONFIGURATION ============
+RERANK_ENABLED = os.getenv("RAG_RERANK", "0") == "1"
+RERANK_MODEL = os.getenv("RAG_RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RAG_RERANK_CANDIDATES", 10))   # chunks retrieved for reranking
+RERANK_TOP_N = int(os.getenv("RAG_RERANK_TOP_N", 3))              # chunks kept for the prompt
+RERANK_BUDGET_MS = float(os.getenv("RAG_RERANK_BUDGET_MS", 150))  # skip when the estimate exceeds it
+RERANK_MAX_LENGTH = 256   # query + 350-char chunk fits well within this
+
+# Cost estimate: moving average of ms per (query, chunk) pair. Every
+# PROBE_EVERY-th skipped call reranks anyway, so one slow run cannot
+# disable reranking for good
+COST_SMOOTHING = 0.2
+PROBE_EVERY = 20
+
+
+# ============ MODEL ============
+_model = None
+_model_loaded = False
+_model_lock = threading.Lock()
+
+
+def _get_model():
+    """CPU CrossEncoder, or None when sentence-transformers/the model is unavailable."""
+    global _model, _model_loaded
+    if not _model_loaded:
+        with _model_lock:
+            if not _model_loaded:
+                start = time.perf_counter()
+                try:
+                    from sentence_transformers import CrossEncoder
+                    _model = CrossEncoder(RERANK_MODEL, max_length=RERANK_MAX_LENGTH, device="cpu")
+                except Exception as e:
+                    print(f"⚠️ Reranker unavailable ({e}), keeping retrieval order")
+                    _model = None
+                _stats["load_seconds"] = round(time.perf_counter() - start, 3)
+                _model_loaded = True
+    return _model
+
+
+def warm_up() -> bool:
+    """Load the model ahead of the first query; False when it is unavailable."""
+    return _get_model() is not None
+
+
+# ============ RERANKING ============
+_stats = {
+    "calls": 0,
+    "reranked": 0,
+    "skipped_budget": 0,
+    "skipped_unavailable": 0,
+    "pairs": 0,
+    "rerank_ms": 0.0,
+    "load_seconds": None,
+}
+_cost = {"per_pair_ms": None, "skips_since_probe": 0}
+_stats_lock = threading.Lock()
+
+
+def estimate_ms(pairs: int):
+    """Expected latency of reranking `pairs` chunks (None before the first run)."""
+    per_pair = _cost["per_pair_ms"]
+    return None if per_pair is None else per_pair * pairs
+
+
+def _within_budget(pairs: int, budget_ms: float) -> bool:
+    with _stats_lock:
+        estimate = estimate_ms(pairs)
+        if estimate is None or estimate <= budget_ms:
+            return True
+        _cost["skips_since_probe"] += 1
+        if _cost["skips_since_probe"] >= PROBE_EVERY:
+            _cost["skips_since_probe"] = 0
+            return True
+        _stats["skipped_budget"] += 1
+        return False
+
+
+def _record(pairs: int, elapsed_ms: float):
+    with _stats_lock:
+        per_pair = elapsed_ms / pairs
+        previous = _cost["per_pair_ms"]
+        _cost["per_pair_ms"] = per_pair if previous is None else (
+            (1 - COST_SMOOTHING) * previous + COST_SMOOTHING * per_pair
+        )
+        _stats["reranked"] += 1
+        _stats["pairs"] += pairs
+        _stats["rerank_ms"] += elapsed_ms
+
+
+def rerank(query: str, docs: list, scores: list, top_n: int = RERANK_TOP_N,
+           budget_ms: float = RERANK_BUDGET_MS) -> tuple:
+    """
+    Reorder retrieved chunks by cross-encoder relevance to `query`.
+
+    All (query, chunk) pairs are scored in one batched forward pass. When
+    the expected latency exceeds budget_ms, or no model is available, the
+    retrieval order is kept. Either way the best top_n chunks are returned
+    as (docs, scores); scores are cross-encoder logits when reranked.
+    """
+    with _stats_lock:
+        _stats["calls"] += 1
+
+    if len(docs) <= 1:
+        return docs[:top_n], scores[:top_n]
+
+    model = _get_model()
+    if model is None:
+        with _stats_lock:
+            _stats["skipped_unavailable"] += 1
+        return docs[:top_n], scores[:top_n]
+
+    if not _within_budget(len(docs), budget_ms):
+        return docs[:top_n], scores[:top_n]
+
+    start = time.perf_counter()
+    logits = model.predict(
+        [(query, doc.page_content) for doc in docs],
+        batch_size=len(docs),
+        show_progress_bar=False
+    )
+    _record(len(docs), (time.perf_counter() - start) * 1000)
+
+    ranked = sorted(zip(docs, (float(s) for s in logits)), key=lambda pair: pair[1], reverse=True)[:top_n]
+    return [doc for doc, _ in ranked], [score for _, score in ranked]
+
+
+def get_rerank_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+        per_pair = _cost["per_pair_ms"]
+    stats["enabled"] = RERANK_ENABLED
+    stats["model"] = RERANK_MODEL
+    stats["budget_ms"] = RERANK_BUDGET_MS
+    stats["per_pair_ms"] = round(per_pair, 3) if per_pair is not None else None
+    stats["avg_ms"] = round(stats["rerank_ms"] / stats["reranked"], 2) if stats["reranked"] else 0.0
+    stats["rerank_ms"] = round(stats["rerank_ms"], 1)
+    return stats
@@ -0,0 +1,406 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ============ CONFIGURATION ============
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SESSION_STORE = os.getenv("SESSION_STORE", "sqlite")          # memory | sqlite | redis
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", os.path.join(BASE_DIR, "session_store.sqlite"))
+REDIS_URL = os.getenv("REDIS_URL", "")
+SESSION_TTL = float(os.getenv("SESSION_TTL", 7 * 24 * 3600))   # idle seconds before a session expires
+SESSION_HISTORY_LIMIT = int(os.getenv("SESSION_HISTORY_LIMIT", 200))
+# Seconds between sweeps that delete expired sessions (memory and sqlite
+# stores; Redis expires keys itself). A sweep runs on the next write after this
+SESSION_PURGE_INTERVAL = float(os.getenv("SESSION_PURGE_INTERVAL", 3600))
+
+
+# ============ BASE INTERFACE ============
+class SessionStore(ABC):
+    """
+    Conversation state kept outside the agent object.
+
+    A session has a small JSON state dict (pending_action, user_info) and an
+    append-only chat history. Any worker process holding the same store can
+    pick up a session, so agents themselves carry no conversation state.
+    """
+
+    @abstractmethod
+    def load_state(self, session_id: str) -> dict:
+        ...
+
+    @abstractmethod
+    def save_state(self, session_id: str, state: dict):
+        ...
+
+    @abstractmethod
+    def append_message(self, session_id: str, message: dict):
+        ...
+
+    @abstractmethod
+    def get_history(self, session_id: str, limit: int = None) -> list:
+        ...
+
+    @abstractmethod
+    def clear_history(self, session_id: str):
+        ...
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        ...
+
+    def purge_expired(self) -> int:
+        """Delete sessions idle for longer than the TTL; returns how many went."""
+        return 0
+
+
+# ============ IN-MEMORY ============
+class InMemorySessionStore(SessionStore):
+    """Process-local store (state is lost on restart; single worker only)."""
+
+    def __init__(self, ttl: float = SESSION_TTL, history_limit: int = SESSION_HISTORY_LIMIT,
+                 purge_interval: float = SESSION_PURGE_INTERVAL):
+        self.ttl = ttl
+        self.history_limit = history_limit
+        self.purge_interval = purge_interval
+        self._states = {}
+        self._histories = {}
+        self._touched = {}
+        self._lock = threading.Lock()
+        self._next_purge = time.time() + purge_interval
+
+    def _touch(self, session_id: str):
+        now = time.time()
+        self._touched[session_id] = now
+        if now >= self._next_purge:
+            self._next_purge = now + self.purge_interval
+            self._purge(now)
+
+    def _purge(self, now: float) -> int:
+        expired = [sid for sid, touched in self._touched.items() if now - touched > self.ttl]
+        for session_id in expired:
+            self._states.pop(session_id, None)
+            self._histories.pop(session_id, None)
+            del self._touched[session_id]
+        return len(expired)
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            return self._purge(time.time())
+
+    def _expired(self, session_id: str) -> bool:
+        touched = self._touched.get(session_id)
+        if touched is not None and time.time() - touched > self.ttl:
+            self._states.pop(session_id, None)
+            self._histories.pop(session_id, None)
+            self._touched.pop(session_id, None)
+            return True
+        return False
+
+    def load_state(self, session_id: str) -> dict:
+        with self._lock:
+            if self._expired(session_id):
+                return {}
+            return json.loads(self._states.get(session_id, "{}"))
+
+    def save_state(self, session_id: str, state: dict):
+        with self._lock:
+            self._states[session_id] = json.dumps(state)
+            self._touch(session_id)
+
+    def append_message(self, session_id: str, message: dict):
+        with self._lock:
+            history = self._histories.setdefault(session_id, [])
+            history.append(dict(message))
+            del history[:-self.history_limit]
+            self._touch(session_id)
+
+    def get_history(self, session_id: str, limit: int = None) -> list:
+        with self._lock:
+            if self._expired(session_id):
+                return []
+            history = self._histories.get(session_id, [])
+            return [dict(m) for m in (history[-limit:] if limit else history)]
+
+    def clear_history(self, session_id: str):
+        with self._lock:
+            self._histories.pop(session_id, None)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._states.pop(session_id, None)
+            self._histories.pop(session_id, None)
+            self._touched.pop(session_id, None)
+
+
+# ============ SQLITE ============
+class SQLiteSessionStore(SessionStore):
+    """File-backed store shared by every process on one host; survives restarts."""
+
+    def __init__(self, db_path: str = SESSION_DB_PATH, ttl: float = SESSION_TTL,
+                 history_limit: int = SESSION_HISTORY_LIMIT, purge_interval: float = SESSION_PURGE_INTERVAL):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.history_limit = history_limit
+        self.purge_interval = purge_interval
+        self._purge_lock = threading.Lock()
+
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS session_state (
+                session_id TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS session_messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                message TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_session_messages ON session_messages (session_id, id)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_session_state_updated ON session_state (updated_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_session_messages_created ON session_messages (created_at)")
+        conn.commit()
+        conn.close()
+        # Expired rows are filtered on read; the first write (then one every
+        # purge_interval) deletes them so the file does not grow without bound
+        self._next_purge = 0.0
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def purge_expired(self) -> int:
+        cutoff = time.time() - self.ttl
+        conn = self._connect()
+        removed = conn.execute("DELETE FROM session_state WHERE updated_at <= ?", (cutoff,)).rowcount
+        conn.execute("DELETE FROM session_messages WHERE created_at <= ?", (cutoff,))
+        conn.commit()
+        conn.close()
+        return removed
+
+    def _maybe_purge(self):
+        """Run purge_expired at most once per purge_interval in this process."""
+        now = time.time()
+        if now < self._next_purge or not self._purge_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_purge = now + self.purge_interval
+            self.purge_expired()
+        finally:
+            self._purge_lock.release()
+
+    def load_state(self, session_id: str) -> dict:
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT state FROM session_state WHERE session_id = ? AND updated_at > ?",
+            (session_id, time.time() - self.ttl)
+        ).fetchone()
+        conn.close()
+        return json.loads(row[0]) if row else {}
+
+    def save_state(self, session_id: str, state: dict):
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO session_state (session_id, state, updated_at) VALUES (?, ?, ?)",
+            (session_id, json.dumps(state), time.time())
+        )
+        conn.commit()
+        conn.close()
+        self._maybe_purge()
+
+    def append_message(self, session_id: str, message: dict):
+        conn = self._connect()
+        conn.execute(
+            "INSERT INTO session_messages (session_id, message, created_at) VALUES (?, ?, ?)",
+            (session_id, json.dumps(message), time.time())
+        )
+        # Keep only the newest history_limit messages for this session
+        conn.execute("""
+            DELETE FROM session_messages WHERE session_id = ? AND id NOT IN (
+                SELECT id FROM session_messages WHERE session_id = ? ORDER BY id DESC LIMIT ?
+            )
+        """, (session_id, session_id, self.history_limit))
+        conn.commit()
+        conn.close()
+        self._maybe_purge()
+
+    def get_history(self, session_id: str, limit: int = None) -> list:
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT message FROM session_messages WHERE session_id = ? AND created_at > ? "
+            "ORDER BY id DESC LIMIT ?",
+            (session_id, time.time() - self.ttl, limit or self.history_limit)
+        ).fetchall()
+        conn.close()
+        return [json.loads(row[0]) for row in reversed(rows)]
+
+    def clear_history(self, session_id: str):
+        conn = self._connect()
+        conn.execute("DELETE FROM session_messages WHERE session_id = ?", (session_id,))
+        conn.commit()
+        conn.close()
+
+    def delete(self, session_id: str):
+        conn = self._connect()
+        conn.execute("DELETE FROM session_state WHERE session_id = ?", (session_id,))
+        conn.execute("DELETE FROM session_messages WHERE session_id = ?", (session_id,))
+        conn.commit()
+        conn.close()
+
+
+# ============ REDIS ============
+class RedisSessionStore(SessionStore):
+    """
+    Store for multi-host deployments. Works with any client exposing the
+    redis-py calls used here (get, set with ex=, delete, rpush, ltrim,
+    lrange, expire) - a real redis.Redis or the LocalRedis stand-in.
+    """
+
+    def __init__(self, client, prefix: str = "session", ttl: float = SESSION_TTL,
+                 history_limit: int = SESSION_HISTORY_LIMIT):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = int(ttl)
+        self.history_limit = history_limit
+
+    def _key(self, session_id: str, kind: str) -> str:
+        return f"{self.prefix}:{session_id}:{kind}"
+
+    def load_state(self, session_id: str) -> dict:
+        raw = self.client.get(self._key(session_id, "state"))
+        return json.loads(raw) if raw else {}
+
+    def save_state(self, session_id: str, state: dict):
+        self.client.set(self._key(session_id, "state"), json.dumps(state), ex=self.ttl)
+
+    def append_message(self, session_id: str, message: dict):
+        key = self._key(session_id, "history")
+        self.client.rpush(key, json.dumps(message))
+        self.client.ltrim(key, -self.history_limit, -1)
+        self.client.expire(key, self.ttl)
+
+    def get_history(self, session_id: str, limit: int = None) -> list:
+        start = -limit if limit else 0
+        raw = self.client.lrange(self._key(session_id, "history"), start, -1)
+        return [json.loads(item) for item in raw]
+
+    def clear_history(self, session_id: str):
+        self.client.delete(self._key(session_id, "history"))
+
+    def delete(self, session_id: str):
+        self.client.delete(self._key(session_id, "state"), self._key(session_id, "history"))
+
+
+class LocalRedis:
+    """
+    In-process stand-in for the subset of the redis-py API that
+    RedisSessionStore uses. Handy for development and single-host runs.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._expiry = {}
+        self._lock = threading.Lock()
+
+    def _alive(self, key):
+        expires = self._expiry.get(key)
+        if expires is not None and time.time() >= expires:
+            self._data.pop(key, None)
+            self._expiry.pop(key, None)
+        return key in self._data
+
+    def get(self, key):
+        with self._lock:
+            return self._data[key] if self._alive(key) else None
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = value
+            self._expiry.pop(key, None)
+            if ex:
+                self._expiry[key] = time.time() + ex
+            return True
+
+    def delete(self, *keys):
+        with self._lock:
+            removed = 0
+            for key in keys:
+                if self._alive(key):
+                    del self._data[key]
+                    removed += 1
+                self._expiry.pop(key, None)
+            return removed
+
+    def expire(self, key, seconds):
+        with self._lock:
+            if not self._alive(key):
+                return False
+            self._expiry[key] = time.time() + seconds
+            return True
+
+    def rpush(self, key, *values):
+        with self._lock:
+            items = self._data[key] if self._alive(key) else []
+            items.extend(values)
+            self._data[key] = items
+            return len(items)
+
+    def _slice(self, items, start, end):
+        length = len(items)
+        start = max(start + length if start < 0 else start, 0)
+        end = end + length if end < 0 else end
+        return start, min(end, length - 1)
+
+    def ltrim(self, key, start, end):
+        with self._lock:
+            if self._alive(key):
+                first, last = self._slice(self._data[key], start, end)
+                self._data[key] = self._data[key][first:last + 1]
+            return True
+
+    def lrange(self, key, start, end):
+        with self._lock:
+            if not self._alive(key):
+                return []
+            first, last = self._slice(self._data[key], start, end)
+            return list(self._data[key][first:last + 1])
+
+
+# ============ FACTORY ============
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def create_session_store(kind: str = SESSION_STORE) -> SessionStore:
+    if kind == "memory":
+        return InMemorySessionStore()
+    if kind == "redis":
+        if REDIS_URL:
+            import redis
+            return RedisSessionStore(redis.Redis.from_url(REDIS_URL, decode_responses=True))
+        print("⚠️ REDIS_URL not set, using the in-process LocalRedis stand-in.")
+        return RedisSessionStore(LocalRedis())
+    return SQLiteSessionStore()
+
+
+def get_session_store() -> SessionStore:
+    """Process-wide store selected by SESSION_STORE (created on first use)."""
+    global _default_store
+    if _default_store is None:
+        with _default_lock:
+            if _default_store is None:
+                _default_store = create_session_store()
+    return _default_store
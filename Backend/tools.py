@@ -52,8 +52,17 @@ def init_db():
     conn.commit()
     conn.close()
 
-# Initialize DB on module load (or call explicitly from app.py)
-init_db()
+# Tables are created on first use, so importing the tools costs no DB I/O
+_db_ready = False
+
+
+def _connect():
+    """Connect to the tickets/meetings DB, creating the tables the first time."""
+    global _db_ready
+    if not _db_ready:
+        init_db()
+        _db_ready = True
+    return sqlite3.connect(DB_PATH)
 
 # ============ EMAIL CONFIGURATION ============
 SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
@@ -92,7 +101,7 @@ def create_it_ticket(issue: str, user_name: str = "User", user_email: str = "",
     Create an IT support ticket
     """
     # Generate ID
-    conn = sqlite3.connect(DB_PATH)
+    conn = _connect()
     cursor = conn.cursor()
     
     # Simple ID generation logic based on count
@@ -146,7 +155,7 @@ def schedule_meeting(
     """
     Schedule a meeting with HR or other department
     """
-    conn = sqlite3.connect(DB_PATH)
+    conn = _connect()
     cursor = conn.cursor()
     
     cursor.execute("SELECT COUNT(*) FROM meetings")
@@ -220,7 +229,7 @@ def issue_detector(query: str) -> dict:
 
 def get_ticket_status(ticket_id: str) -> dict:
     """Get status of a support ticket"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = _connect()
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     
@@ -235,7 +244,7 @@ def get_ticket_status(ticket_id: str) -> dict:
 
 def get_all_tickets() -> list:
     """Get all tickets (for admin dashboard)"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = _connect()
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     
@@ -248,7 +257,7 @@ def get_all_tickets() -> list:
 
 def get_all_meetings() -> list:
     """Get all meeting requests (for HR dashboard)"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = _connect()
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     
@@ -261,7 +270,7 @@ def get_all_meetings() -> list:
 
 def get_user_tickets(user_id: int) -> list:
     """Get tickets created by a specific user"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = _connect()
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     
@@ -274,7 +283,7 @@ def get_user_tickets(user_id: int) -> list:
 
 def get_user_meetings(user_id: int) -> list:
     """Get meetings created by a specific user"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = _connect()
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     
@@ -1,7 +1,11 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
-from Backend.auth import login_user, create_user
+from Backend.auth import login_user, create_user, get_user_by_username, issue_session_token, read_session_token
 import os
+import json
+import weakref
+import argparse
+import threading
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,6 +13,83 @@ load_dotenv()
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
+# ==================== SESSION TOKENS ====================
+# /api/login issues a signed token naming the user and a fresh chat session;
+# the chat routes trust only the token, never a username/session_id in the body.
+# Tokens are signed with API_SECRET_KEY (see Backend/auth.py)
+
+def _read_token():
+    """Token payload from `Authorization: Bearer <token>`, or None."""
+    header = request.headers.get('Authorization', '')
+    if not header.startswith('Bearer '):
+        return None
+    return read_session_token(header[len('Bearer '):].strip())
+
+
+def _unauthorized():
+    return jsonify({'success': False, 'message': 'Login required'}), 401
+
+# ==================== CHAT SESSIONS ====================
+# Concurrent chat requests per process; extra requests wait up to
+# API_QUEUE_TIMEOUT seconds, then get 503 so a load balancer can retry elsewhere
+API_MAX_CONCURRENT_CHATS = int(os.getenv("API_MAX_CONCURRENT_CHATS", 32))
+API_QUEUE_TIMEOUT = float(os.getenv("API_QUEUE_TIMEOUT", 5))
+
+_chat_slots = threading.BoundedSemaphore(API_MAX_CONCURRENT_CHATS)
+
+# Conversation state lives in the session store (SESSION_STORE), so agents
+# are rebuilt per request and any worker can serve any session. The lock
+# only serializes messages of one session inside this process. Entries live
+# exactly as long as a request holds the lock object, so a lock in use is
+# never dropped and idle sessions cost nothing.
+class _SessionLock:
+    """threading.Lock that can be held in a WeakValueDictionary."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self._lock.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self._lock.release()
+
+
+_session_locks = weakref.WeakValueDictionary()
+_session_locks_guard = threading.Lock()
+
+
+def _get_session(session_id, username):
+    """Return (agent, lock) for a chat session of an authenticated user."""
+    # Imported lazily: the auth routes don't need the LLM/RAG stack
+    from Backend.agent import get_agent
+
+    user_info = get_user_by_username(username)
+    agent = get_agent(user_info=user_info, session_id=session_id)
+
+    with _session_locks_guard:
+        lock = _session_locks.get(session_id)
+        if lock is None:
+            lock = _session_locks[session_id] = _SessionLock()
+    return agent, lock
+
+
+def _read_chat_request():
+    """(message, session_id, username); session and user come from the token only."""
+    data = request.get_json(silent=True) or {}
+    message = (data.get('message') or '').strip()
+    token = _read_token()
+    if token is None:
+        return message, None, None
+    return message, token['sid'], token['username']
+
+
+def _busy_response():
+    response = jsonify({'success': False, 'message': 'Server busy, please retry'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 # ==================== ROUTES ====================
 
 @app.route('/api/login', methods=['POST'])
@@ -25,10 +106,13 @@ def api_login():
         result = login_user(username, password)
         
         if result['success']:
+            token, session_id = issue_session_token(result['user'])
             return jsonify({
                 'success': True, 
                 'message': 'Login successful',
-                'user': result['user']
+                'user': result['user'],
+                'token': token,
+                'session_id': session_id
             }), 200
         else:
             return jsonify({
@@ -78,12 +162,121 @@ def api_signup():
         return jsonify({'success': False, 'message': 'Server error occurred'}), 500
 
 
+@app.route('/api/chat', methods=['POST'])
+def api_chat():
+    """Send one message to the enterprise agent for a session."""
+    message, session_id, username = _read_chat_request()
+    if session_id is None:
+        return _unauthorized()
+    if not message:
+        return jsonify({'success': False, 'message': 'Message is required'}), 400
+
+    if not _chat_slots.acquire(timeout=API_QUEUE_TIMEOUT):
+        return _busy_response()
+
+    try:
+        agent, session_lock = _get_session(session_id, username)
+        with session_lock:
+            result = agent.invoke(message)
+            pending = agent.pending_action is not None
+
+        return jsonify({
+            'success': True,
+            'session_id': session_id,
+            'output': result.get('output', ''),
+            'pending_confirmation': pending
+        }), 200
+
+    except Exception as e:
+        print(f"Chat error: {str(e)}")
+        return jsonify({'success': False, 'message': 'Server error occurred'}), 500
+
+    finally:
+        _chat_slots.release()
+
+
+@app.route('/api/chat/stream', methods=['POST'])
+def api_chat_stream():
+    """Same as /api/chat, but streams the reply as Server-Sent Events."""
+    message, session_id, username = _read_chat_request()
+    if session_id is None:
+        return _unauthorized()
+    if not message:
+        return jsonify({'success': False, 'message': 'Message is required'}), 400
+
+    if not _chat_slots.acquire(timeout=API_QUEUE_TIMEOUT):
+        return _busy_response()
+
+    released = []
+
+    def release_slot():
+        # Runs from the generator and from call_on_close; release only once
+        if not released:
+            released.append(True)
+            _chat_slots.release()
+
+    try:
+        agent, session_lock = _get_session(session_id, username)
+    except Exception as e:
+        release_slot()
+        print(f"Chat error: {str(e)}")
+        return jsonify({'success': False, 'message': 'Server error occurred'}), 500
+
+    def events():
+        try:
+            with session_lock:
+                for token in agent.stream(message):
+                    yield f"data: {json.dumps({'token': token})}\n\n"
+                pending = agent.pending_action is not None
+
+            done = {'session_id': session_id, 'pending_confirmation': pending}
+            yield f"event: done\ndata: {json.dumps(done)}\n\n"
+
+        except Exception as e:
+            print(f"Chat stream error: {str(e)}")
+            yield f"event: error\ndata: {json.dumps({'message': 'Server error occurred'})}\n\n"
+
+        finally:
+            release_slot()
+
+    response = Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    response.call_on_close(release_slot)
+    return response
+
+
 @app.route('/api/health', methods=['GET'])
 def health():
     """Health check endpoint."""
     return jsonify({'status': 'ok', 'message': 'API is running'}), 200
 
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """
+    Counters of this worker process for dashboards: LLM calls, failovers,
+    throttling and breaker state, cache hit rates, intent routing, context
+    packing, the loaded index and reranking. Each worker reports its own.
+    """
+    from Backend import (
+        get_llm_stats, get_cache_stats, get_intent_stats,
+        get_context_stats, get_registry_stats, get_rerank_stats,
+    )
+
+    return jsonify({
+        'pid': os.getpid(),
+        'llm': get_llm_stats(),
+        'cache': get_cache_stats(),
+        'intent': get_intent_stats(),
+        'context': get_context_stats(),
+        'retrieval': get_registry_stats(),
+        'rerank': get_rerank_stats(),
+    }), 200
+
+
 # ==================== ERROR HANDLERS ====================
 
 @app.errorhandler(404)
@@ -96,9 +289,52 @@ def internal_error(error):
     return jsonify({'success': False, 'message': 'Internal server error'}), 500
 
 
+# ==================== SERVER ====================
+
+def serve(host='0.0.0.0', port=5000, workers=1, threads=8):
+    """
+    Run behind a production server: gunicorn (multiple worker processes,
+    POSIX only) when installed, otherwise waitress (threads, cross-platform).
+    """
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        BaseApplication = None
+
+    if BaseApplication is None:
+        from waitress import serve as waitress_serve
+        print(f"🚀 Starting API with waitress ({threads} threads) on http://{host}:{port}")
+        waitress_serve(app, host=host, port=port, threads=threads)
+        return
+
+    class GunicornServer(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f"{host}:{port}")
+            self.cfg.set('workers', workers)
+            self.cfg.set('threads', threads)
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('timeout', 120)
+
+        def load(self):
+            return app
+
+    print(f"🚀 Starting API with gunicorn ({workers} workers x {threads} threads) on http://{host}:{port}")
+    GunicornServer().run()
+
+
 # ==================== MAIN ====================
 
 if __name__ == '__main__':
-    print("🚀 Starting Flask API on http://localhost:5000")
-    print("📝 Make sure the Streamlit app is running on http://localhost:8501")
-    app.run(debug=True, port=5000, host='0.0.0.0')
+    parser = argparse.ArgumentParser(description="Enterprise assistant API")
+    parser.add_argument('--serve', action='store_true', help='run with a production server instead of the Flask dev server')
+    parser.add_argument('--port', type=int, default=int(os.getenv('API_PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=int(os.getenv('API_WORKERS', 1)), help='worker processes (gunicorn only)')
+    parser.add_argument('--threads', type=int, default=int(os.getenv('API_THREADS', 8)), help='threads per worker')
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(port=args.port, workers=args.workers, threads=args.threads)
+    else:
+        print(f"🚀 Starting Flask API on http://localhost:{args.port}")
+        print("📝 Make sure the Streamlit app is running on http://localhost:8501")
+        app.run(debug=True, port=args.port, host='0.0.0.0', threaded=True)
@@ -10,9 +10,8 @@ import os
 load_dotenv()
 
 # -------------------- BACKEND --------------------
-from Backend.agent import get_agent
 from Backend.tools import get_all_tickets, get_all_meetings, get_user_tickets, get_user_meetings
-from Backend.auth import login_user, create_user, get_user_by_username
+from Backend.auth import login_user, create_user, get_user_by_username, issue_session_token, read_session_token
 
 # -------------------- PAGE CONFIG --------------------
 st.set_page_config(
@@ -37,6 +36,8 @@ if "pending_alerts" not in st.session_state:
     st.session_state.pending_alerts = []
 if "show_activity_log" not in st.session_state:
     st.session_state.show_activity_log = False
+if "chat_session_id" not in st.session_state:
+    st.session_state.chat_session_id = None
 
 def add_notification(message, type="info"):
     """Centralized notification handler (Toast + History + Browser Push)"""
@@ -74,13 +75,23 @@ def notify_status_change():
         st.toast("Notifications silenced") # Don't add to log if muted? Actually, maybe we should.
 
 # -------------------- SESSION RECOVERY --------------------
-# Check for session token in URL if not already logged in
-if "user" in st.query_params and not st.session_state.logged_in:
-    token_username = st.query_params["user"]
-    user_info = get_user_by_username(token_username)
-    if user_info:
+# The URL carries a signed token naming the user and the chat session, so a
+# reload, reconnect or server restart restores the login and the agent's
+# session (pending yes/no confirmation, history) from the session store
+def start_chat_session(user_info):
+    """Bind a new random chat session to this login and put its token in the URL."""
+    token, session_id = issue_session_token(user_info, prefix="streamlit")
+    st.session_state.chat_session_id = session_id
+    st.query_params["session"] = token
+
+
+if "session" in st.query_params and not st.session_state.logged_in:
+    token = read_session_token(st.query_params["session"])
+    user_info = get_user_by_username(token["username"]) if token else None
+    if user_info and user_info["id"] == token["uid"]:
         st.session_state.logged_in = True
         st.session_state.user = user_info
+        st.session_state.chat_session_id = token["sid"]
 
 # -------------------- USER CONTEXT --------------------
 username_display = "User"
@@ -182,6 +193,7 @@ with st.sidebar:
             st.session_state.logged_in = False
             st.session_state.user = None
             st.session_state.agent = None  # Clear agent on logout
+            st.session_state.chat_session_id = None
             st.session_state.messages = []  # Clear chat history
             st.query_params.clear()
             add_notification("Successfully signed out.", type="info")
@@ -988,7 +1000,7 @@ if not st.session_state.logged_in:
                         st.session_state.user = result["user"]
                         st.session_state.agent = None  # Clear old agent
                         st.session_state.messages = []  # Clear old messages
-                        st.query_params["user"] = result["user"]["username"]
+                        start_chat_session(result["user"])
                         add_notification(f"Welcome back, {result['user']['full_name']}!", type="success")
                         st.rerun()
                     else:
@@ -1163,7 +1175,18 @@ with tab1:
     
     if "agent" not in st.session_state or st.session_state.agent is None:
         with st.spinner("Initializing secure enterprise environment..."):
-            st.session_state.agent = get_agent(user_info=st.session_state.user)
+            # Imported here: the login page doesn't need the LLM/RAG stack
+            from Backend.agent import get_agent
+
+            # Random id per login, restored from the signed URL token after a restart
+            if st.session_state.chat_session_id is None:
+                start_chat_session(st.session_state.user)
+            st.session_state.agent = get_agent(
+                user_info=st.session_state.user,
+                session_id=st.session_state.chat_session_id
+            )
+        if not st.session_state.messages:
+            st.session_state.messages = st.session_state.agent.history()
     
     # -------- CHAT AREA (SCROLLABLE) --------
     # Dynamic height based on whether there are messages - optimized for laptop screens
@@ -1245,6 +1268,7 @@ with tab1:
     with col_clear:
         if st.button("Clear", use_container_width=True, type="secondary"):
             st.session_state.messages = []
+            st.session_state.agent.clear_history()
             st.rerun()
     
     # -------- PROCESS INPUT --------
@@ -1252,37 +1276,62 @@ with tab1:
         st.session_state.messages.append({"role": "user", "content": user_input})
         st.rerun()
     
-    # Handle agent response separately (OUTSIDE chat container)
+    # Handle agent response: stream tokens into a bubble at the end of the chat
     if st.session_state.messages and st.session_state.messages[-1]["role"] == "user":
-        with st.spinner("Thinking..."):
-            try:
-                last_user_msg = st.session_state.messages[-1]["content"]
-                result = st.session_state.agent.invoke(last_user_msg)
-                response_text = result.get("output", "I apologize, but I couldn't process that request.")
-                
-                st.session_state.messages.append({
-                    "role": "assistant",
-                    "content": response_text
-                })
-                
-                # --- NEW: Trigger Browser Notification for Agent Update ---
-                msg_preview = response_text[:100] + "..." if len(response_text) > 100 else response_text
-                alert_type = "info"
-                if "confirmed" in response_text.lower() or "scheduled" in response_text.lower():
-                    alert_type = "success"
-                elif "error" in response_text.lower() or "failed" in response_text.lower():
-                    alert_type = "warning"
-                
-                add_notification(f"AI Update: {msg_preview}", type=alert_type)
-                
-                st.rerun()
-            except Exception as e:
-                error_msg = f"I encountered an error: {str(e)}"
-                st.session_state.messages.append({
-                    "role": "assistant",
-                    "content": error_msg
-                })
-                st.rerun()
+        with chat_container:
+            stream_placeholder = st.empty()
+
+        def render_partial(text):
+            stream_placeholder.markdown(f"""
+            <div style="display: flex; justify-content: flex-start; margin-bottom: 10px;">
+                <div class="chat-bubble assistant-bubble">
+                    {text}
+                </div>
+            </div>
+            """, unsafe_allow_html=True)
+
+        try:
+            last_user_msg = st.session_state.messages[-1]["content"]
+            reply_stream = st.session_state.agent.stream(last_user_msg)
+
+            # Spinner only until the first token arrives
+            with st.spinner("Thinking..."):
+                response_text = next(reply_stream, "")
+            render_partial(response_text)
+
+            last_render = time.time()
+            for token in reply_stream:
+                response_text += token
+                # Throttle redraws; every token would re-send the whole bubble
+                if time.time() - last_render >= 0.05:
+                    render_partial(response_text)
+                    last_render = time.time()
+            render_partial(response_text)
+
+            response_text = response_text or "I apologize, but I couldn't process that request."
+            st.session_state.messages.append({
+                "role": "assistant",
+                "content": response_text
+            })
+            
+            # --- NEW: Trigger Browser Notification for Agent Update ---
+            msg_preview = response_text[:100] + "..." if len(response_text) > 100 else response_text
+            alert_type = "info"
+            if "confirmed" in response_text.lower() or "scheduled" in response_text.lower():
+                alert_type = "success"
+            elif "error" in response_text.lower() or "failed" in response_text.lower():
+                alert_type = "warning"
+            
+            add_notification(f"AI Update: {msg_preview}", type=alert_type)
+            
+            st.rerun()
+        except Exception as e:
+            error_msg = f"I encountered an error: {str(e)}"
+            st.session_state.messages.append({
+                "role": "assistant",
+                "content": error_msg
+            })
+            st.rerun()
 
 # ==================== TAB 2: HR MEETINGS ====================
 with tab2:
@@ -0,0 +1,139 @@
+"""
+Recall-vs-latency report for the ANN index types against the flat baseline.
+
+Takes the vectors of the current index version, builds every index type
+with rag_engine.build_ann_index (same training and parameters as
+build_vector_db), and sweeps nprobe / efSearch. Recall@k is measured
+against exact flat search; latency is per single query.
+
+Usage:
+    python benchmarks/ann_benchmark.py
+    python benchmarks/ann_benchmark.py --replicate 20   # simulate a corpus 20x larger
+    python benchmarks/ann_benchmark.py --types ivf,hnsw --k 10 --queries 500
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "Backend"))
+
+import faiss  # noqa: E402
+import rag_engine  # noqa: E402
+
+NPROBE_SWEEP = [1, 2, 4, 8, 16, 32, 64, 128]
+EF_SEARCH_SWEEP = [16, 32, 64, 128, 256]
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.maximum(norms, 1e-12)).astype(np.float32)
+
+
+def load_vectors(replicate: int, noise: float, seed: int = 0) -> np.ndarray:
+    version, vector_db = rag_engine.registry.snapshot()
+    index = vector_db.index
+    print(f"📦 Index version {version}: {index.ntotal} vectors, dimension {index.d}")
+    if not isinstance(index, faiss.IndexFlat) and not isinstance(index, faiss.IndexHNSWFlat):
+        print("⚠️ Current index is not flat; reconstructed vectors may be approximate")
+    vectors = index.reconstruct_n(0, index.ntotal)
+
+    if replicate > 1:
+        rng = np.random.default_rng(seed)
+        copies = [vectors] + [
+            normalize(vectors + rng.normal(0, noise, vectors.shape).astype(np.float32))
+            for _ in range(replicate - 1)
+        ]
+        vectors = np.vstack(copies)
+        print(f"🧪 Replicated to {len(vectors)} vectors (noise sigma {noise})")
+    return np.ascontiguousarray(vectors, dtype=np.float32)
+
+
+def make_queries(vectors: np.ndarray, count: int, noise: float, seed: int = 1) -> np.ndarray:
+    """Perturbed copies of stored vectors, so every query has close neighbours."""
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(vectors), min(count, len(vectors)), replace=False)
+    return normalize(vectors[rows] + rng.normal(0, noise, (len(rows), vectors.shape[1])).astype(np.float32))
+
+
+def timed_search(index, queries: np.ndarray, k: int) -> tuple:
+    """Search one query at a time; returns (labels, latencies in ms)."""
+    labels, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        _, found = index.search(query.reshape(1, -1), k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        labels.append(found[0])
+    return np.array(labels), latencies
+
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def index_mb(index) -> float:
+    return faiss.serialize_index(index).nbytes / (1024 * 1024)
+
+
+def report(label: str, found, latencies, truth, size_mb: float):
+    print(
+        f"{label:<26}{recall(found, truth):>9.3f}"
+        f"{np.mean(latencies):>10.3f}{np.percentile(latencies, 95):>9.3f}{size_mb:>10.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall vs latency of FAISS index types on the current corpus.")
+    parser.add_argument("--types", default="ivf,ivfpq,hnsw", help="Comma-separated index types to compare")
+    parser.add_argument("--k", type=int, default=10, help="Neighbours per query")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--replicate", type=int, default=1, help="Copies of the corpus (with noise) to simulate scale")
+    parser.add_argument("--noise", type=float, default=0.05, help="Noise sigma for replicas and queries")
+    args = parser.parse_args()
+
+    vectors = load_vectors(args.replicate, args.noise)
+    queries = make_queries(vectors, args.queries, args.noise)
+    k = min(args.k, len(vectors))
+
+    flat, _ = rag_engine.build_ann_index(vectors, "flat")
+    truth, flat_latencies = timed_search(flat, queries, k)
+
+    print(f"\n{'index / setting':<26}{'recall@' + str(k):>9}{'mean ms':>10}{'p95 ms':>9}{'size MB':>10}")
+    report("flat (exact)", truth, flat_latencies, truth, index_mb(flat))
+
+    for index_type in [t.strip() for t in args.types.split(",") if t.strip()]:
+        start = time.perf_counter()
+        try:
+            index, params = rag_engine.build_ann_index(vectors, index_type)
+        except ValueError as e:
+            print(f"{index_type:<26}skipped: {e}")
+            continue
+        build_seconds = time.perf_counter() - start
+        size_mb = index_mb(index)
+        print(f"-- {params['type']} built in {build_seconds:.2f}s, stored params {params}")
+
+        ivf = rag_engine._ivf(index)
+        if ivf is not None:
+            for nprobe in [n for n in NPROBE_SWEEP if n <= ivf.nlist]:
+                ivf.nprobe = nprobe
+                found, latencies = timed_search(index, queries, k)
+                report(f"{params['type']} nprobe={nprobe}", found, latencies, truth, size_mb)
+        elif isinstance(index, faiss.IndexHNSW):
+            for ef_search in EF_SEARCH_SWEEP:
+                index.hnsw.efSearch = max(ef_search, k)
+                found, latencies = timed_search(index, queries, k)
+                report(f"hnsw efSearch={ef_search}", found, latencies, truth, size_mb)
+        else:
+            found, latencies = timed_search(index, queries, k)
+            report(params["type"], found, latencies, truth, size_mb)
+
+    print("\nSet RAG_INDEX_TYPE and RAG_NPROBE / RAG_EF_SEARCH from the row that meets your recall target.")
+    rag_engine.registry.stop_watcher()
+
+
+if __name__ == "__main__":
+    main()
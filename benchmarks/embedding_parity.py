@@ -0,0 +1,159 @@
+"""
+Parity check of the ONNX embedding backends against sentence-transformers.
+
+Encodes chunks from the current index (or built-in sentences) and a set of
+questions with the reference backend and each candidate. It reports:
+- per-text cosine similarity between the two backends' vectors
+- the largest change in any question-to-chunk cosine similarity
+- top-5 retrieval overlap
+- encode latency per text
+
+Exits with status 1 when a backend's largest similarity change exceeds its
+tolerance, so the script can gate a switch of RAG_EMBEDDING_BACKEND.
+
+Usage:
+    python Backend/embeddings.py --export            # once: writes models/all-MiniLM-L6-v2-onnx
+    python benchmarks/embedding_parity.py
+    python benchmarks/embedding_parity.py --backends onnx-int8 --int8-tolerance 0.03
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "Backend"))
+
+import rag_engine  # noqa: E402
+from embeddings import create_embeddings  # noqa: E402
+
+SENTENCES = [
+    "Total complaints reported during the year: 44",
+    "The company spent 2% of its average net profit on CSR activities.",
+    "Percentage of female employees in the workforce was 28.3%.",
+    "Revenue grew 15.2% year over year, led by digital services.",
+    "The Board met six times during the financial year 2024-25.",
+    "Employees are entitled to 30 days of paid leave per year.",
+    "Scope 1 and Scope 2 emissions fell by 12% against the 2020 baseline.",
+    "The audit committee reviews related party transactions quarterly.",
+]
+
+QUESTIONS = [
+    "How many complaints were reported?",
+    "What was the CSR spend?",
+    "What share of employees are women?",
+    "How much did revenue grow?",
+    "How often did the board meet?",
+    "What is the leave policy?",
+    "What happened to carbon emissions?",
+    "Who reviews related party transactions?",
+]
+
+
+def sample_texts(count: int, seed: int = 11) -> tuple:
+    """(chunks, questions): chunks and 12-word spans from the current index, or the built-in set."""
+    try:
+        _, path = rag_engine.get_current_version()
+        docstore, ids = rag_engine._load_docstore(path)
+        rng = random.Random(seed)
+        picked = rng.sample(list(ids.values()), min(count, len(ids)))
+        chunks = [docstore.search(doc_id).page_content for doc_id in picked]
+    except (OSError, ValueError):
+        chunks = []
+    if not chunks:
+        return SENTENCES, QUESTIONS
+
+    rng = random.Random(seed + 1)
+    spans = []
+    for text in rng.sample(chunks, min(len(chunks), 50)):
+        words = text.split()
+        start = rng.randrange(0, max(len(words) - 12, 1))
+        spans.append(" ".join(words[start:start + 12]))
+    return chunks, QUESTIONS + spans
+
+
+def encode(backend: str, chunks: list, questions: list) -> dict:
+    start = time.perf_counter()
+    embeddings = create_embeddings(rag_engine.EMBEDDING_MODEL, rag_engine.NORMALIZE_EMBEDDINGS, backend)
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    chunk_vectors = np.array(embeddings.embed_documents(chunks), dtype=np.float32)
+    batch_ms = (time.perf_counter() - start) * 1000 / len(chunks)
+
+    start = time.perf_counter()
+    question_vectors = np.array([embeddings.embed_query(q) for q in questions], dtype=np.float32)
+    query_ms = (time.perf_counter() - start) * 1000 / len(questions)
+
+    return {
+        "chunks": chunk_vectors,
+        "questions": question_vectors,
+        "load_seconds": load_seconds,
+        "batch_ms": batch_ms,
+        "query_ms": query_ms,
+    }
+
+
+def top_k_overlap(reference: np.ndarray, candidate: np.ndarray, k: int = 5) -> float:
+    k = min(k, reference.shape[1])
+    ref_top = np.argsort(-reference, axis=1)[:, :k]
+    cand_top = np.argsort(-candidate, axis=1)[:, :k]
+    return float(np.mean([len(set(r) & set(c)) / k for r, c in zip(ref_top, cand_top)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check ONNX embedding backends against the torch reference.")
+    parser.add_argument("--reference", default="torch", help="Backend treated as ground truth")
+    parser.add_argument("--backends", default="onnx,onnx-int8", help="Comma-separated backends to check")
+    parser.add_argument("--samples", type=int, default=300, help="Chunks sampled from the index")
+    parser.add_argument("--tolerance", type=float, default=1e-3, help="Max similarity change for fp32 backends")
+    parser.add_argument("--int8-tolerance", type=float, default=0.05, help="Max similarity change for onnx-int8")
+    args = parser.parse_args()
+
+    chunks, questions = sample_texts(args.samples)
+    print(f"🧮 {len(chunks)} chunks, {len(questions)} questions\n")
+
+    results = {args.reference: encode(args.reference, chunks, questions)}
+    reference = results[args.reference]
+    ref_scores = reference["questions"] @ reference["chunks"].T
+
+    print(f"{'backend':<11}{'load s':>8}{'batch ms':>10}{'query ms':>10}"
+          f"{'min cos':>9}{'max Δsim':>10}{'top-5':>7}  result")
+    print(f"{args.reference:<11}{reference['load_seconds']:>8.2f}{reference['batch_ms']:>10.2f}"
+          f"{reference['query_ms']:>10.2f}{'-':>9}{'-':>10}{'-':>7}  reference")
+
+    failed = False
+    for backend in [b.strip() for b in args.backends.split(",") if b.strip()]:
+        try:
+            result = encode(backend, chunks, questions)
+        except (FileNotFoundError, ImportError) as e:
+            print(f"{backend:<11}skipped: {e}")
+            failed = True
+            continue
+        if result["chunks"].shape != reference["chunks"].shape:
+            print(f"{backend:<11}FAIL: dimension {result['chunks'].shape[1]} != {reference['chunks'].shape[1]}")
+            failed = True
+            continue
+
+        self_cos = np.sum(result["chunks"] * reference["chunks"], axis=1)
+        scores = result["questions"] @ result["chunks"].T
+        max_delta = float(np.abs(scores - ref_scores).max())
+        tolerance = args.int8_tolerance if backend == "onnx-int8" else args.tolerance
+        passed = max_delta <= tolerance
+        failed = failed or not passed
+
+        print(
+            f"{backend:<11}{result['load_seconds']:>8.2f}{result['batch_ms']:>10.2f}"
+            f"{result['query_ms']:>10.2f}{self_cos.min():>9.4f}{max_delta:>10.4f}"
+            f"{top_k_overlap(ref_scores, scores):>7.2f}  {'PASS' if passed else 'FAIL'} (tolerance {tolerance:g})"
+        )
+
+    rag_engine.registry.stop_watcher()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Answer-grounding evaluation of the cross-encoder reranker.
+
+Retrieves RAG_RERANK_CANDIDATES chunks per question with the configured
+retriever, then compares the top RAG_RERANK_TOP_N chunks in retrieval order
+against the top chunks after reranking. A question is grounded when a
+chunk from its source file (and page, when given) is in that prompt
+context. Rerank latency is reported alongside.
+
+With --llm, both contexts are also answered by Groq with the production
+answer prompt. The script then reports how often the answer cites the
+question's page, and the share of cited pages that were actually in the
+context.
+
+Usage:
+    python benchmarks/rerank_eval.py                     # questions sampled from the index
+    python benchmarks/rerank_eval.py --queries q.jsonl   # {"query", "source", "page"} per line
+    python benchmarks/rerank_eval.py --queries q.jsonl --llm --limit 30
+"""
+import os
+import re
+import sys
+import time
+import argparse
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "Backend"))
+
+import rag_engine  # noqa: E402
+import rerank  # noqa: E402
+from context import pack_context  # noqa: E402
+from prompts import RAG_ANSWER_PROMPT  # noqa: E402
+from retrieval_benchmark import sample_queries, load_queries, is_match  # noqa: E402
+
+CITATION = re.compile(r"\[Page (\d+)\]")
+
+
+def grounding(docs: list, query: dict) -> tuple:
+    """(grounded at rank 1, grounded anywhere, reciprocal rank)."""
+    for rank, doc in enumerate(docs, 1):
+        if is_match(doc, query):
+            return rank == 1, True, 1.0 / rank
+    return False, False, 0.0
+
+
+def create_answer_llm():
+    from langchain_groq import ChatGroq
+    model = os.getenv("LLM_MODELS", "llama-3.3-70b-versatile").split(",")[0].strip()
+    return ChatGroq(model=model, temperature=0)
+
+
+def citation_scores(llm, query: dict, docs: list, scores: list) -> tuple:
+    """(question's page cited, share of citations pointing at context pages)."""
+    context = pack_context(docs, scores)["context"]
+    answer = llm.invoke(RAG_ANSWER_PROMPT.format(context=context, query=query["query"])).content
+    cited = [int(page) for page in CITATION.findall(answer)]
+    context_pages = {doc.metadata.get("page") for doc in docs}
+    page = query.get("page")
+    hit = page is not None and page in cited
+    precision = sum(p in context_pages for p in cited) / len(cited) if cited else 0.0
+    return hit, precision
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare answer grounding with and without reranking.")
+    parser.add_argument("--queries", help="JSONL file of questions (default: sampled from the index)")
+    parser.add_argument("--samples", type=int, default=100, help="Questions to sample when --queries is not given")
+    parser.add_argument("--candidates", type=int, default=rerank.RERANK_CANDIDATES, help="Chunks retrieved per question")
+    parser.add_argument("--top-n", type=int, default=rerank.RERANK_TOP_N, help="Chunks kept for the prompt")
+    parser.add_argument("--llm", action="store_true", help="Also answer with Groq and check [Page N] citations")
+    parser.add_argument("--limit", type=int, default=0, help="Questions answered with --llm (0 = all)")
+    args = parser.parse_args()
+
+    version, vector_db = rag_engine.registry.snapshot()
+    print(f"📦 Index version {version}: {vector_db.index.ntotal} chunks")
+
+    if args.queries:
+        queries = [q for q in load_queries(args.queries) if q.get("relevant", True)]
+    else:
+        queries = sample_queries(vector_db, args.samples)
+
+    retriever = rag_engine.get_shared_retriever()
+    retriever.search_kwargs = dict(retriever.search_kwargs, k=max(args.candidates, args.top_n))
+    embeddings = rag_engine.get_embeddings()
+
+    if not rerank.warm_up():
+        print("❌ No reranker model available (install sentence-transformers).")
+        return
+
+    llm = create_answer_llm() if args.llm else None
+    answered = 0
+    results = {"retrieval": [], "reranked": []}
+    citations = {"retrieval": [], "reranked": []}
+    latencies = []
+
+    for query in queries:
+        vector = embeddings.embed_query(query["query"])
+        hits = retriever.search(vector_db, vector, query["query"])
+        docs = retriever.get_documents(vector_db, hits)
+        scores = [score for _, score in hits]
+
+        baseline = (docs[:args.top_n], scores[:args.top_n])
+        start = time.perf_counter()
+        reranked = rerank.rerank(query["query"], docs, scores, top_n=args.top_n, budget_ms=float("inf"))
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        for name, (top_docs, top_scores) in (("retrieval", baseline), ("reranked", reranked)):
+            results[name].append(grounding(top_docs, query))
+            if llm is not None and (not args.limit or answered < args.limit):
+                citations[name].append(citation_scores(llm, query, top_docs, top_scores))
+        answered += 1
+
+    total = max(len(queries), 1)
+    print(f"🧮 {len(queries)} questions, {args.candidates} candidates, top {args.top_n} kept\n")
+    print(f"{'context':<12}{'grounded@1':>12}{'grounded@' + str(args.top_n):>12}{'MRR':>7}", end="")
+    print(f"{'page cited':>12}{'cite prec.':>12}" if llm is not None else "")
+    for name in ("retrieval", "reranked"):
+        at_one = sum(r[0] for r in results[name]) / total
+        anywhere = sum(r[1] for r in results[name]) / total
+        mrr = sum(r[2] for r in results[name]) / total
+        print(f"{name:<12}{at_one:>12.3f}{anywhere:>12.3f}{mrr:>7.3f}", end="")
+        if llm is not None:
+            answers = max(len(citations[name]), 1)
+            cited = sum(c[0] for c in citations[name]) / answers
+            precision = sum(c[1] for c in citations[name]) / answers
+            print(f"{cited:>12.3f}{precision:>12.3f}")
+        else:
+            print()
+
+    if latencies:
+        print(
+            f"\n⏱️ Rerank latency: mean {np.mean(latencies):.1f} ms, "
+            f"p95 {np.percentile(latencies, 95):.1f} ms for {args.candidates} chunks "
+            f"(RAG_RERANK_BUDGET_MS={rerank.RERANK_BUDGET_MS:g})"
+        )
+    rag_engine.registry.stop_watcher()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Retrieval latency / recall benchmark.
+
+Sweeps search type (similarity, mmr, and hybrid vector + BM25), k and
+fetch_k over the current index and reports recall@k, MRR and search latency
+for each setting, then shows how many in-domain and off-topic questions each
+score threshold keeps.
+
+Usage:
+    python benchmarks/retrieval_benchmark.py                   # questions sampled from the index
+    python benchmarks/retrieval_benchmark.py --queries q.jsonl # {"query", "source", "page"} per line
+
+A question counts as found when a returned chunk comes from its source file
+(and page, when given). Lines with "relevant": false are off-topic questions
+that the score threshold should reject.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "Backend"))
+
+import rag_engine  # noqa: E402
+
+OFF_TOPIC_QUERIES = [
+    "What is the capital of France?",
+    "Write a poem about the ocean",
+    "How do I bake sourdough bread?",
+    "Who won the football world cup in 2018?",
+    "Explain quantum entanglement simply",
+    "What's a good name for a pet goldfish?",
+    "How tall is Mount Everest?",
+    "Recommend a science fiction movie",
+    "Translate good morning into Spanish",
+    "What is the boiling point of water on Mars?",
+]
+
+THRESHOLDS = [0.0, 0.15, 0.2, 0.25, 0.3, 0.35, 0.4, 0.5]
+
+
+def sample_queries(vector_db, count: int, seed: int = 7) -> list:
+    """Build questions from random chunks: a 12-word span, labelled with its page."""
+    rng = random.Random(seed)
+    ids = list(vector_db.index_to_docstore_id.values())
+    queries = []
+    for doc_id in rng.sample(ids, min(count, len(ids))):
+        doc = vector_db.docstore.search(doc_id)
+        words = doc.page_content.split()
+        if len(words) < 8:
+            continue
+        start = rng.randrange(0, max(len(words) - 12, 1))
+        queries.append({
+            "query": " ".join(words[start:start + 12]),
+            "source": doc.metadata.get("source"),
+            "page": doc.metadata.get("page"),
+        })
+    return queries
+
+
+def load_queries(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def is_match(doc, query: dict) -> bool:
+    source = query.get("source")
+    if source and os.path.basename(str(doc.metadata.get("source", ""))) != os.path.basename(source):
+        return False
+    page = query.get("page")
+    return page is None or doc.metadata.get("page") == page
+
+
+def percentile(values: list, pct: float) -> float:
+    return float(np.percentile(values, pct)) if values else 0.0
+
+
+def run_setting(vector_db, queries: list, vectors: list, search_type: str, kwargs: dict) -> dict:
+    retriever = rag_engine.SharedRetriever(rag_engine.registry, search_type, kwargs)
+    latencies, found, reciprocal = [], 0, 0.0
+
+    for query, vector in zip(queries, vectors):
+        start = time.perf_counter()
+        hits = retriever.search(vector_db, vector, query["query"])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        docs = retriever.get_documents(vector_db, hits)
+        for rank, doc in enumerate(docs, 1):
+            if is_match(doc, query):
+                found += 1
+                reciprocal += 1.0 / rank
+                break
+
+    total = max(len(queries), 1)
+    return {
+        "recall": found / total,
+        "mrr": reciprocal / total,
+        "mean_ms": sum(latencies) / total,
+        "p95_ms": percentile(latencies, 95),
+    }
+
+
+def best_scores(vector_db, vectors: list) -> list:
+    """Top cosine similarity per query vector."""
+    matrix = np.array(vectors, dtype=np.float32)
+    distances, _ = vector_db.index.search(matrix, 1)
+    return [1.0 - float(d) / 2.0 for d in distances[:, 0]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark retrieval settings on the current index.")
+    parser.add_argument("--queries", help="JSONL file of questions (default: sampled from the index)")
+    parser.add_argument("--samples", type=int, default=200, help="Questions to sample when --queries is not given")
+    parser.add_argument("--k", default="3,5,10", help="Comma-separated k values")
+    parser.add_argument("--fetch-multipliers", default="2,4", help="MMR fetch_k as multiples of k")
+    args = parser.parse_args()
+
+    version, vector_db = rag_engine.registry.snapshot()
+    print(f"📦 Index version {version}: {vector_db.index.ntotal} chunks")
+
+    if args.queries:
+        labelled = load_queries(args.queries)
+        queries = [q for q in labelled if q.get("relevant", True)]
+        off_topic = [q["query"] for q in labelled if not q.get("relevant", True)] or OFF_TOPIC_QUERIES
+    else:
+        queries = sample_queries(vector_db, args.samples)
+        off_topic = OFF_TOPIC_QUERIES
+
+    embeddings = rag_engine.get_embeddings()
+    start = time.perf_counter()
+    vectors = embeddings.embed_documents([q["query"] for q in queries])
+    embed_ms = (time.perf_counter() - start) * 1000 / max(len(queries), 1)
+    off_vectors = embeddings.embed_documents(off_topic)
+    print(f"🧮 {len(queries)} questions, {len(off_topic)} off-topic, query embedding {embed_ms:.1f} ms each\n")
+
+    k_values = [int(k) for k in args.k.split(",")]
+    multipliers = [int(m) for m in args.fetch_multipliers.split(",")]
+
+    settings = []
+    for k in k_values:
+        settings.append(("similarity", {"k": k, "fetch_k": k}))
+        for m in multipliers:
+            settings.append(("mmr", {"k": k, "fetch_k": k * m, "lambda_mult": rag_engine.SEARCH_MMR_LAMBDA}))
+        if getattr(vector_db, "lexical_index", None) is not None:
+            for m in multipliers:
+                settings.append(("hybrid", {"k": k, "fetch_k": k * m, "rrf_k": rag_engine.SEARCH_RRF_K}))
+
+    print(f"{'search':<11}{'k':>4}{'fetch_k':>9}{'recall@k':>10}{'MRR':>7}{'mean ms':>10}{'p95 ms':>9}")
+    for search_type, kwargs in settings:
+        result = run_setting(vector_db, queries, vectors, search_type, kwargs)
+        print(
+            f"{search_type:<11}{kwargs['k']:>4}{kwargs['fetch_k']:>9}"
+            f"{result['recall']:>10.3f}{result['mrr']:>7.3f}"
+            f"{result['mean_ms']:>10.2f}{result['p95_ms']:>9.2f}"
+        )
+
+    # Score threshold: share of in-domain questions still answered vs off-topic ones rejected
+    in_scores = best_scores(vector_db, vectors)
+    off_scores = best_scores(vector_db, off_vectors)
+    print(f"\n{'threshold':<11}{'in-domain kept':>16}{'off-topic rejected':>20}")
+    for threshold in sorted(set(THRESHOLDS + [rag_engine.SEARCH_SCORE_THRESHOLD])):
+        kept = sum(s >= threshold for s in in_scores) / max(len(in_scores), 1)
+        rejected = sum(s < threshold for s in off_scores) / max(len(off_scores), 1)
+        marker = "  <- RAG_SCORE_THRESHOLD" if threshold == rag_engine.SEARCH_SCORE_THRESHOLD else ""
+        print(f"{threshold:<11.2f}{kept:>16.1%}{rejected:>20.1%}{marker}")
+
+    rag_engine.registry.stop_watcher()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Cold-start cost of the three entry points, each in a fresh interpreter.
+
+- api: `import api` (Flask app, auth routes only)
+- login: the Backend imports the Streamlit login page runs (tools, auth)
+- first chat: importing the agent, building it, and the first question up
+  to the answer LLM call (embedding model, index load, retrieval, context)
+
+Each scenario reports the median wall time over --runs processes and
+which heavy dependencies ended up imported. With --importtime the slowest
+top-level packages of one run are listed from `python -X importtime`.
+
+Usage:
+    python benchmarks/startup_benchmark.py
+    python benchmarks/startup_benchmark.py --runs 5 --importtime
+    python benchmarks/startup_benchmark.py --llm   # first chat includes the Groq answer
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = [
+    "torch", "sentence_transformers", "onnxruntime", "faiss",
+    "langchain_community", "langchain_groq", "groq", "httpx", "pypdf",
+]
+
+PRELUDE = """
+import sys, time, json
+sys.path.insert(0, {root!r})
+stages = {{}}
+start = time.perf_counter()
+def mark(name):
+    global start
+    now = time.perf_counter()
+    stages[name] = (now - start) * 1000
+    start = now
+"""
+
+EPILOGUE = """
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print("@@" + json.dumps({{"stages": stages, "heavy": heavy}}))
+"""
+
+SCENARIOS = {
+    "api": """
+import api
+mark("import api")
+""",
+    "login": """
+from Backend.tools import get_all_tickets, get_all_meetings, get_user_tickets, get_user_meetings
+from Backend.auth import login_user, create_user, get_user_by_username
+mark("import tools + auth")
+""",
+    "first chat": """
+from Backend.agent import get_agent
+mark("import agent")
+agent = get_agent(session_id="startup-benchmark")
+mark("get_agent")
+if agent.retriever is None:
+    raise RuntimeError("no index - build one with: python Backend/rag_engine.py")
+if {llm!r}:
+    agent.invoke({question!r})
+    mark("first answer")
+else:
+    agent._prepare_query({question!r})
+    mark("first retrieval")
+from Backend.rag_engine import registry
+registry.stop_watcher()
+""",
+}
+
+
+def run_scenario(code: str, importtime: bool = False) -> tuple:
+    """(result dict, stderr) of one fresh interpreter running `code`."""
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    proc = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    lines = [line for line in proc.stdout.splitlines() if line.startswith("@@")]
+    if proc.returncode or not lines:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "no output")
+    return json.loads(lines[-1][2:]), proc.stderr
+
+
+def slowest_imports(stderr: str, top: int) -> list:
+    """[(cumulative ms, package)] of top-level packages (not submodules), slowest first."""
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        if "." not in name and not name.startswith("_"):
+            imports[name] = max(imports.get(name, 0.0), int(cumulative) / 1000)
+    return sorted(((ms, name) for name, ms in imports.items()), reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start import and first-chat cost.")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh processes per scenario")
+    parser.add_argument("--question", default="How many complaints were reported?", help="First chat question")
+    parser.add_argument("--llm", action="store_true", help="Include the Groq answer in the first chat")
+    parser.add_argument("--importtime", action="store_true", help="List the slowest packages of each scenario")
+    parser.add_argument("--top", type=int, default=8, help="Packages listed with --importtime")
+    args = parser.parse_args()
+
+    print(f"{'scenario':<12}{'stage':<22}{'median ms':>10}{'min ms':>9}")
+    for name, body in SCENARIOS.items():
+        code = (
+            PRELUDE.format(root=ROOT)
+            + body.format(llm=args.llm, question=args.question)
+            + EPILOGUE.format(heavy=HEAVY_MODULES)
+        )
+        try:
+            runs = [run_scenario(code)[0] for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"{name:<12}failed: {e}")
+            continue
+
+        label = name
+        for stage in runs[0]["stages"]:
+            times = [run["stages"][stage] for run in runs]
+            print(f"{label:<12}{stage:<22}{statistics.median(times):>10.0f}{min(times):>9.0f}")
+            label = ""
+        total = [sum(run["stages"].values()) for run in runs]
+        print(f"{'':<12}{'total':<22}{statistics.median(total):>10.0f}{min(total):>9.0f}")
+        print(f"{'':<12}heavy modules: {', '.join(runs[-1]['heavy']) or 'none'}")
+
+        if args.importtime:
+            _, stderr = run_scenario(code, importtime=True)
+            for ms, module in slowest_imports(stderr, args.top):
+                print(f"{'':<14}{ms:>8.0f} ms  {module}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -115,7 +115,8 @@ document.addEventListener('DOMContentLoaded', () => {
 
                     if (data.success) {
                         localStorage.setItem('user', JSON.stringify(data.user));
-                        window.location.href = `http://localhost:8501?user=${data.user.username}`;
+                        localStorage.setItem('token', data.token);   // Authorization: Bearer for /api/chat
+                        window.location.href = `http://localhost:8501?session=${encodeURIComponent(data.token)}`;
                     } else {
                         // Show forgot password link after failed login
                         const forgotPasswordContainer = document.getElementById('forgot-password-container');
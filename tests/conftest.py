@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The suite runs offline: no Groq calls, no index watcher, no model downloads
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ.setdefault("RAG_INDEX_WATCH_INTERVAL", "0")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
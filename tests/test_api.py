@@ -0,0 +1,42 @@
+import pytest
+
+flask = pytest.importorskip("flask")
+pytest.importorskip("flask_cors")
+
+import api
+from Backend import context
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(context, "_get_encoder", lambda: None)   # no tiktoken download
+    return api.app.test_client()
+
+
+def test_metrics_expose_llm_and_cache_counters(client):
+    response = client.get('/api/metrics')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert set(data) >= {'llm', 'cache', 'intent', 'context', 'retrieval', 'rerank'}
+    for model in data['llm']['models'].values():
+        assert {'failovers', 'throttled', 'breaker'} <= set(model)
+    assert {'query_embedding', 'retrieval', 'answer'} <= set(data['cache'])
+
+
+def test_session_lock_is_kept_while_held(monkeypatch):
+    import gc
+    from Backend import agent as agent_module
+
+    monkeypatch.setattr(agent_module, "get_agent", lambda **kwargs: None)
+    monkeypatch.setattr(api, "get_user_by_username", lambda username: None)
+
+    _, lock = api._get_session("s1", "alice")
+    with lock:
+        for i in range(100):   # plenty of other sessions come and go
+            api._get_session(f"other-{i}", "bob")
+        gc.collect()
+        _, again = api._get_session("s1", "alice")
+        assert again is lock
+    del lock, again
+    gc.collect()
+    assert "s1" not in api._session_locks
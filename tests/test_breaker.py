@@ -0,0 +1,193 @@
+import time
+import asyncio
+import threading
+
+import pytest
+
+from Backend.agent import CircuitBreaker, ResilientLLM
+
+
+# ============ CIRCUIT BREAKER ============
+def test_opens_after_threshold():
+    breaker = CircuitBreaker(threshold=2, cooldown=30)
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_half_open_allows_a_single_trial():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_trial_success_closes():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    ticket = breaker.allow()
+    breaker.record_success(ticket)
+    assert breaker.state == "closed"
+    assert breaker.allow() and breaker.allow()
+
+
+def test_trial_failure_reopens():
+    breaker = CircuitBreaker(threshold=3, cooldown=0.01)
+    breaker.trip()
+    time.sleep(0.02)
+    ticket = breaker.allow()
+    breaker.record_failure(ticket)
+    assert breaker.state == "open"
+
+
+def test_trip_uses_retry_after_window():
+    breaker = CircuitBreaker(cooldown=0.01)
+    breaker.trip(30)
+    time.sleep(0.02)
+    assert breaker.state == "open"
+
+
+def test_released_trial_can_be_taken_again():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    ticket = breaker.allow()
+    breaker.release_trial(ticket)
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+
+
+def test_only_one_of_racing_callers_gets_the_trial():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    start = threading.Barrier(8)
+    tickets = []
+
+    def race():
+        start.wait()
+        tickets.append(breaker.allow())
+
+    threads = [threading.Thread(target=race) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(2)
+    assert sum(1 for ticket in tickets if ticket) == 1
+
+
+def test_other_callers_cannot_settle_the_trial():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.01)
+    # Caller B got its ticket while the breaker was still closed
+    stale = breaker.allow()
+    breaker.record_failure()
+    time.sleep(0.02)
+    trial = breaker.allow()
+    assert trial
+
+    # B ends (throttled, cancelled or failed) while A's trial is in flight
+    breaker.release_trial(stale)
+    breaker.release_trial(None)
+    breaker.record_success(stale)
+    breaker.record_failure(stale)
+    breaker.record_success()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()
+
+    breaker.record_success(trial)
+    assert breaker.state == "closed"
+
+
+# ============ RESILIENT LLM ============
+class Reply:
+    content = "ok"
+
+
+class StubChat:
+    """Stands in for ChatGroq; `hang` makes ainvoke wait until cancelled."""
+
+    def __init__(self):
+        self.calls = 0
+        self.hang = False
+
+    def invoke(self, prompt, **kwargs):
+        self.calls += 1
+        return Reply()
+
+    async def ainvoke(self, prompt, **kwargs):
+        self.calls += 1
+        if self.hang:
+            await asyncio.sleep(10)
+        return Reply()
+
+
+@pytest.fixture
+def llm():
+    llm = ResilientLLM(["primary", "fallback"])
+    llm.stubs = {model: StubChat() for model in llm.models}
+    llm._client = llm.stubs.__getitem__
+    llm._aclient = llm.stubs.__getitem__
+    return llm
+
+
+def half_open(breaker):
+    breaker.trip(0.01)
+    time.sleep(0.02)
+    assert breaker.state == "half_open"
+
+
+def test_cancelled_trial_is_released(llm):
+    breaker = llm.breakers["primary"]
+    half_open(breaker)
+    llm.stubs["primary"].hang = True
+
+    async def run():
+        task = asyncio.ensure_future(llm._ainvoke("hello"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert breaker.state == "half_open"
+
+    llm.stubs["primary"].hang = False
+    assert llm.invoke("hello again").content == "ok"
+    assert breaker.state == "closed"
+    assert llm.stubs["primary"].calls == 2
+
+
+def test_throttled_trial_is_released(llm, monkeypatch):
+    breaker = llm.breakers["primary"]
+    half_open(breaker)
+    monkeypatch.setattr(llm.limiters["primary"], "acquire", lambda timeout=None: False)
+
+    assert llm.invoke("hello").content == "ok"
+    assert llm.stubs["primary"].calls == 0
+    assert llm.stubs["fallback"].calls == 1
+    assert llm.counters["primary"]["throttled"] == 1
+    assert breaker.state == "half_open"
+
+    monkeypatch.undo()
+    llm.invoke("hello again")
+    assert llm.stubs["primary"].calls == 1
+    assert breaker.state == "closed"
+
+
+def test_open_breaker_fails_over(llm):
+    llm.breakers["primary"].trip(30)
+    llm.invoke("hello")
+    assert llm.stubs["primary"].calls == 0
+    assert llm.stubs["fallback"].calls == 1
+
+
+def test_all_breakers_open(llm):
+    for breaker in llm.breakers.values():
+        breaker.trip(30)
+    with pytest.raises(RuntimeError):
+        llm.invoke("hello")
@@ -0,0 +1,69 @@
+import types
+
+import pytest
+
+from Backend import context
+from Backend.context import pack_context, count_tokens, CHUNK_SEPARATOR
+
+
+@pytest.fixture(autouse=True)
+def offline_tokenizer(monkeypatch):
+    # tiktoken downloads its vocabulary on first use; count chars / 4 instead
+    monkeypatch.setattr(context, "_get_encoder", lambda: None)
+
+
+def doc(text, page=1, source="report.pdf"):
+    return types.SimpleNamespace(page_content=text, metadata={"page": page, "source": source})
+
+
+def test_best_score_first():
+    docs = [doc("low scoring chunk", page=1), doc("high scoring chunk", page=2)]
+    packed = pack_context(docs, [0.1, 0.9])
+    assert packed["context"].index("(Page 2)") < packed["context"].index("(Page 1)")
+    assert packed["chunks"] == 2 and packed["dropped_chunks"] == 0
+
+
+def test_budget_is_respected():
+    docs = [doc("word " * 200, page=i) for i in range(10)]
+    packed = pack_context(docs, [1.0] * 10, budget=300)
+    assert packed["tokens"] <= 300
+    assert count_tokens(packed["context"]) <= 300
+    assert packed["dropped_chunks"] > 0
+
+
+def test_last_chunk_is_truncated_to_fit():
+    docs = [doc("alpha " * 100, page=1), doc("beta " * 100, page=2)]
+    packed = pack_context(docs, [0.9, 0.5], budget=220)
+    assert packed["chunks"] == 2
+    assert "beta" in packed["context"]
+    assert packed["tokens"] <= 220
+
+
+def test_contained_chunk_is_dropped():
+    docs = [doc("Total complaints reported: 44 by employees in 2023."), doc("complaints reported: 44")]
+    packed = pack_context(docs, [0.9, 0.5])
+    assert packed["chunks"] == 1
+    assert packed["deduped_chars"] == len("complaints reported: 44")
+
+
+def test_overlap_with_neighbour_is_removed():
+    shared = "the shared overlap between neighbouring chunks"
+    first = doc("Opening sentence of the first chunk and " + shared, page=1)
+    second = doc(shared + " followed by the rest of the second chunk", page=2)
+    packed = pack_context([first, second], [0.9, 0.5])
+    assert packed["context"].count(shared) == 1
+    assert packed["deduped_chars"] >= len(shared)
+
+
+def test_overlap_is_kept_across_files():
+    shared = "the shared overlap between neighbouring chunks"
+    first = doc("Opening of the first file and " + shared, source="a.pdf")
+    second = doc(shared + " and the rest of the second file", source="b.pdf")
+    packed = pack_context([first, second], [0.9, 0.5])
+    assert packed["context"].count(shared) == 2
+
+
+def test_no_docs():
+    packed = pack_context([])
+    assert packed["context"] == "" and packed["tokens"] == 0
+    assert not packed["context"].endswith(CHUNK_SEPARATOR)
@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("tokenizers")
+
+from Backend import embeddings
+from Backend.embeddings import create_embeddings, ONNX_FILES, ONNX_MODEL_DIR
+
+# Same tolerances as benchmarks/embedding_parity.py
+TOLERANCE = {"onnx": 1e-3, "onnx-int8": 0.05}
+
+CHUNKS = [
+    "Total complaints reported during the year: 44",
+    "The company spent 2% of its average net profit on CSR activities.",
+    "Employees are entitled to 30 days of paid leave per year.",
+    "The Board met six times during the financial year 2024-25.",
+]
+QUESTIONS = [
+    "How many complaints were reported?",
+    "What was the CSR spend?",
+    "What is the leave policy?",
+]
+
+
+def exported(backend):
+    path = os.path.join(ONNX_MODEL_DIR, ONNX_FILES[backend])
+    if not os.path.exists(path):
+        pytest.skip(f"{path} not exported (python Backend/embeddings.py --export)")
+
+
+def similarities(model):
+    chunks = np.array(model.embed_documents(CHUNKS), dtype=np.float32)
+    questions = np.array([model.embed_query(q) for q in QUESTIONS], dtype=np.float32)
+    return questions @ chunks.T
+
+
+@pytest.fixture(scope="module")
+def reference():
+    """Question-to-chunk similarities from sentence-transformers, if the model is available."""
+    pytest.importorskip("sentence_transformers")
+    from Backend.rag_engine import EMBEDDING_MODEL
+    try:
+        model = create_embeddings(EMBEDDING_MODEL, True, "torch")
+    except Exception as e:   # not cached and no network
+        pytest.skip(f"reference model unavailable: {e}")
+    return similarities(model)
+
+
+@pytest.mark.parametrize("backend", ["onnx", "onnx-int8"])
+def test_onnx_matches_sentence_transformers(backend, reference):
+    exported(backend)
+    scores = similarities(create_embeddings(embeddings.EXPORT_MODEL, True, backend))
+    assert scores.shape == reference.shape
+    assert np.abs(scores - reference).max() <= TOLERANCE[backend]
+    # The best chunk for each question does not change
+    assert (scores.argmax(axis=1) == reference.argmax(axis=1)).all()
+
+
+@pytest.mark.parametrize("backend", ["onnx", "onnx-int8"])
+def test_vectors_are_normalized(backend):
+    exported(backend)
+    vectors = np.array(create_embeddings(embeddings.EXPORT_MODEL, True, backend).embed_documents(CHUNKS))
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-5)
@@ -0,0 +1,44 @@
+import pytest
+
+from Backend.intent import classify_fast
+
+
+@pytest.mark.parametrize("text, category", [
+    ("Schedule a meeting with HR", "hr_meeting"),
+    ("Can you book an appointment with human resources tomorrow?", "hr_meeting"),
+    ("I want to set up a call with my HRBP", "hr_meeting"),
+    ("My laptop is not working", "it_issue"),
+    ("I can't log in to the VPN", "it_issue"),
+    ("I get a VPN error every morning", "it_issue"),
+    ("There is an error on my laptop", "it_issue"),
+    ("What is the leave policy?", "general_query"),
+    ("Who approves travel reimbursements?", "general_query"),
+    ("Explain the travel policy", "general_query"),
+])
+def test_rule_decisions(text, category):
+    decision = classify_fast(text)
+    assert decision is not None
+    assert decision["category"] == category
+    assert decision["classifier"] == "rule"
+    assert decision["requires_action"] == (category != "general_query")
+
+
+@pytest.mark.parametrize("text", [
+    "How do I schedule a meeting with HR?",
+    "What is the process to book an HR appointment?",
+    "Why is my laptop not working?",
+    "How many complaints were reported?",
+    "The quarterly numbers look interesting",
+    "I need our system revenue broken down by region",
+    "Please share our app business revenue broken down by segment",
+    "I would like the error margin for our server business",
+    "",
+])
+def test_ambiguous_messages_go_to_the_llm(text):
+    assert classify_fast(text) is None
+
+
+def test_abuse_is_flagged():
+    decision = classify_fast("this is shit, what is the leave policy")
+    assert decision["has_abuse"] is True
+    assert decision["requires_action"] is False
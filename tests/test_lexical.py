@@ -0,0 +1,52 @@
+import math
+from collections import Counter
+
+import pytest
+
+from Backend import lexical
+from Backend.lexical import save_lexical_index, LexicalIndex, tokenize
+
+TEXTS = [
+    "Total complaints reported: 44 by employees.",
+    "CSR spend was 1,234.5 crore in FY24.",
+    "Leave policy: employees get 24 days of leave.",
+    "",
+    "Travel policy: economy class for all employees.",
+]
+
+
+def brute_force_bm25(query, k1=lexical.BM25_K1, b=lexical.BM25_B):
+    docs = [Counter(tokenize(text)) for text in TEXTS]
+    lengths = [sum(doc.values()) for doc in docs]
+    avg = sum(lengths) / len(docs)
+    scores = {}
+    for term in set(tokenize(query)):
+        df = sum(1 for doc in docs if term in doc)
+        idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+        for row, doc in enumerate(docs):
+            if term in doc:
+                tf = doc[term]
+                norm = k1 * (1 - b + b * lengths[row] / avg)
+                scores[row] = scores.get(row, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+    return scores
+
+
+@pytest.mark.parametrize("block", [1, 3, 1 << 20])
+def test_weights_match_bm25(tmp_path, monkeypatch, block):
+    # Tiny blocks exercise the term-by-term writes of large builds
+    monkeypatch.setattr(lexical, "WRITE_BLOCK_POSTINGS", block)
+    stats = save_lexical_index(str(tmp_path), iter(TEXTS))
+    assert stats["documents"] == len(TEXTS)
+
+    index = LexicalIndex(str(tmp_path))
+    for query in ("employees leave policy", "1234.5 complaints", "44"):
+        expected = brute_force_bm25(query)
+        found = dict(index.search(query, k=10))
+        assert found.keys() == expected.keys()
+        for row, score in expected.items():
+            assert found[row] == pytest.approx(score, rel=1e-5)
+
+
+def test_empty_corpus(tmp_path):
+    assert save_lexical_index(str(tmp_path), iter([]))["postings"] == 0
+    assert LexicalIndex(str(tmp_path)).search("anything", k=5) == []
@@ -0,0 +1,61 @@
+import os
+import json
+
+import pytest
+
+from Backend import rag_engine
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """An isolated vector_store with a published version built from data/."""
+    data = tmp_path / "data"
+    (data / "policies").mkdir(parents=True)
+    for rel in ("a.pdf", "policies/p.pdf"):
+        (data / rel).write_bytes(b"%PDF-1.4 placeholder")
+
+    versions = tmp_path / "vs" / "versions"
+    monkeypatch.setattr(rag_engine, "VERSIONS_DIR", str(versions))
+    monkeypatch.setattr(rag_engine, "CURRENT_POINTER", str(tmp_path / "vs" / "CURRENT"))
+    monkeypatch.setattr(rag_engine, "VECTOR_DB_PATH", str(tmp_path / "vs" / "faiss_index"))
+
+    (versions / "v1").mkdir(parents=True)
+    manifest = rag_engine._new_manifest()
+    manifest["root"] = str(data)
+    manifest["files"] = {"a.pdf": {"sha256": "x", "pages": {}}, "policies/p.pdf": {"sha256": "y", "pages": {}}}
+    (versions / "v1" / rag_engine.MANIFEST_FILE).write_text(json.dumps(manifest))
+    rag_engine.publish_version("v1")
+    return data
+
+
+def test_missing_path_raises(store):
+    with pytest.raises(FileNotFoundError):
+        rag_engine.build_vector_db(str(store / "missing"))
+
+
+def test_path_outside_the_root_is_refused(store, tmp_path):
+    other = tmp_path / "other"
+    other.mkdir()
+    with pytest.raises(ValueError, match="--full"):
+        rag_engine.build_vector_db(str(other))
+    assert rag_engine.get_current_version()[0] == "v1"
+
+
+def test_empty_folder_is_refused(store):
+    (store / "empty").mkdir()
+    with pytest.raises(ValueError, match="--allow-empty"):
+        rag_engine.build_vector_db(str(store / "empty"))
+    assert rag_engine.get_current_version()[0] == "v1"
+
+
+def test_subfolder_keeps_paths_relative_to_the_root(store):
+    manifest = rag_engine.load_manifest(rag_engine.get_current_version()[1])
+    root, scope = rag_engine._ingest_scope(str(store / "policies"), manifest)
+    assert (root, scope) == (str(store), "policies")
+    assert rag_engine._list_pdfs(str(store / "policies"), root) == (root, ["policies/p.pdf"])
+    assert rag_engine._in_scope("policies/p.pdf", scope)
+    assert not rag_engine._in_scope("a.pdf", scope)
+
+    root, scope = rag_engine._ingest_scope(str(store / "a.pdf"), manifest)
+    assert (root, scope) == (str(store), "a.pdf")
+    assert rag_engine._ingest_scope(str(store), manifest) == (str(store), None)
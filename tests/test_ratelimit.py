@@ -0,0 +1,191 @@
+import time
+import asyncio
+import threading
+
+import pytest
+
+from Backend.ratelimit import TokenBucket, SingleFlight
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.005)
+
+
+# ============ TOKEN BUCKET ============
+def test_zero_rate_never_limits():
+    bucket = TokenBucket(rate=0)
+    assert all(bucket.acquire(timeout=0) for _ in range(100))
+
+
+def test_burst_then_timeout():
+    bucket = TokenBucket(rate=1, capacity=3)
+    assert all(bucket.acquire(timeout=0) for _ in range(3))
+    assert bucket.acquire(timeout=0) is False
+    assert bucket.acquire(timeout=0.1) is False
+    assert bucket.stats()["rejected"] == 2
+
+
+def test_waits_for_refill_within_timeout():
+    bucket = TokenBucket(rate=20, capacity=1)
+    assert bucket.acquire(timeout=0)
+    start = time.monotonic()
+    assert bucket.acquire(timeout=1)
+    assert time.monotonic() - start >= 0.03
+    assert bucket.stats()["waits"] == 1
+
+
+def test_async_timeout():
+    bucket = TokenBucket(rate=1, capacity=1)
+
+    async def run():
+        first = await bucket.acquire_async(timeout=0)
+        second = await bucket.acquire_async(timeout=0.1)
+        return first, second
+
+    assert asyncio.run(run()) == (True, False)
+    assert bucket.stats()["rejected"] == 1
+
+
+# ============ SINGLE-FLIGHT ============
+def test_do_shares_one_call():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def upstream():
+        calls.append(1)
+        release.wait(2)
+        return "answer"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(flight.do("key", upstream)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    wait_until(lambda: flight.stats()["coalesced"] == 3)
+    release.set()
+    for thread in threads:
+        thread.join(2)
+
+    assert results == ["answer"] * 4
+    assert len(calls) == 1
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_do_shares_the_error():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def upstream():
+        release.wait(2)
+        raise ValueError("upstream failed")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do("key", upstream)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    wait_until(lambda: flight.stats()["coalesced"] == 2)
+    release.set()
+    for thread in threads:
+        thread.join(2)
+
+    assert len(errors) == 3
+    assert len({id(e) for e in errors}) == 1
+
+
+def test_do_does_not_cache_after_completion():
+    flight = SingleFlight()
+    assert flight.do("key", lambda: 1) == 1
+    assert flight.do("key", lambda: 2) == 2
+
+
+def test_do_async_shares_one_task():
+    flight = SingleFlight()
+    calls = []
+
+    async def upstream():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def run():
+        return await asyncio.gather(*(flight.do_async("key", upstream) for _ in range(3)))
+
+    assert asyncio.run(run()) == ["answer"] * 3
+    assert len(calls) == 1
+
+
+def test_stream_late_joiner_replays_from_start():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def upstream():
+        yield "a"
+        release.wait(2)
+        yield "b"
+
+    first = flight.stream("key", upstream)
+    assert next(first) == "a"
+    late = flight.stream("key", upstream)
+    assert next(late) == "a"
+    release.set()
+    assert list(first) == ["b"]
+    assert list(late) == ["b"]
+    assert flight.stats()["leaders"] == 1
+
+
+def test_stream_error_reaches_every_consumer():
+    flight = SingleFlight()
+
+    def upstream():
+        yield "a"
+        raise ValueError("broken stream")
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            list(flight.stream("key", upstream))
+
+
+def test_stream_closes_upstream_when_consumers_leave():
+    flight = SingleFlight()
+    closed = threading.Event()
+    produced = []
+
+    def upstream():
+        try:
+            for i in range(1000):
+                produced.append(i)
+                time.sleep(0.005)
+                yield i
+        finally:
+            closed.set()
+
+    first = flight.stream("key", upstream)
+    second = flight.stream("key", upstream)
+    assert next(first) == 0 and next(second) == 0
+
+    first.close()
+    assert not closed.wait(0.05)
+    second.close()
+    assert closed.wait(1)
+
+    stopped_at = len(produced)
+    time.sleep(0.05)
+    assert len(produced) == stopped_at < 1000
+    assert flight.stats()["abandoned_streams"] == 1
+    assert flight.stats()["in_flight"] == 0
+    # The key is free again for a new call
+    assert list(flight.stream("key", lambda: iter([1, 2]))) == [1, 2]
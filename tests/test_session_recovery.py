@@ -0,0 +1,51 @@
+import pytest
+
+from Backend import auth
+from Backend import agent as agent_module
+from Backend.session_store import SQLiteSessionStore
+
+USER = {"id": 7, "username": "alice", "full_name": "Alice", "email": "alice@example.com"}
+
+
+@pytest.fixture(autouse=True)
+def secret(tmp_path, monkeypatch):
+    monkeypatch.setattr(auth, "API_SECRET_KEY", "")
+    monkeypatch.setattr(auth, "SESSION_SECRET_FILE", str(tmp_path / "secret"))
+    monkeypatch.setattr(auth, "_serializer", None)
+
+
+@pytest.fixture(autouse=True)
+def no_index(monkeypatch):
+    # Rule-routed issues and confirmations never touch retrieval or the LLM
+    monkeypatch.setattr(agent_module, "get_shared_retriever", lambda: None)
+
+
+def test_token_round_trip():
+    token, session_id = auth.issue_session_token(USER, prefix="streamlit")
+    assert session_id.startswith("streamlit-")
+    assert auth.read_session_token(token) == {"uid": 7, "username": "alice", "sid": session_id}
+    assert auth.read_session_token(token[:-2] + "xx") is None
+    assert auth.read_session_token(None) is None
+
+
+def test_token_survives_a_restart():
+    token, session_id = auth.issue_session_token(USER)
+    auth._serializer = None   # a new process reads the same generated key
+    assert auth.read_session_token(token)["sid"] == session_id
+
+
+def test_new_agent_recovers_the_pending_action(tmp_path):
+    db_path = str(tmp_path / "sessions.sqlite")
+    _, session_id = auth.issue_session_token(USER, prefix="streamlit")
+
+    first = agent_module.get_agent(user_info=USER, session_id=session_id, store=SQLiteSessionStore(db_path))
+    reply = first.invoke("My laptop is not working")["output"]
+    assert "yes" in reply and first.pending_action["category"] == "it_issue"
+
+    # After a restart: new store connection, new agent, same session id
+    second = agent_module.get_agent(session_id=session_id, store=SQLiteSessionStore(db_path))
+    assert second.pending_action == {"category": "it_issue", "query": "My laptop is not working"}
+    assert second.user_info == USER
+    assert second.invoke("no")["output"].startswith("Action cancelled")
+    assert second.pending_action is None
+    assert len(second.history()) == 4
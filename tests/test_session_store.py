@@ -0,0 +1,102 @@
+import types
+
+import pytest
+
+from Backend import session_store
+from Backend.session_store import (
+    InMemorySessionStore,
+    SQLiteSessionStore,
+    RedisSessionStore,
+    LocalRedis,
+)
+
+TTL = 60
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.time() for the session_store module."""
+    now = {"t": 1_000_000.0}
+    monkeypatch.setattr(session_store, "time", types.SimpleNamespace(time=lambda: now["t"]))
+    return now
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def store(request, tmp_path, clock):
+    if request.param == "memory":
+        return InMemorySessionStore(ttl=TTL, history_limit=3)
+    if request.param == "sqlite":
+        return SQLiteSessionStore(db_path=str(tmp_path / "sessions.sqlite"), ttl=TTL, history_limit=3)
+    return RedisSessionStore(LocalRedis(), ttl=TTL, history_limit=3)
+
+
+def test_state_round_trip(store):
+    assert store.load_state("s1") == {}
+    store.save_state("s1", {"last_user_query": "hi", "count": 2})
+    assert store.load_state("s1") == {"last_user_query": "hi", "count": 2}
+    store.save_state("s1", {"count": 3})
+    assert store.load_state("s1") == {"count": 3}
+
+
+def test_history_order_and_limits(store):
+    for i in range(5):
+        store.append_message("s1", {"role": "user", "content": str(i)})
+    assert [m["content"] for m in store.get_history("s1")] == ["2", "3", "4"]
+    assert [m["content"] for m in store.get_history("s1", limit=2)] == ["3", "4"]
+
+
+def test_sessions_are_isolated(store):
+    store.save_state("s1", {"a": 1})
+    store.append_message("s1", {"role": "user", "content": "one"})
+    assert store.load_state("s2") == {}
+    assert store.get_history("s2") == []
+
+
+def test_clear_history_keeps_state(store):
+    store.save_state("s1", {"a": 1})
+    store.append_message("s1", {"role": "user", "content": "one"})
+    store.clear_history("s1")
+    assert store.get_history("s1") == []
+    assert store.load_state("s1") == {"a": 1}
+
+
+def test_delete(store):
+    store.save_state("s1", {"a": 1})
+    store.append_message("s1", {"role": "user", "content": "one"})
+    store.delete("s1")
+    assert store.load_state("s1") == {}
+    assert store.get_history("s1") == []
+
+
+def test_idle_sessions_expire(store, clock):
+    store.save_state("s1", {"a": 1})
+    store.append_message("s1", {"role": "user", "content": "one"})
+    clock["t"] += TTL / 2
+    assert store.load_state("s1") == {"a": 1}
+    clock["t"] += TTL
+    assert store.load_state("s1") == {}
+    assert store.get_history("s1") == []
+
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_purge_expired_removes_rows(kind, tmp_path, clock):
+    if kind == "memory":
+        store = InMemorySessionStore(ttl=TTL)
+    else:
+        store = SQLiteSessionStore(db_path=str(tmp_path / "sessions.sqlite"), ttl=TTL)
+    store.save_state("old", {"a": 1})
+    store.append_message("old", {"role": "user", "content": "one"})
+    clock["t"] += TTL + 1
+    store.save_state("new", {"b": 2})
+
+    store.purge_expired()
+    assert store.purge_expired() == 0
+    assert store.load_state("new") == {"b": 2}
+    if kind == "sqlite":
+        conn = store._connect()
+        sessions = {row[0] for row in conn.execute("SELECT session_id FROM session_state")}
+        messages = conn.execute("SELECT COUNT(*) FROM session_messages").fetchone()[0]
+        conn.close()
+        assert sessions == {"new"} and messages == 0
+    else:
+        assert set(store._states) == {"new"} and not store._histories